@@ -0,0 +1,302 @@
+"""
+Mock Prisma Cloud API
+
+Local stand-in for the Prisma Cloud endpoints used by the scripts in this repository,
+serving a synthetic tenant of configurable size with configurable latency, error rate
+and 429 throttling. Intended for load tests and benchmarks, never for production data.
+
+Usage:
+   python benchmarks/mock_server.py --repos 10000 --port 8080 --latency-ms 20 --error-rate 0.01 --throttle-rate 0.02
+
+Then point the scripts at it:
+   export PRISMA_API_URL=http://127.0.0.1:8080 PRISMA_ACCESS_KEY=mock PRISMA_SECRET_KEY=mock
+
+Request counts are available (without authentication) at GET /__stats and reset with POST /__stats.
+"""
+
+import argparse
+import base64
+import datetime
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SOURCES = ['Github', 'Gitlab', 'AzureRepos', 'Bitbucket', 'cli']
+SEVERITIES = ['CRITICAL', 'HIGH', 'MEDIUM', 'LOW']
+TOKEN_LIFETIME = 600
+
+class MockTenant:
+    """
+    Deterministic synthetic tenant. Large JSON bodies are generated once and served from memory.
+
+    Args:
+    repos (int): Number of repositories.
+    seed (int): Random seed for the generated data.
+    """
+
+    def __init__(self, repos, seed=0):
+        rng = random.Random(seed)
+        now = datetime.datetime(2024, 6, 1, tzinfo=datetime.timezone.utc)
+        self.repositories = []
+        for i in range(repos):
+            scanned = None if i % 23 == 0 else now - datetime.timedelta(days=rng.randint(0, 400), seconds=rng.randint(0, 86399))
+            self.repositories.append({
+                'id': f"repo-{i:06d}",
+                'repository': f"repo-{i:06d}",
+                'source': SOURCES[i % len(SOURCES)],
+                'owner': f"org-{i % 50:02d}",
+                'defaultBranch': 'main' if i % 3 else 'master',
+                'isPublic': i % 7 == 0,
+                'lastScanDate': scanned.strftime('%Y-%m-%dT%H:%M:%S.000Z') if scanned else None,
+            })
+        self.pipelines = [{
+            'appName': f"app-{i:06d}",
+            'casId': f"repo-{i * 2:06d}",
+            'type': rng.choice(['GitHubActions', 'GitLabCI', 'Jenkins', 'AzurePipelines']),
+            'filePath': '.github/workflows/ci.yml',
+            'version': rng.randint(1, 5),
+        } for i in range(repos // 2)]
+        self.risks = {'data': [{
+            'policyId': f"BC_CICD_{i % 40}",
+            'name': f"Pipeline risk {i % 40}",
+            'severity': SEVERITIES[i % len(SEVERITIES)],
+            'system': 'GitHub',
+            'category': 'Flow Control',
+            'level': 'Repository',
+            'totalAlerts': i % 9,
+            'openAlerts': i % 5,
+            'fixedAlerts': i % 3,
+            'suppressedAlerts': i % 2,
+            'lastAlertOn': now.isoformat(),
+            'repoId': f"repo-{(i * 3) % max(repos, 1):06d}",
+        } for i in range(repos // 3)]}
+        self.suppressions = [{
+            'id': f"supp-{i:06d}",
+            'suppressionType': 'Resources',
+            'policyId': f"BC_CICD_{i % 40}",
+            'creationDate': (now - datetime.timedelta(days=i % 300)).isoformat(),
+            'comment': f"Accepted risk {i}",
+            'expirationDate': (now + datetime.timedelta(days=(i % 200) - 100)).isoformat(),
+            'resources': [{'accountId': f"org-{(i * 5) % 50:02d}/repo-{(i * 5) % max(repos, 1):06d}", 'resourceId': f"file{i}.tf:resource"}],
+        } for i in range(repos // 10)]
+        self.tag_rules = [{
+            'id': f"tag-{i}",
+            'name': f"Tag rule {i}",
+            'description': 'Synthetic tag rule',
+            'createdBy': 'mock',
+            'creationDate': now.isoformat(),
+            'isEnabled': True,
+            'tagRuleOOTBId': None,
+            'repositories': [{'id': repo['id'], 'name': repo['repository'], 'source': repo['source'],
+                              'owner': repo['owner'], 'defaultBranch': repo['defaultBranch']}
+                             for repo in self.repositories[i::20][:50]],
+            'canDoActions': True,
+            'definition': {'tag': f"team-{i}", 'paths': [f"modules/team-{i}/"]},
+        } for i in range(20)]
+        self.enforcement_rules = [{
+            'id': 'default',
+            'name': 'Default',
+            'description': 'Default enforcement rule',
+            'enabled': True,
+            'severity': 'HIGH',
+            'type': 'Default',
+            'policies': ['BC_GIT_2'],
+        }] + [{
+            'id': f"rule-{i}",
+            'name': f"Rule {i}",
+            'description': 'Synthetic enforcement rule',
+            'enabled': True,
+            'severity': SEVERITIES[i % len(SEVERITIES)],
+            'type': 'Custom',
+            'policies': [f"BC_CICD_{i}"],
+            'repositories': [{'accountId': repo['id'], 'accountName': repo['repository']} for repo in self.repositories[i::10][:100]],
+        } for i in range(5)]
+
+        self.integrations = {'data': [{
+            'id': f"00000000-0000-0000-0000-{i:012d}",
+            'type': integration_type,
+            'name': f"{integration_type} integration",
+            'params': {'profile': {'displayName': f"{integration_type} integration", 'emailAddress': 'mock@example.com'}},
+        } for i, integration_type in enumerate(['GitHub', 'AzureRepos', 'Gitlab', 'Bitbucket'])]}
+
+        self.lock = threading.Lock()
+        self.bodies = {
+            '/code/api/v1/ci-inventory': json.dumps(self.pipelines).encode(),
+            '/code/api/v1/pipeline-risks': json.dumps(self.risks).encode(),
+            '/code/api/v1/suppressions': json.dumps(self.suppressions).encode(),
+            '/code/api/v1/tag-rules': json.dumps(self.tag_rules).encode(),
+            '/code/api/v1/policies/enforcement-rules': json.dumps(self.enforcement_rules).encode(),
+            '/code/api/v2/integrations': json.dumps(self.integrations).encode(),
+        }
+        self.etags = {path: f'"{hashlib.sha256(body).hexdigest()[:16]}"' for path, body in self.bodies.items()}
+        self._update_repositories_body()
+
+    def _update_repositories_body(self):
+        for path, repositories in (('/code/api/v1/repositories', self.repositories),
+                                   ('/code/api/v2/repositories', [{**repo, 'fullName': full_name(repo)} for repo in self.repositories])):
+            body = json.dumps(repositories).encode()
+            self.bodies[path] = body
+            self.etags[path] = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+
+    def onboard(self, integration_id, names):
+        """
+        Add repositories through an integration, ignoring those already present. Returns the number added.
+        """
+        integration_type = next(integration['type'] for integration in self.integrations['data'] if integration['id'] == integration_id)
+        # Repository sources are spelled differently from integration types for GitHub.
+        source = 'Github' if integration_type == 'GitHub' else integration_type
+        with self.lock:
+            present = {(repo['source'], full_name(repo).lower()) for repo in self.repositories}
+            added = 0
+            for name in names:
+                if (source, name.lower()) in present:
+                    continue
+                owner, _, repository = name.rpartition('/')
+                if source == 'AzureRepos':
+                    # Like the real inventory: the owner is the organization, the project is only in the full name.
+                    owner = name.split('/', 1)[0]
+                self.repositories.append({
+                    'id': f"repo-{len(self.repositories):06d}", 'repository': repository, 'source': source, 'owner': owner,
+                    'defaultBranch': 'main', 'isPublic': False, 'lastScanDate': None, 'fullName': name,
+                })
+                present.add((source, name.lower()))
+                added += 1
+            self._update_repositories_body()
+        return added
+
+def full_name(repo):
+    return repo.get('fullName') or f"{repo['owner']}/{repo['repository']}"
+
+def make_token():
+    payload = json.dumps({'sub': 'mock', 'exp': int(time.time()) + TOKEN_LIFETIME}).encode()
+    return f"mock.{base64.urlsafe_b64encode(payload).decode().rstrip('=')}.signature"
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    tenant = None
+    config = None
+    stats = None
+    stats_lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        if self.config.verbose:
+            super().log_message(format, *args)
+
+    def _count(self, key):
+        with self.stats_lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def _send(self, status, body=b'', headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if body and self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _send_json(self, status, obj):
+        self._send(status, json.dumps(obj).encode())
+
+    def _handle(self):
+        path, _, query = self.path.partition('?')
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+
+        if path == '/__stats':
+            if self.command == 'POST':
+                with self.stats_lock:
+                    self.stats.clear()
+            with self.stats_lock:
+                return self._send_json(200, dict(self.stats))
+
+        self._count('requests')
+        if self.config.latency_ms:
+            time.sleep(self.config.latency_ms / 1000.0)
+        if self.config.throttle_rate and random.random() < self.config.throttle_rate:
+            self._count('throttled')
+            return self._send(429, headers={'Retry-After': str(self.config.retry_after)})
+        if self.config.error_rate and random.random() < self.config.error_rate:
+            self._count('errors')
+            return self._send(503)
+
+        if path == '/login' and self.command == 'POST':
+            self._count('logins')
+            return self._send_json(200, {'token': make_token()})
+        if not (self.headers.get('Authorization') or '').startswith('Bearer '):
+            return self._send(401)
+
+        if self.command == 'POST' and path == '/code/api/v2/repositories':
+            request = json.loads(body or b'{}')
+            if not any(integration['id'] == request.get('integrationId') for integration in self.tenant.integrations['data']):
+                return self._send_json(400, {'message': 'Unknown integration'})
+            self._count('repositories_onboarded')
+            return self._send_json(200, {'added': self.tenant.onboard(request['integrationId'], request.get('repositoriesNames') or [])})
+
+        if path in self.tenant.bodies:
+            if self.command == 'POST' and path != '/code/api/v1/pipeline-risks':
+                return self._send(405)
+            etag = self.tenant.etags[path]
+            if self.headers.get('If-None-Match') == etag:
+                self._count('not_modified')
+                return self._send(304, headers={'ETag': etag})
+            return self._send(200, self.tenant.bodies[path], {'ETag': etag})
+
+        if self.command == 'POST' and re.fullmatch(r'/bridgecrew/api/v1/branches/[^/]+/scannedBranch/[^/]+', path):
+            self._count('branch_updates')
+            return self._send_json(200, {'status': 'ok'})
+        if self.command == 'POST' and re.fullmatch(r'/bridgecrew/api/v1/suppressions/[^/]+', path):
+            self._count('suppressions_created')
+            return self._send_json(200, {'id': f"supp-{random.getrandbits(32):08x}"})
+        if self.command == 'DELETE' and re.fullmatch(r'/bridgecrew/api/v1/suppressions/[^/]+/justifications/[^/]+', path):
+            self._count('suppressions_deleted')
+            return self._send_json(200, {'status': 'ok'})
+        return self._send(404)
+
+    do_GET = _handle
+    do_HEAD = _handle
+    do_POST = _handle
+    do_DELETE = _handle
+
+def create_server(tenant, config, host='127.0.0.1', port=0):
+    """
+    Create (but do not start) a mock API server for a tenant.
+
+    Returns:
+    ThreadingHTTPServer: The server; server.server_address holds the bound port.
+    """
+    handler = type('BoundMockHandler', (MockHandler,), {'tenant': tenant, 'config': config, 'stats': {}})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local mock Prisma Cloud API with a synthetic tenant.")
+    parser.add_argument("--repos", type=int, default=1000, help="Number of synthetic repositories (default: 1000)")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on (default: 8080)")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to bind (default: 127.0.0.1)")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Added latency per request in milliseconds")
+    parser.add_argument("--error-rate", type=float, default=0, help="Fraction of requests answered with 503")
+    parser.add_argument("--throttle-rate", type=float, default=0, help="Fraction of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1, help="Retry-After seconds sent with 429 responses")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the synthetic tenant")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    start = time.monotonic()
+    tenant = MockTenant(args.repos, args.seed)
+    server = create_server(tenant, args, args.host, args.port)
+    host, port = server.server_address[:2]
+    print(f"Mock Prisma API with {args.repos} repositories ready in {time.monotonic() - start:.1f}s on http://{host}:{port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Scale benchmarks for the Prisma API scripts
+
+Starts benchmarks/mock_server.py with a synthetic tenant, runs each script against it
+as a separate process, and reports wall time, requests per second (as counted by the
+mock server) and peak RSS of every run.
+
+Usage:
+1. Run all scenarios against a 10k repository tenant:
+   python benchmarks/run_benchmarks.py --repos 10000
+
+2. Run selected scenarios with latency and throttling, saving the results:
+   python benchmarks/run_benchmarks.py --repos 50000 --latency-ms 20 --throttle-rate 0.01 \\
+       --scenarios repo_lastscanned,tenant_snapshot --output results.json
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = {
+    'repo_lastscanned': [sys.executable, os.path.join(REPO_ROOT, 'get_repo_lastscanned'), '--days', '30', '--refresh'],
+    'repo_histogram': [sys.executable, os.path.join(REPO_ROOT, 'get_repo_lastscanned'), '--histogram', '--by', 'source', '--refresh'],
+    'branch_scan_only': [sys.executable, os.path.join(REPO_ROOT, 'set_scanned_branch.py'), '--scan-only', '--refresh'],
+    'branch_set_parallel': [sys.executable, os.path.join(REPO_ROOT, 'set_scanned_branch.py'), '--branch', 'main', '--concurrency', '16', '--refresh'],
+    'pipeline_tools_changes': [sys.executable, os.path.join(REPO_ROOT, 'get_pipeline_tools_changes.py')],
+    'tenant_snapshot': [sys.executable, os.path.join(REPO_ROOT, 'get_tenant_snapshot.py'), '--output', 'snapshot.json'],
+    'suppression_rules': [sys.executable, '-m', 'utils.get_suppression_rules'],
+    'suppression_bulk_delete_dry_run': [sys.executable, '-m', 'utils.delete_suppression_rule', '--bulk', '--expired', '--dry-run'],
+    'pipeline_risks': [sys.executable, '-m', 'utils.get_pipeline_risks'],
+    'enforcement_rules': [sys.executable, '-m', 'utils.get_enforcement_rules'],
+    'tag_rules': [sys.executable, '-m', 'utils.get_tags'],
+}
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_mock_server(args, port):
+    command = [
+        sys.executable, os.path.join(REPO_ROOT, 'benchmarks', 'mock_server.py'),
+        '--repos', str(args.repos), '--port', str(port),
+        '--latency-ms', str(args.latency_ms), '--error-rate', str(args.error_rate),
+        '--throttle-rate', str(args.throttle_rate), '--retry-after', str(args.retry_after),
+    ]
+    server = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    line = server.stdout.readline()
+    if 'ready' not in line:
+        server.kill()
+        raise RuntimeError(f"Mock server failed to start: {line}")
+    print(line.strip())
+    return server
+
+def server_stats(api_url, reset=False):
+    request = urllib.request.Request(f"{api_url}/__stats", method='POST' if reset else 'GET')
+    with urllib.request.urlopen(request) as response:
+        return json.load(response)
+
+def peak_rss_mb(rusage):
+    # ru_maxrss is reported in kilobytes on Linux and in bytes on macOS.
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return rusage.ru_maxrss / divisor
+
+def run_scenario(name, command, env, workdir, api_url):
+    server_stats(api_url, reset=True)
+    start = time.monotonic()
+    process = subprocess.Popen(command, cwd=workdir, env=env, stdin=subprocess.DEVNULL,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    _, status, rusage = os.wait4(process.pid, 0)
+    wall_time = time.monotonic() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+    stderr = process.stderr.read().decode(errors='replace')
+    process.stderr.close()
+    stats = server_stats(api_url)
+    requests_count = stats.get('requests', 0)
+    return {
+        'scenario': name,
+        'exit_code': process.returncode,
+        'wall_time_s': round(wall_time, 3),
+        'requests': requests_count,
+        'requests_per_s': round(requests_count / wall_time, 1) if wall_time else 0,
+        'throttled': stats.get('throttled', 0),
+        'errors': stats.get('errors', 0),
+        'peak_rss_mb': round(peak_rss_mb(rusage), 1),
+        'stderr_tail': stderr.strip().splitlines()[-1] if process.returncode and stderr.strip() else '',
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Prisma API scripts against a local mock API.")
+    parser.add_argument("--repos", type=int, default=1000, help="Number of synthetic repositories (default: 1000)")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Added latency per request in milliseconds")
+    parser.add_argument("--error-rate", type=float, default=0, help="Fraction of requests answered with 503")
+    parser.add_argument("--throttle-rate", type=float, default=0, help="Fraction of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1, help="Retry-After seconds sent with 429 responses")
+    parser.add_argument("--scenarios", help=f"Comma-separated scenarios to run (default: all of {', '.join(SCENARIOS)})")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    names = args.scenarios.split(',') if args.scenarios else list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(unknown)}")
+
+    port = free_port()
+    api_url = f"http://127.0.0.1:{port}"
+    server = start_mock_server(args, port)
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            env = dict(os.environ)
+            env.update({
+                'PRISMA_API_URL': api_url,
+                'PRISMA_ACCESS_KEY': 'mock',
+                'PRISMA_SECRET_KEY': 'mock',
+                'PRISMA_TOKEN_CACHE': os.path.join(workdir, 'token_cache.json'),
+                'PRISMA_INVENTORY_CACHE': os.path.join(workdir, 'inventory_cache.db'),
+                'PRISMA_AGENT': 'off',
+                'PYTHONPATH': os.pathsep.join(filter(None, [REPO_ROOT, env.get('PYTHONPATH')])),
+            })
+            print(f"{'scenario':<34}{'exit':>5}{'wall s':>10}{'requests':>10}{'req/s':>10}{'429':>7}{'5xx':>7}{'RSS MB':>9}")
+            for name in names:
+                result = run_scenario(name, SCENARIOS[name], env, workdir, api_url)
+                results.append(result)
+                print(f"{name:<34}{result['exit_code']:>5}{result['wall_time_s']:>10.2f}{result['requests']:>10}"
+                      f"{result['requests_per_s']:>10.1f}{result['throttled']:>7}{result['errors']:>7}{result['peak_rss_mb']:>9.1f}")
+                if result['stderr_tail']:
+                    print(f"  {result['stderr_tail']}")
+    finally:
+        server.terminate()
+        server.wait()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'repos': args.repos, 'latency_ms': args.latency_ms, 'error_rate': args.error_rate,
+                       'throttle_rate': args.throttle_rate, 'results': results}, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
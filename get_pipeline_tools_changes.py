@@ -4,50 +4,298 @@ import argparse
 import os 
 from dateutil.parser import parse
 from utils.get_prisma_token import get_auth_token
-from utils.get_pipeline_tools import get_pipeline_tools
-from utils.get_repo import get_repo_scanned
+from utils.get_pipeline_tools import PipelineToolsPoller, get_pipeline_tools
+from utils.inventory_cache import DEFAULT_TTL, get_cached_repositories
 import sqlite3
+import hashlib
+import sys
 import time
+import requests
 
 DATABASE_FILE = 'prisma_pipeline_states.db'
+DEFAULT_WATCH_INTERVAL = 300
+WEBHOOK_TIMEOUT = 10
 
 def init_db():
     conn = sqlite3.connect(DATABASE_FILE)
     c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS states
-                 (timestamp INTEGER PRIMARY KEY, state TEXT)''')
+    c.execute('''CREATE TABLE IF NOT EXISTS snapshots
+                 (timestamp INTEGER PRIMARY KEY, pipeline_count INTEGER)''')
+    c.execute('''CREATE TABLE IF NOT EXISTS pipeline_versions
+                 (app_name TEXT, timestamp INTEGER, content_hash TEXT, removed INTEGER DEFAULT 0, state TEXT,
+                  PRIMARY KEY (app_name, timestamp))''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_pipeline_versions_timestamp ON pipeline_versions (timestamp)")
+    c.execute('''CREATE TABLE IF NOT EXISTS change_events
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp INTEGER, app_name TEXT, change_type TEXT, delta TEXT)''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_change_events_timestamp ON change_events (timestamp)")
+    if c.execute("PRAGMA user_version").fetchone()[0] < 1:
+        backfill_change_events(conn)
+        c.execute("PRAGMA user_version = 1")
+    c.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'states'")
+    if c.fetchone():
+        migrate_legacy_states(conn)
     conn.commit()
     conn.close()
 
+def migrate_legacy_states(conn):
+    """
+    Replay snapshots from the old one-blob-per-run `states` table into the delta tables.
+    """
+    c = conn.cursor()
+    c.execute("SELECT timestamp, state FROM states ORDER BY timestamp")
+    for timestamp, state in c.fetchall():
+        write_state(conn, json.loads(state), timestamp)
+    c.execute("DROP TABLE states")
+
+def backfill_change_events(conn):
+    """
+    Build change events for pipeline versions stored before the event log existed.
+    """
+    c = conn.cursor()
+    c.execute("SELECT app_name, timestamp, removed, state FROM pipeline_versions ORDER BY app_name, timestamp")
+    events = []
+    previous_app, previous_state = None, None
+    for app_name, timestamp, removed, state in c.fetchall():
+        if app_name != previous_app:
+            previous_app, previous_state = app_name, None
+        current_state = None if removed else json.loads(state)
+        events.append(change_event(app_name, timestamp, previous_state, current_state))
+        previous_state = current_state
+    insert_change_events(conn, events)
+
+def field_delta(old, new, prefix=''):
+    """
+    Return {field: [old_value, new_value]} for every field that differs.
+
+    Nested objects are compared field by field and reported with dotted names.
+    """
+    delta = {}
+    old = old or {}
+    new = new or {}
+    for key in sorted(old.keys() | new.keys()):
+        name = f"{prefix}{key}"
+        old_value, new_value = old.get(key), new.get(key)
+        if isinstance(old_value, dict) and isinstance(new_value, dict):
+            delta.update(field_delta(old_value, new_value, f"{name}."))
+        elif old_value != new_value:
+            delta[name] = [old_value, new_value]
+    return delta
+
+def change_event(app_name, timestamp, old, new):
+    if old is None:
+        change_type = 'added'
+    elif new is None:
+        change_type = 'removed'
+    else:
+        change_type = 'modified'
+    return (timestamp, app_name, change_type, json.dumps(field_delta(old, new)))
+
+def insert_change_events(conn, events):
+    conn.cursor().executemany(
+        "INSERT INTO change_events (timestamp, app_name, change_type, delta) VALUES (?, ?, ?, ?)", events)
+
+def pipeline_hash(pipeline):
+    return hashlib.sha256(json.dumps(pipeline, sort_keys=True).encode()).hexdigest()
+
+def latest_hashes(conn, timestamp=None):
+    """
+    Return {appName: content_hash} for the pipelines present at a point in time (default: now).
+    """
+    c = conn.cursor()
+    c.execute('''SELECT app_name, content_hash FROM pipeline_versions v
+                 WHERE removed = 0 AND timestamp = (SELECT MAX(timestamp) FROM pipeline_versions
+                                                    WHERE app_name = v.app_name AND timestamp <= ?)''',
+              (timestamp if timestamp is not None else int(time.time()),))
+    return dict(c.fetchall())
+
+def previous_pipeline_state(conn, app_name, timestamp):
+    c = conn.cursor()
+    c.execute('''SELECT state FROM pipeline_versions WHERE app_name = ? AND timestamp <= ?
+                 ORDER BY timestamp DESC LIMIT 1''', (app_name, timestamp))
+    row = c.fetchone()
+    return json.loads(row[0]) if row and row[0] else None
+
+def write_state(conn, state, timestamp):
+    """
+    Store a snapshot, writing rows only for pipelines that were added, changed or removed.
+
+    The snapshot is diffed once against its predecessor here and the result
+    is appended to the change_events log with the field-level delta.
+
+    Returns:
+    list: The change events recorded, as (timestamp, app_name, change_type, delta) tuples.
+    """
+    previous = latest_hashes(conn, timestamp)
+    rows = []
+    events = []
+    for app_name, pipeline in state.items():
+        content_hash = pipeline_hash(pipeline)
+        if previous.get(app_name) != content_hash:
+            rows.append((app_name, timestamp, content_hash, 0, json.dumps(pipeline)))
+            old = previous_pipeline_state(conn, app_name, timestamp) if app_name in previous else None
+            events.append(change_event(app_name, timestamp, old, pipeline))
+    for app_name in previous.keys() - state.keys():
+        rows.append((app_name, timestamp, None, 1, None))
+        events.append(change_event(app_name, timestamp, previous_pipeline_state(conn, app_name, timestamp), None))
+    c = conn.cursor()
+    c.executemany("INSERT OR REPLACE INTO pipeline_versions VALUES (?, ?, ?, ?, ?)", rows)
+    insert_change_events(conn, events)
+    c.execute("INSERT OR REPLACE INTO snapshots VALUES (?, ?)", (timestamp, len(state)))
+    return events
+
 def save_state(state):
     conn = sqlite3.connect(DATABASE_FILE)
-    c = conn.cursor()
-    c.execute("INSERT INTO states VALUES (?, ?)", (int(time.time()), json.dumps(state)))
+    timestamp = int(time.time())
+    write_state(conn, state, timestamp)
     conn.commit()
     conn.close()
+    return timestamp
 
-def load_states(days=7):
+def load_snapshot_times(days=7):
     conn = sqlite3.connect(DATABASE_FILE)
     c = conn.cursor()
     timestamp = int(time.time()) - (days * 86400)
-    c.execute("SELECT * FROM states WHERE timestamp >= ? ORDER BY timestamp DESC", (timestamp,))
-    states = {row[0]: json.loads(row[1]) for row in c.fetchall()}
+    c.execute("SELECT timestamp FROM snapshots WHERE timestamp >= ? ORDER BY timestamp DESC", (timestamp,))
+    timestamps = [row[0] for row in c.fetchall()]
     conn.close()
-    return states
+    return timestamps
+
+def changes_since(conn, since, until=None):
+    """
+    Compare the stored inventory at `since` with the inventory at `until` (default: now).
+
+    Only pipelines with rows written after `since` are examined, so the cost
+    depends on how much changed rather than on the inventory size.
+
+    Returns:
+    tuple: (added, removed, modified) lists of appNames.
+    """
+    c = conn.cursor()
+    c.execute('''WITH changed AS (SELECT DISTINCT app_name FROM pipeline_versions WHERE timestamp > :since AND timestamp <= :until)
+                 SELECT app_name,
+                        (SELECT CASE WHEN removed THEN NULL ELSE content_hash END FROM pipeline_versions
+                         WHERE app_name = changed.app_name AND timestamp <= :since ORDER BY timestamp DESC LIMIT 1),
+                        (SELECT CASE WHEN removed THEN NULL ELSE content_hash END FROM pipeline_versions
+                         WHERE app_name = changed.app_name AND timestamp <= :until ORDER BY timestamp DESC LIMIT 1)
+                 FROM changed ORDER BY app_name''',
+              {'since': since, 'until': until if until is not None else int(time.time())})
+    added, removed, modified = [], [], []
+    for app_name, before, after in c.fetchall():
+        if before is None and after is not None:
+            added.append(app_name)
+        elif before is not None and after is None:
+            removed.append(app_name)
+        elif before != after:
+            modified.append(app_name)
+    return added, removed, modified
+
+def load_change_events(since, until=None):
+    """
+    Yield change events recorded after `since` (and up to `until`), oldest first.
+
+    Yields:
+    dict: timestamp, appName, changeType and the field-level delta.
+    """
+    conn = sqlite3.connect(DATABASE_FILE)
+    c = conn.cursor()
+    c.execute('''SELECT timestamp, app_name, change_type, delta FROM change_events
+                 WHERE timestamp > ? AND timestamp <= ? ORDER BY timestamp, id''',
+              (since, until if until is not None else int(time.time())))
+    for row in c:
+        yield event_record(row)
+    conn.close()
+
+def event_record(event):
+    timestamp, app_name, change_type, delta = event
+    return {'timestamp': timestamp, 'appName': app_name, 'changeType': change_type, 'delta': json.loads(delta)}
+
+def print_change_event(event):
+    print(f"{datetime.datetime.fromtimestamp(event['timestamp'])} {event['changeType']} {event['appName']}")
+    for field, (old, new) in event['delta'].items():
+        print(f"  {field}: {old} -> {new}")
+
+def export_change_feed(path, since, until=None):
+    """
+    Write change events after `since` to `path` as NDJSON, one event per line.
+
+    Returns:
+    int: The number of events written.
+    """
+    count = 0
+    with open(path, 'w') as f:
+        for event in load_change_events(since, until):
+            f.write(json.dumps(event) + '\n')
+            count += 1
+    return count
 
 def cleanup_old_states(days=30):
+    """
+    Drop history older than `days`, keeping the rows needed to rebuild the inventory at the cutoff.
+    """
     conn = sqlite3.connect(DATABASE_FILE)
     c = conn.cursor()
     timestamp = int(time.time()) - (days * 86400)
-    c.execute("DELETE FROM states WHERE timestamp < ?", (timestamp,))
+    c.execute('''DELETE FROM pipeline_versions WHERE timestamp < :cutoff AND EXISTS
+                 (SELECT 1 FROM pipeline_versions newer WHERE newer.app_name = pipeline_versions.app_name
+                  AND newer.timestamp > pipeline_versions.timestamp AND newer.timestamp <= :cutoff)''',
+              {'cutoff': timestamp})
+    c.execute("DELETE FROM pipeline_versions WHERE timestamp < ? AND removed = 1", (timestamp,))
+    c.execute("DELETE FROM snapshots WHERE timestamp < ?", (timestamp,))
+    c.execute("DELETE FROM change_events WHERE timestamp < ?", (timestamp,))
     conn.commit()
     conn.close()
 
-def compare_states(previous_state, current_state):
-    added = [item for item in current_state if item not in previous_state]
-    removed = [item for item in previous_state if item not in current_state]
-    modified = [item for item in current_state if item in previous_state and current_state[item] != previous_state[item]]
-    return added, removed, modified
+def post_webhook(url, events):
+    """
+    POST a batch of change events to a webhook as {"events": [...]}.
+
+    Failures are reported but not raised; the events stay in the change_events
+    table and can be sent again with --events-since/--export-feed.
+    """
+    try:
+        response = requests.post(url, json={'events': events}, timeout=WEBHOOK_TIMEOUT)
+        response.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        print(f"Failed to deliver {len(events)} change events to the webhook: {e}", file=sys.stderr)
+
+def watch(api_url, auth_token, interval=DEFAULT_WATCH_INTERVAL, webhook=None):
+    """
+    Poll the CI inventory every `interval` seconds and emit change events as they are detected.
+
+    The session and token stay alive between polls. An unchanged inventory is
+    detected from a 304 or the payload hash, and is neither decoded, diffed nor
+    stored; a changed one is stored as a delta snapshot and its events are
+    printed and, if given, posted to the webhook.
+    """
+    poller = PipelineToolsPoller(api_url, auth_token)
+    last_cleanup = 0
+    next_poll = time.monotonic()
+    print(f"Watching the CI inventory every {interval}s", flush=True)
+    while True:
+        try:
+            pipelines = poller.poll()
+        except requests.exceptions.RequestException as e:
+            print(f"Polling the CI inventory failed: {e}", file=sys.stderr)
+            pipelines = None
+
+        if pipelines is not None:
+            conn = sqlite3.connect(DATABASE_FILE)
+            events = [event_record(event) for event in
+                      write_state(conn, {pipeline['appName']: pipeline for pipeline in pipelines}, int(time.time()))]
+            conn.commit()
+            conn.close()
+            for event in events:
+                print_change_event(event)
+            sys.stdout.flush()
+            if events and webhook:
+                post_webhook(webhook, events)
+
+        if time.time() - last_cleanup >= 86400:
+            cleanup_old_states()
+            last_cleanup = time.time()
+
+        next_poll += interval
+        time.sleep(max(0, next_poll - time.monotonic()))
 
 def match_repos_with_apps(repositories, pipelines):
     repo_app_map = {repo['id']: {'name': repo['name'], 'apps': []} for repo in repositories}
@@ -62,8 +310,32 @@ def main():
     print(f"Database initialized at: {os.path.abspath(DATABASE_FILE)}")
     parser = argparse.ArgumentParser(description="List pipeline_tools in Prisma Cloud tenant last scanned before a given date.")
     parser.add_argument("--show", action="store_true", help="Show all repositories and their associated appNames")
+    parser.add_argument("--cache-ttl", type=int, default=DEFAULT_TTL, help=f"Seconds to reuse the local repository cache (default: {DEFAULT_TTL})")
+    parser.add_argument("--refresh", action="store_true", help="Download the repository list even if the local cache is fresh")
+    parser.add_argument("--events-since", type=parse, help="Print the recorded change events since this date and exit")
+    parser.add_argument("--export-feed", help="With --events-since, write the change events to this file as NDJSON instead")
+    parser.add_argument("--watch", action="store_true", help="Keep running and report changes to the CI inventory as they happen")
+    parser.add_argument("--interval", type=int, default=DEFAULT_WATCH_INTERVAL, help=f"With --watch, seconds between polls (default: {DEFAULT_WATCH_INTERVAL})")
+    parser.add_argument("--webhook", help="With --watch, POST change events as JSON to this URL")
     args = parser.parse_args()
 
+    if args.export_feed and not args.events_since:
+        parser.error("--export-feed requires --events-since")
+    if args.webhook and not args.watch:
+        parser.error("--webhook requires --watch")
+    if args.interval < 1:
+        parser.error("--interval must be at least 1 second")
+
+    if args.events_since:
+        since = int(args.events_since.timestamp())
+        if args.export_feed:
+            count = export_change_feed(args.export_feed, since)
+            print(f"Exported {count} change events to {args.export_feed}")
+        else:
+            for event in load_change_events(since):
+                print_change_event(event)
+        return
+
     api_url = os.environ.get('PRISMA_API_URL')
     username = os.environ.get('PRISMA_ACCESS_KEY')
     password = os.environ.get('PRISMA_SECRET_KEY')
@@ -72,11 +344,18 @@ def main():
         raise ValueError("One or more required environment variables are not set. Please set PRISMA_API_URL, PRISMA_ACCESS_KEY, and PRISMA_SECRET_KEY.")
 
     auth_token = get_auth_token(api_url, username, password)
+
+    if args.watch:
+        try:
+            watch(api_url, auth_token, args.interval, args.webhook)
+        except KeyboardInterrupt:
+            pass
+        return
     
     pipelines = get_pipeline_tools(api_url, auth_token)
 
     if args.show:
-        repositories = get_repo_scanned(api_url, auth_token)
+        repositories = get_cached_repositories(api_url, auth_token, args.cache_ttl, args.refresh)
         repo_app_map = match_repos_with_apps(repositories, pipelines)
         
         print("Repositories and their associated appNames:")
@@ -95,13 +374,12 @@ def main():
             print("No pipeline CI files were found or an error occurred.")
         
         current_state = {pipeline['appName']: pipeline for pipeline in pipelines}
-        save_state(current_state)
-
-        previous_states = load_states()
+        now = save_state(current_state)
 
-        for timestamp, state in previous_states.items():
+        conn = sqlite3.connect(DATABASE_FILE)
+        for timestamp in load_snapshot_times():
             print(f"\nChanges since {datetime.datetime.fromtimestamp(timestamp)}:")
-            added, removed, modified = compare_states(state, current_state)
+            added, removed, modified = changes_since(conn, timestamp, now)
 
             print("Added pipelines:")
             for pipeline in added:
@@ -114,6 +392,7 @@ def main():
             print("\nModified pipelines:")
             for pipeline in modified:
                 print(f"  - {pipeline}")
+        conn.close()
 
         cleanup_old_states()
 
@@ -0,0 +1,59 @@
+"""
+Prisma Cloud Tenant Snapshot
+
+Fetches repositories, pipeline tools, pipeline risks, suppression rules, enforcement
+rules and tag rules concurrently with a single login, and writes them together as
+one snapshot.
+
+Usage:
+1. Write a JSON snapshot file:
+   python get_tenant_snapshot.py --output snapshot.json
+
+2. Append the snapshot to a SQLite database:
+   python get_tenant_snapshot.py --output snapshots.db
+
+3. Only fetch some endpoints:
+   python get_tenant_snapshot.py --endpoints repositories,pipeline_risks
+"""
+
+import argparse
+import os
+from datetime import datetime
+from utils.get_prisma_token import get_auth_token
+from utils.tenant_snapshot import SNAPSHOT_FETCHERS, fetch_tenant_snapshot, write_snapshot_db, write_snapshot_json
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch a combined snapshot of a Prisma Cloud tenant.")
+    parser.add_argument("--output", help="Snapshot file; a .db/.sqlite path appends to a SQLite database (default: tenant_snapshot_<timestamp>.json)")
+    parser.add_argument("--endpoints", help=f"Comma-separated endpoints to fetch (default: all of {', '.join(SNAPSHOT_FETCHERS)})")
+    args = parser.parse_args()
+
+    endpoints = args.endpoints.split(',') if args.endpoints else None
+    unknown = [name for name in endpoints or [] if name not in SNAPSHOT_FETCHERS]
+    if unknown:
+        parser.error(f"Unknown endpoints: {', '.join(unknown)}")
+
+    api_url = os.environ.get('PRISMA_API_URL')
+    username = os.environ.get('PRISMA_ACCESS_KEY')
+    password = os.environ.get('PRISMA_SECRET_KEY')
+
+    if not all([api_url, username, password]):
+        raise ValueError("One or more required environment variables are not set. Please set PRISMA_API_URL, PRISMA_ACCESS_KEY, and PRISMA_SECRET_KEY.")
+
+    auth_token = get_auth_token(api_url, username, password)
+
+    snapshot = fetch_tenant_snapshot(api_url, auth_token, endpoints)
+
+    output = args.output or f"tenant_snapshot_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    if output.endswith(('.db', '.sqlite')):
+        write_snapshot_db(snapshot, output)
+    else:
+        write_snapshot_json(snapshot, output)
+
+    for name, duration in snapshot['durations'].items():
+        status = f"error: {snapshot['errors'][name]}" if name in snapshot['errors'] else "ok"
+        print(f"{name}: {duration:.2f}s ({status})")
+    print(f"Snapshot saved to {output}")
+
+if __name__ == "__main__":
+    main()
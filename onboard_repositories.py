@@ -0,0 +1,274 @@
+"""
+Prisma Cloud Bulk Repository Onboarding
+
+Python replacement for PowerShell/onboarding-bulk-repos.ps1. It reads a repository list,
+compares it with the repositories Prisma Cloud already has, and onboards only the missing
+ones. They are sent in chunked batch requests per integration, several at a time, and
+every repository is recorded in the job journal (prisma_jobs.db) so an interrupted or
+partly failed run can be resumed. Running the same list again is a no-op.
+
+The script requires environment variables for authentication:
+- PRISMA_API_URL: The base URL for the Prisma Cloud API
+- PRISMA_ACCESS_KEY: The access key for API authentication
+- PRISMA_SECRET_KEY: The secret key for API authentication
+
+Usage:
+1. Show what would be onboarded from a GitHub repository list:
+   python onboard_repositories.py --type Github --file repolist.txt --dry-run
+
+2. Onboard Azure Repos repositories, 4 batches of 50 in flight, without prompting:
+   python onboard_repositories.py --type AzureRepos --file repolist.txt --batch-size 50 --concurrency 4 --yes
+
+3. Resume an interrupted or partly failed run:
+   python onboard_repositories.py --resume 20240601-120000-a1b2c3
+
+The repository list has one repository per line ("owner/repository" for GitHub, GitLab and
+Bitbucket, "organization/project/repository" for Azure Repos). An integration ID may follow
+the name on the same line to onboard that repository through a specific integration;
+otherwise --integration-id, or the only integration of the selected type, is used. Empty
+lines and lines starting with # are ignored.
+"""
+
+if __name__ == "__main__":
+    # Hand the command to a running agent (utils/agent.py) before the imports below.
+    from utils.agent import run_in_agent
+    run_in_agent("onboard_repositories.py")
+
+import argparse
+import os
+import re
+import sys
+import requests
+from utils.get_prisma_token import get_auth_token
+from utils.inventory_cache import invalidate_repository_cache
+from utils.prisma_client import get_client
+from utils.bulk import run_concurrently, summarize_results
+from utils.job_journal import DONE, FAILED, PLANNED, SKIPPED, JobJournal, print_jobs
+
+JOB_KIND = 'onboard_repositories'
+REPOSITORIES_PATH = "/code/api/v2/repositories"
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_CONCURRENCY = 4
+REPOSITORY_PATTERNS = {
+    'Github': re.compile(r'^[\w.-]+/[\w.-]+$'),
+    'Gitlab': re.compile(r'^[\w.-]+(/[\w.-]+)+$'),
+    'Bitbucket': re.compile(r'^[\w.-]+/[\w.-]+$'),
+    'AzureRepos': re.compile(r'^[\w.-]+/[\w.-]+/[\w.-]+$'),
+}
+
+def read_repository_list(path):
+    """
+    Read repository names, each optionally followed by an integration ID.
+
+    Returns:
+    list: (name, integration_id) tuples in file order without duplicates; integration_id may be None.
+    """
+    entries = {}
+    with open(path) as f:
+        for line in f:
+            fields = line.split('#', 1)[0].split()
+            if fields:
+                entries.setdefault(fields[0].lower(), (fields[0], fields[1] if len(fields) > 1 else None))
+    return list(entries.values())
+
+def invalid_repository_names(names, repo_type):
+    pattern = REPOSITORY_PATTERNS[repo_type]
+    return [name for name in names if not pattern.match(name)]
+
+def get_integrations(api_url, auth_token, repo_type):
+    """
+    Return the code integrations of one repository type (e.g. Github, AzureRepos).
+    """
+    response = get_client(api_url, auth_token).get_json("/code/api/v2/integrations")
+    integrations = response.get('data', []) if isinstance(response, dict) else response
+    return [integration for integration in integrations if (integration.get('type') or '').lower() == repo_type.lower()]
+
+def choose_integration(integrations, repo_type):
+    """
+    Return the ID of the only integration, or ask which one to use when there are several.
+    """
+    if not integrations:
+        raise ValueError(f"No {repo_type} integrations found.")
+    if len(integrations) == 1:
+        return integrations[0]['id']
+    if not sys.stdin.isatty():
+        raise ValueError(f"Several {repo_type} integrations found; select one with --integration-id: "
+                         + ", ".join(integration['id'] for integration in integrations))
+    print(f"=== Select {repo_type} Integration ===")
+    for number, integration in enumerate(integrations, start=1):
+        profile = (integration.get('params') or {}).get('profile') or {}
+        print(f"{number}. {integration.get('name') or profile.get('displayName')} ({integration['id']})")
+    while True:
+        choice = input(f"Enter your choice (1-{len(integrations)}): ")
+        if choice.isdigit() and 1 <= int(choice) <= len(integrations):
+            return integrations[int(choice) - 1]['id']
+
+def repository_full_name(repo):
+    """
+    Return the name a repository is onboarded under, e.g. "organization/project/repository" for Azure Repos.
+
+    The v2 listing has it in fullName; the owner of an Azure Repos repository is
+    only its organization, so owner/repository is just a fallback.
+    """
+    return repo.get('fullName') or f"{repo.get('owner')}/{repo.get('repository')}"
+
+def onboarded_repositories(api_url, auth_token, repo_type):
+    """
+    Return the lower-cased full names of the repositories of a type Prisma Cloud already has.
+    """
+    return {
+        repository_full_name(repo).lower()
+        for repo in get_client(api_url, auth_token).stream_json_array('GET', REPOSITORIES_PATH)
+        if (repo.get('source') or '').lower() == repo_type.lower()
+    }
+
+def add_repositories(api_url, auth_token, integration_id, names):
+    """
+    Onboard a batch of repositories through one integration.
+
+    Raises:
+    requests.exceptions.RequestException: If the API request fails.
+    """
+    payload = {
+        'integrationId': integration_id,
+        'repositoriesNames': names,
+        'skipNonExistsRepositories': True,
+    }
+    return get_client(api_url, auth_token).post_json(REPOSITORIES_PATH, json=payload)
+
+def make_batches(entries, batch_size):
+    """
+    Group (name, integration_id) entries by integration and split them into batches.
+
+    Returns:
+    list: Batches as dictionaries with integrationId and names.
+    """
+    by_integration = {}
+    for name, integration_id in entries:
+        by_integration.setdefault(integration_id, []).append(name)
+    return [
+        {'integrationId': integration_id, 'names': names[start:start + batch_size]}
+        for integration_id, names in by_integration.items()
+        for start in range(0, len(names), batch_size)
+    ]
+
+def onboard_batches(api_url, auth_token, batches, concurrency, journal, job_id):
+    """
+    Send onboarding batches in parallel, marking their repositories done or failed in the journal.
+
+    Returns:
+    list: (batch, result, error) tuples; error is None on success.
+    """
+    def onboard(batch):
+        item_ids = [f"{batch['integrationId']}/{name}" for name in batch['names']]
+        try:
+            result = add_repositories(api_url, auth_token, batch['integrationId'], batch['names'])
+        except requests.exceptions.RequestException as e:
+            journal.mark_many(job_id, item_ids, FAILED, str(e))
+            raise
+        journal.mark_many(job_id, item_ids, DONE)
+        return result
+
+    return run_concurrently(onboard, batches, concurrency=concurrency)
+
+def main():
+    parser = argparse.ArgumentParser(description="Onboard repositories to Prisma Cloud, skipping those already onboarded.")
+    parser.add_argument("--type", choices=sorted(REPOSITORY_PATTERNS), help="Repository type of the list")
+    parser.add_argument("--file", default="repolist.txt", help="Repository list file (default: repolist.txt)")
+    parser.add_argument("--integration-id", help="Integration to use for repositories without one in the list")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help=f"Maximum repositories per request (default: {DEFAULT_BATCH_SIZE})")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help=f"Number of batch requests in flight (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--dry-run", action="store_true", help="Only list the repositories that would be onboarded")
+    parser.add_argument("--yes", action="store_true", help="Do not ask for confirmation")
+    parser.add_argument("--resume", metavar="JOB_ID", help="Retry the planned and failed repositories of an earlier job")
+    parser.add_argument("--list-jobs", action="store_true", help="List the onboarding jobs recorded in the journal and exit")
+    args = parser.parse_args()
+
+    if args.list_jobs:
+        with JobJournal() as journal:
+            print_jobs(journal, JOB_KIND)
+        return
+    if not args.resume and not args.type:
+        parser.error("--type is required unless --resume is given")
+    if args.batch_size < 1 or args.concurrency < 1:
+        parser.error("--batch-size and --concurrency must be at least 1")
+
+    api_url = os.environ.get('PRISMA_API_URL')
+    username = os.environ.get('PRISMA_ACCESS_KEY')
+    password = os.environ.get('PRISMA_SECRET_KEY')
+
+    if not all([api_url, username, password]):
+        raise ValueError("One or more required environment variables are not set. Please set PRISMA_API_URL, PRISMA_ACCESS_KEY, and PRISMA_SECRET_KEY.")
+
+    with JobJournal() as journal:
+        if args.resume:
+            try:
+                job = journal.load_job(args.resume, JOB_KIND)
+            except ValueError as e:
+                parser.error(str(e))
+            repo_type = job['params']['type']
+            job_id = job['job_id']
+            pending = [(item_id, (data['name'], data['integrationId'])) for item_id, data in journal.items(job_id)]
+        else:
+            repo_type = args.type
+            entries = read_repository_list(args.file)
+            invalid = invalid_repository_names([name for name, _ in entries], repo_type)
+            if invalid:
+                print(f"The following repositories are not in the correct format for {repo_type}:")
+                for name in invalid:
+                    print(f"  - {name}")
+                sys.exit(1)
+            job_id = None
+            pending = None
+
+        auth_token = get_auth_token(api_url, username, password)
+        onboarded = onboarded_repositories(api_url, auth_token, repo_type)
+
+        if pending is not None:
+            missing = []
+            for item_id, (name, integration_id) in pending:
+                if name.lower() in onboarded:
+                    journal.mark(job_id, item_id, SKIPPED)
+                else:
+                    missing.append((name, integration_id))
+            print(f"Resuming job {job_id}: {len(missing)} {repo_type} repositories left to onboard")
+        else:
+            missing = [(name, integration_id) for name, integration_id in entries if name.lower() not in onboarded]
+            print(f"Repositories in {args.file}: {len(entries)}")
+            print(f"Already onboarded: {len(entries) - len(missing)}")
+            print(f"To onboard: {len(missing)}")
+            if args.dry_run:
+                for name, integration_id in missing:
+                    print(f"  - {name}" + (f" ({integration_id})" if integration_id else ""))
+                return
+            if not missing:
+                return
+            if any(integration_id is None for _, integration_id in missing):
+                default_integration = args.integration_id or choose_integration(get_integrations(api_url, auth_token, repo_type), repo_type)
+                missing = [(name, integration_id or default_integration) for name, integration_id in missing]
+            if not args.yes:
+                confirm = input(f"Onboard {len(missing)} {repo_type} repositories? (y/n): ").lower()
+                if confirm != 'y':
+                    print("Aborted")
+                    return
+            job_id = journal.create_job(JOB_KIND, {'type': repo_type, 'file': args.file}, (
+                (f"{integration_id}/{name}", {'name': name, 'integrationId': integration_id}, PLANNED)
+                for name, integration_id in missing
+            ))
+            print(f"Job {job_id}")
+
+        batches = make_batches(missing, args.batch_size)
+        print(f"Onboarding {len(missing)} repositories in {len(batches)} batches with concurrency {args.concurrency}...")
+        results = onboard_batches(api_url, auth_token, batches, args.concurrency, journal, job_id)
+        if batches:
+            invalidate_repository_cache(api_url)
+        summarize_results(results, lambda batch: f"{len(batch['names'])} repositories via {batch['integrationId']} starting with {batch['names'][0]}")
+
+        status = journal.finish(job_id)
+        counts = journal.counts(job_id)
+        print(f"\nJob {job_id}: " + ', '.join(f"{state} {count}" for state, count in sorted(counts.items())))
+        if status != 'completed':
+            print(f"Rerun the remaining repositories with --resume {job_id}")
+
+if __name__ == "__main__":
+    main()
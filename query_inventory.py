@@ -0,0 +1,100 @@
+"""
+Prisma Cloud Inventory Queries
+
+Builds an indexed in-memory graph of repositories, CI pipelines, pipeline risks,
+suppressions and enforcement rules, and answers cross-entity questions from it.
+The data is fetched live (concurrently, with one login) or read from a snapshot
+written by get_tenant_snapshot.py.
+
+Usage:
+1. Repositories and their CI apps:
+   python query_inventory.py repo-apps
+
+2. Open pipeline risks with no matching suppression:
+   python query_inventory.py --snapshot snapshot.json unsuppressed-risks --severity critical
+
+3. Repositories under an enforcement rule that were not scanned in 30 days:
+   python query_inventory.py stale-under-rule --rule <rule_id> --days 30
+
+4. Count records of an entity by a field:
+   python query_inventory.py group --entity pipeline_risks --by severity
+"""
+
+import argparse
+import os
+from utils.get_prisma_token import get_auth_token
+from utils.inventory_graph import InventoryGraph
+from utils.tenant_snapshot import fetch_tenant_snapshot, load_snapshot
+
+GRAPH_ENDPOINTS = ['repositories', 'pipeline_tools', 'pipeline_risks', 'suppression_rules', 'enforcement_rules']
+
+def load_graph(snapshot_path=None):
+    if snapshot_path:
+        snapshot = load_snapshot(snapshot_path)
+    else:
+        api_url = os.environ.get('PRISMA_API_URL')
+        username = os.environ.get('PRISMA_ACCESS_KEY')
+        password = os.environ.get('PRISMA_SECRET_KEY')
+
+        if not all([api_url, username, password]):
+            raise ValueError("One or more required environment variables are not set. Please set PRISMA_API_URL, PRISMA_ACCESS_KEY, and PRISMA_SECRET_KEY.")
+
+        auth_token = get_auth_token(api_url, username, password)
+        snapshot = fetch_tenant_snapshot(api_url, auth_token, GRAPH_ENDPOINTS)
+    for name, error in snapshot['errors'].items():
+        print(f"Warning: {name} unavailable ({error})")
+    return InventoryGraph(snapshot['data'])
+
+def main():
+    parser = argparse.ArgumentParser(description="Run cross-entity queries over a Prisma Cloud tenant inventory.")
+    parser.add_argument("--snapshot", help="Read data from a get_tenant_snapshot.py output instead of the API")
+    subparsers = parser.add_subparsers(dest="query", required=True)
+
+    subparsers.add_parser("repo-apps", help="Repositories and the CI apps associated with them")
+
+    risks_parser = subparsers.add_parser("unsuppressed-risks", help="Open pipeline risks without a matching suppression")
+    risks_parser.add_argument("--severity", help="Only risks of this severity")
+
+    stale_parser = subparsers.add_parser("stale-under-rule", help="Repositories under an enforcement rule with stale scans")
+    stale_parser.add_argument("--rule", required=True, help="Enforcement rule ID")
+    stale_parser.add_argument("--days", type=int, required=True, help="Number of days since the last scan")
+
+    group_parser = subparsers.add_parser("group", help="Count records of an entity by a field")
+    group_parser.add_argument("--entity", required=True, choices=GRAPH_ENDPOINTS, help="Entity to count")
+    group_parser.add_argument("--by", required=True, help="Field to group by")
+
+    args = parser.parse_args()
+
+    graph = load_graph(args.snapshot)
+
+    if args.query == "repo-apps":
+        for repo, apps in graph.repo_apps():
+            print(f"\nRepository: {repo.get('repository')} (ID: {repo['id']})")
+            if apps:
+                for app in apps:
+                    print(f"  - {app}")
+            else:
+                print("  No associated appNames found")
+
+    elif args.query == "unsuppressed-risks":
+        results = graph.unsuppressed_risks(args.severity)
+        for repo, risk in results:
+            repo_name = repo.get('repository') if repo else risk.get('repoId')
+            print(f"- {repo_name}: {risk.get('policyId')} {risk.get('name')} (Severity: {risk.get('severity')}, Open Alerts: {risk.get('openAlerts')})")
+        print(f"\nTotal unsuppressed risks: {len(results)}")
+
+    elif args.query == "stale-under-rule":
+        if args.rule not in graph.rules_by_id:
+            print(f"Enforcement rule '{args.rule}' not found.")
+            return
+        repos = graph.stale_repositories_under_rule(args.rule, args.days)
+        for repo in repos:
+            print(f"- {repo.get('repository')} (Last scanned: {repo.get('lastScanDate') or 'never'} source: {repo.get('source')})")
+        print(f"\nTotal repositories found: {len(repos)}")
+
+    elif args.query == "group":
+        for value, count in graph.group_count(args.entity, args.by):
+            print(f"{value}: {count}")
+
+if __name__ == "__main__":
+    main()
@@ -23,17 +23,53 @@ Usage:
 3. Set branch in interactive mode:
    python set_prisma_repo_branches.py --branch main --interactive
 
-The script will create a timestamped JSON file with the current branch information
-for all repositories before making any changes.
+4. Set branch for all repositories, 16 requests in flight, at most 20 requests per second:
+   python set_prisma_repo_branches.py --branch main --concurrency 16 --rate 20
+
+5. Resume an interrupted or partly failed run, or list the recorded runs:
+   python set_prisma_repo_branches.py --resume 20240601-120000-a1b2c3
+   python set_prisma_repo_branches.py --list-jobs
+
+6. List the branch snapshots, compare two of them, or roll back to one:
+   python set_prisma_repo_branches.py --list-snapshots
+   python set_prisma_repo_branches.py --diff 20240601-120000-a1b2c3 latest
+   python set_prisma_repo_branches.py --restore 20240601-120000-a1b2c3
+
+The script records the current branch information of all repositories as a snapshot
+in the branch archive (prisma_branch_snapshots.db) before making any changes; only the
+repositories that changed since the previous snapshot are stored. Every run that changes
+branches is recorded as a job in the journal (prisma_jobs.db): repositories already on
+the target branch are skipped, and each update is marked done or failed as soon as it
+completes.
 """
 
+if __name__ == "__main__":
+    # Hand the command to a running agent (utils/agent.py) before the imports below.
+    from utils.agent import run_in_agent
+    run_in_agent("set_scanned_branch.py")
+
 import requests
 import argparse
 import os
-import json
-from datetime import datetime
 from utils.get_prisma_token import get_auth_token
-from utils.get_repo import get_repo_scanned
+from utils.inventory_cache import DEFAULT_TTL, iter_cached_repositories, invalidate_repository_cache
+from utils.prisma_client import get_client
+from utils.bulk import run_concurrently, summarize_results
+from utils.job_journal import DONE, FAILED, PLANNED, SKIPPED, JobJournal, print_jobs
+from utils.branch_archive import BranchArchive, print_diff, print_snapshots, restore_plan
+
+JOB_KIND = 'set_scanned_branch'
+RESTORE_CONCURRENCY = 8
+
+def post_repository_branch(api_url, auth_token, repo_id, branch):
+    """
+    Set the scanning branch for a specific repository, raising on failure.
+
+    Raises:
+    requests.exceptions.RequestException: If the API request fails.
+    """
+    client = get_client(api_url, auth_token)
+    client.post(f"/bridgecrew/api/v1/branches/{repo_id}/scannedBranch/{branch}", headers={'Content-Type': 'application/json'})
 
 def set_repository_branch(api_url, auth_token, repo_id, branch):
     """
@@ -48,48 +84,124 @@ def set_repository_branch(api_url, auth_token, repo_id, branch):
     Returns:
     bool: True if the branch was successfully set, False otherwise.
     """
-    headers = {
-        'Accept': 'application/json',
-        'Content-Type': 'application/json',
-        "Authorization": f"Bearer {auth_token}"
-    }
-
     try:
-        response = requests.post(f"{api_url}/bridgecrew/api/v1/branches/{repo_id}/scannedBranch/{branch}", headers=headers)
-        response.raise_for_status()
+        post_repository_branch(api_url, auth_token, repo_id, branch)
         return True
     except requests.exceptions.RequestException as e:
         print(f"Error setting branch for repository {repo_id}: {e}")
         return False
 
-def save_repository_branches(repositories):
+def save_repository_branches(api_url, repositories):
     """
-    Save the repository information in the order: source, owner, defaultBranch.
-    Include the total number of repositories listed.
+    Save the source, owner and defaultBranch of the repositories as a snapshot in the branch archive.
 
     Args:
+    api_url (str): The base URL for the Prisma Cloud API.
     repositories (list): A list of dictionaries containing repository information.
+
+    Returns:
+    str: The snapshot ID.
     """
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"repository_branches_{timestamp}.json"
-    
-    repo_info = {
-        repo['repository']: {
-            'source': repo.get('source', 'Unknown'),
-            'owner': repo.get('owner', 'Unknown'),
-            'defaultBranch': repo.get('defaultBranch', 'N/A')
-        } for repo in repositories
-    }
-    
-    output_data = {
-        "total_repositories": len(repositories),
-        "repositories": repo_info
-    }
-    
-    with open(filename, 'w') as f:
-        json.dump(output_data, f, indent=2)
-    
-    print(f"Repository information saved to {filename}")
+    with BranchArchive(api_url) as archive:
+        snapshot_id, changed = archive.save(repositories)
+        print(f"Branches of {len(repositories)} repositories saved as snapshot {snapshot_id} in {archive.path} "
+              f"({changed} changed since the previous snapshot)")
+    return snapshot_id
+
+def confirm_repositories(repositories):
+    """
+    Show each repository and ask whether its branch should be changed.
+
+    Args:
+    repositories (list): A list of dictionaries containing repository information.
+
+    Returns:
+    list: The repositories that were approved.
+    """
+    approved = []
+    for repo in repositories:
+        print(f"\nRepository: {repo['repository']}")
+        print(f"ID: {repo['id']}")
+        print(f"Source: {repo.get('source', 'Unknown')}")
+        print(f"Owner: {repo.get('owner', 'Unknown')}")
+        confirm = input(f"Change branch for this repository? (y/n): ").lower()
+        if confirm == 'y':
+            approved.append(repo)
+        else:
+            print(f"Skipped")
+    return approved
+
+def set_repository_branches(api_url, auth_token, repositories, branch, concurrency, rate=None, journal=None, job_id=None):
+    """
+    Set the scanning branch for many repositories in parallel.
+
+    Args:
+    api_url (str): The base URL for the Prisma Cloud API.
+    auth_token (str): The authentication token for API requests.
+    repositories (list): A list of dictionaries containing repository information.
+    branch (str): The name of the branch to set.
+    concurrency (int): Maximum number of requests in flight.
+    rate (float): Optional cap on requests started per second.
+    journal (JobJournal): Optional journal in which each outcome is recorded as it happens.
+    job_id (str): The journal job the repositories belong to.
+
+    Returns:
+    list: (repository, result, error) tuples; error is None on success.
+    """
+    def update(repo):
+        try:
+            post_repository_branch(api_url, auth_token, repo['id'], branch)
+        except requests.exceptions.RequestException as e:
+            if journal:
+                journal.mark(job_id, repo['id'], FAILED, str(e))
+            raise
+        if journal:
+            journal.mark(job_id, repo['id'], DONE)
+
+    return run_concurrently(update, repositories, concurrency=concurrency, rate=rate)
+
+def restore_repository_branches(api_url, auth_token, plan, concurrency, rate=None):
+    """
+    Apply (repository, branch) changes from restore_plan() in parallel.
+
+    Returns:
+    list: ((repository, branch), result, error) tuples; error is None on success.
+    """
+    return run_concurrently(lambda change: post_repository_branch(api_url, auth_token, change[0]['id'], change[1]),
+                            plan, concurrency=concurrency, rate=rate)
+
+def journal_record(repo):
+    return {key: repo.get(key) for key in ('id', 'repository', 'source', 'owner', 'defaultBranch')}
+
+def plan_branch_job(journal, repositories, branch):
+    """
+    Record a job setting `branch` on repositories; those already on it are recorded as skipped.
+
+    Returns:
+    tuple: (job ID, repositories that need an update).
+    """
+    pending = [repo for repo in repositories if repo.get('defaultBranch') != branch]
+    pending_ids = {repo['id'] for repo in pending}
+    job_id = journal.create_job(JOB_KIND, {'branch': branch}, (
+        (repo['id'], journal_record(repo), PLANNED if repo['id'] in pending_ids else SKIPPED)
+        for repo in repositories
+    ))
+    return job_id, pending
+
+def resume_branch_job(journal, job_id, inventory, branch):
+    """
+    Return the planned and failed repositories of a job that still need an update.
+
+    Repositories whose defaultBranch in the current inventory already equals
+    `branch` are marked skipped instead of being updated again.
+    """
+    pending = []
+    for repo_id, repo in journal.items(job_id):
+        if inventory.get(repo_id, {}).get('defaultBranch') == branch:
+            journal.mark(job_id, repo_id, SKIPPED)
+        else:
+            pending.append(repo)
+    return pending
 
 def main():
     """
@@ -100,61 +212,150 @@ def main():
     parser.add_argument("--interactive", action="store_true", help="Prompt for confirmation before changing each repository's branch")
     parser.add_argument("--scan-only", action="store_true", help="Only scan and save existing branches without making changes")
     parser.add_argument("--repository", type=str, help="Specific repository to update")
+    parser.add_argument("--concurrency", type=int, help=f"Number of branch updates to send in parallel (default: 1, or {RESTORE_CONCURRENCY} with --restore)")
+    parser.add_argument("--rate", type=float, help="Maximum number of branch updates started per second")
+    parser.add_argument("--cache-ttl", type=int, default=DEFAULT_TTL, help=f"Seconds to reuse the local repository cache (default: {DEFAULT_TTL})")
+    parser.add_argument("--refresh", action="store_true", help="Download the repository list even if the local cache is fresh")
+    parser.add_argument("--resume", metavar="JOB_ID", help="Retry the planned and failed repositories of an earlier job")
+    parser.add_argument("--list-jobs", action="store_true", help="List the jobs recorded in the journal and exit")
+    parser.add_argument("--list-snapshots", action="store_true", help="List the branch snapshots recorded in the archive and exit")
+    parser.add_argument("--diff", nargs="+", metavar="SNAPSHOT", help="Show the repositories that differ between two snapshots (the second defaults to latest) and exit")
+    parser.add_argument("--restore", metavar="SNAPSHOT", help="Set every repository whose branch differs from a snapshot back to the branch in the snapshot")
     
     args = parser.parse_args()
 
-    if not args.scan_only and not args.branch:
+    if args.list_jobs:
+        with JobJournal() as journal:
+            print_jobs(journal, JOB_KIND)
+        return
+    if args.resume and (args.scan_only or args.repository or args.interactive):
+        parser.error("--resume cannot be combined with --scan-only, --repository or --interactive")
+    if args.restore and (args.branch or args.scan_only or args.resume or args.interactive):
+        parser.error("--restore cannot be combined with --branch, --scan-only, --resume or --interactive")
+    if args.diff and len(args.diff) > 2:
+        parser.error("--diff takes one or two snapshots")
+    if not args.scan_only and not args.branch and not args.resume and not args.restore and not args.diff and not args.list_snapshots:
         parser.error("--branch is required when not using --scan-only")
+    if args.concurrency is not None and args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    concurrency = args.concurrency or (RESTORE_CONCURRENCY if args.restore else 1)
 
     api_url = os.environ.get('PRISMA_API_URL')
     username = os.environ.get('PRISMA_ACCESS_KEY')
     password = os.environ.get('PRISMA_SECRET_KEY')
 
+    if (args.list_snapshots or args.diff) and api_url:
+        # Snapshots are read from the local archive; no login needed.
+        with BranchArchive(api_url) as archive:
+            if args.list_snapshots:
+                return print_snapshots(archive)
+            try:
+                old_id, new_id = (archive.resolve(snapshot) for snapshot in (args.diff + ['latest'])[:2])
+            except ValueError as e:
+                parser.error(str(e))
+            print(f"Changes from {old_id} to {new_id}:")
+            return print_diff(archive.diff(old_id, new_id))
+
     if not all([api_url, username, password]):
         raise ValueError("One or more required environment variables are not set. Please set PRISMA_API_URL, PRISMA_ACCESS_KEY, and PRISMA_SECRET_KEY.")
 
-    auth_token = get_auth_token(api_url, username, password)
-    
-    repositories = get_repo_scanned(api_url, auth_token)
-    
-    if repositories:
-        if args.repository:
-            repositories = [repo for repo in repositories if repo['repository'] == args.repository]
-            if not repositories:
+    if args.restore:
+        with BranchArchive(api_url) as archive:
+            try:
+                snapshot_id = archive.resolve(args.restore)
+            except ValueError as e:
+                parser.error(str(e))
+            target = archive.entries(snapshot_id)
+        auth_token = get_auth_token(api_url, username, password)
+        all_repositories = list(iter_cached_repositories(api_url, auth_token, args.cache_ttl, args.refresh))
+        repositories = [repo for repo in all_repositories if not args.repository or repo['repository'] == args.repository]
+        # Snapshot the current state of every repository first, so the restore itself can be rolled back.
+        save_repository_branches(api_url, all_repositories)
+        plan = restore_plan(target, repositories)
+        if not plan:
+            print(f"All repositories already match snapshot {snapshot_id}.")
+            return
+        print(f"\nRestoring {len(plan)} repositories to their branches in snapshot {snapshot_id} with concurrency {concurrency}...")
+        results = restore_repository_branches(api_url, auth_token, plan, concurrency, args.rate)
+        invalidate_repository_cache(api_url)
+        if summarize_results(results, lambda change: f"{change[0]['repository']} (ID: {change[0]['id']}) -> '{change[1]}'"):
+            print(f"Rerun --restore {snapshot_id} to retry the repositories that failed")
+        return
+
+    if not args.resume:
+        branch = args.branch
+        auth_token = get_auth_token(api_url, username, password)
+
+        all_repositories = list(iter_cached_repositories(api_url, auth_token, args.cache_ttl, args.refresh))
+        repositories = [repo for repo in all_repositories if not args.repository or repo['repository'] == args.repository]
+
+        if not repositories:
+            if args.repository:
                 print(f"Repository '{args.repository}' not found.")
-                return
-        
-        save_repository_branches(repositories)
-        
+            else:
+                print("No repositories found or an error occurred.")
+            return
+
+        # Snapshots always cover the whole inventory; a filtered one would record the others as removed.
+        save_repository_branches(api_url, all_repositories)
+
         if args.scan_only:
             print("Scan completed. Repository branches have been saved.")
             return
 
-        print(f"Setting branch '{args.branch}' for repositories:")
-        for repo in repositories:
-            repo_id = repo['id']
-            repo_name = repo['repository']
-            repo_source = repo.get('source', 'Unknown')
-            repo_owner = repo.get('owner', 'Unknown')
-            
-            print(f"\nRepository: {repo_name}")
-            print(f"ID: {repo_id}")
-            print(f"Source: {repo_source}")
-            print(f"Owner: {repo_owner}")
-            
-            if args.interactive:
-                confirm = input(f"Change branch for this repository? (y/n): ").lower()
-                if confirm != 'y':
-                    print(f"Skipped")
+        if args.interactive:
+            repositories = confirm_repositories(repositories)
+
+    # The journal is only opened by runs that change branches.
+    with JobJournal() as journal:
+        if args.resume:
+            try:
+                job = journal.load_job(args.resume, JOB_KIND)
+            except ValueError as e:
+                parser.error(str(e))
+            branch = job['params']['branch']
+            if args.branch and args.branch != branch:
+                parser.error(f"Job {args.resume} sets branch '{branch}', not '{args.branch}'")
+            auth_token = get_auth_token(api_url, username, password)
+            inventory = {repo['id']: repo for repo in iter_cached_repositories(api_url, auth_token, args.cache_ttl, args.refresh)}
+            job_id = job['job_id']
+            repositories = resume_branch_job(journal, job_id, inventory, branch)
+            print(f"Resuming job {job_id}: {len(repositories)} repositories left to update to '{branch}'")
+        else:
+            job_id, pending = plan_branch_job(journal, repositories, branch)
+            print(f"\nJob {job_id}: {len(pending)} repositories to update, {len(repositories) - len(pending)} already on '{branch}'")
+            repositories = pending
+
+        if concurrency > 1 or args.rate:
+            print(f"\nSetting branch '{branch}' for {len(repositories)} repositories with concurrency {concurrency}...")
+            results = set_repository_branches(api_url, auth_token, repositories, branch, concurrency, args.rate, journal, job_id)
+            summarize_results(results, lambda repo: f"{repo['repository']} (ID: {repo['id']})")
+        else:
+            print(f"Setting branch '{branch}' for repositories:")
+            for repo in repositories:
+                repo_id = repo['id']
+
+                print(f"\nRepository: {repo['repository']}")
+                print(f"ID: {repo_id}")
+                print(f"Source: {repo.get('source', 'Unknown')}")
+                print(f"Owner: {repo.get('owner', 'Unknown')}")
+
+                try:
+                    post_repository_branch(api_url, auth_token, repo_id, branch)
+                except requests.exceptions.RequestException as e:
+                    journal.mark(job_id, repo_id, FAILED, str(e))
+                    print(f"Error setting branch for repository {repo_id}: {e}")
+                    print(f"Failed to set branch")
                     continue
-            
-            if set_repository_branch(api_url, auth_token, repo_id, args.branch):
-                print(f"Branch set successfully to '{args.branch}'")
-            else:
-                print(f"Failed to set branch")
+                journal.mark(job_id, repo_id, DONE)
+                print(f"Branch set successfully to '{branch}'")
+
+        if repositories:
+            invalidate_repository_cache(api_url)
+        status = journal.finish(job_id)
         print(f"\nTotal repositories processed: {len(repositories)}")
-    else:
-        print("No repositories found or an error occurred.")
+        if status != 'completed':
+            print(f"Job {job_id} is incomplete; rerun the remaining repositories with --resume {job_id}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,29 @@
+import argparse
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+from mock_server import MockTenant, create_server
+
+@pytest.fixture
+def mock_api():
+    """
+    Start the mock API in a thread, with keyword arguments overriding its latency, throttle and error settings.
+
+    The mock ignores limit/offset and always returns the full repository list.
+    """
+    def start(repos, **options):
+        config = argparse.Namespace(**{'verbose': False, 'latency_ms': 0, 'throttle_rate': 0, 'error_rate': 0, 'retry_after': 0, **options})
+        server = create_server(MockTenant(repos), config)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    servers = []
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
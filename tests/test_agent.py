@@ -0,0 +1,43 @@
+import io
+import json
+
+import pytest
+
+import utils.get_prisma_token
+import utils.metrics
+from utils.agent import AgentServer
+
+@pytest.fixture
+def agent(tmp_path):
+    server = AgentServer(str(tmp_path / 'agent.sock'))
+    yield server
+    server.server_close()
+
+def run(agent, entry_point, cwd, *argv):
+    stdout = io.StringIO()
+    exit_code = agent.run_entry_point(entry_point, list(argv), str(cwd), (io.StringIO(), stdout, io.StringIO()))
+    return exit_code, stdout.getvalue()
+
+def test_module_main_runs_on_the_imported_module(agent, monkeypatch, tmp_path):
+    calls = []
+
+    def main():
+        calls.append(utils.get_prisma_token.__name__)
+        print("run", len(calls))
+    monkeypatch.setattr(utils.get_prisma_token, 'main', main)
+    assert run(agent, 'utils.get_prisma_token', tmp_path) == (0, "run 1\n")
+    assert run(agent, 'utils.get_prisma_token', tmp_path) == (0, "run 2\n")
+    assert calls == ['utils.get_prisma_token', 'utils.get_prisma_token']
+
+def test_metrics_are_written_after_each_run(agent, monkeypatch, tmp_path):
+    monkeypatch.setenv('PRISMA_METRICS_FILE', 'metrics.json')
+    monkeypatch.setattr(utils.metrics, '_export_registered', True)
+    monkeypatch.setattr(utils.metrics, 'METRICS', utils.metrics.RequestMetrics())
+
+    def main():
+        utils.metrics.METRICS.on_response('GET', '/code/api/v1/repositories', 200, 0.01, 0, 10)
+        raise SystemExit(3)
+    monkeypatch.setattr(utils.get_prisma_token, 'main', main)
+    assert run(agent, 'utils.get_prisma_token', tmp_path)[0] == 3
+    with open(tmp_path / 'metrics.json') as f:
+        assert [endpoint['calls'] for endpoint in json.load(f)] == [1]
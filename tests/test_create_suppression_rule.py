@@ -0,0 +1,43 @@
+import csv
+
+import requests
+
+from utils.create_suppression_rule import create_suppressions_bulk, group_suppression_rows, write_report
+
+def row(account_id, resource_id, **fields):
+    return {'accountId': account_id, 'resourceId': resource_id, **fields}
+
+def test_rows_are_grouped_by_policy_comment_and_expiration():
+    rows = [
+        row('org/a', 'main.tf:aws_s3_bucket.logs'),
+        row('org/a', 'main.tf:aws_s3_bucket.data', policyId='BC_GIT_2'),
+        row('org/b', 'main.tf:aws_s3_bucket.logs', policyId='BC_CICD_1'),
+        row('org/a', 'main.tf:aws_s3_bucket.data', comment='accepted'),
+        row('org/a', 'main.tf:aws_s3_bucket.data', comment='accepted', expiration='1700000000000'),
+    ]
+    batches = group_suppression_rows(rows, default_policy_id='BC_GIT_2')
+    assert [(batch['policyId'], batch['comment'], batch['expiration'], len(batch['rows'])) for batch in batches] == [
+        ('BC_GIT_2', '', '0', 2),
+        ('BC_CICD_1', '', '0', 1),
+        ('BC_GIT_2', 'accepted', '0', 1),
+        ('BC_GIT_2', 'accepted', '1700000000000', 1),
+    ]
+
+def test_duplicates_are_dropped_and_groups_split_into_batches():
+    rows = [row('org/a', f"main.tf:resource.{i % 5}") for i in range(10)]
+    batches = group_suppression_rows(rows, batch_size=2)
+    assert [[r['resourceId'] for r in batch['rows']] for batch in batches] == [
+        ['main.tf:resource.0', 'main.tf:resource.1'], ['main.tf:resource.2', 'main.tf:resource.3'], ['main.tf:resource.4'],
+    ]
+
+def test_bulk_creation_sends_one_request_per_batch(mock_api, tmp_path):
+    api_url = mock_api(0)
+    rows = [row('org/a', f"main.tf:resource.{i}") for i in range(5)] + [row('org/a', 'main.tf:resource.0', policyId='BC_CICD_1')]
+    outcomes = create_suppressions_bulk(api_url, "token", rows, concurrency=4, batch_size=2, default_policy_id='BC_CICD_9')
+    assert [(r['resourceId'], error) for r, error in outcomes] == [(f"main.tf:resource.{i}", None) for i in range(5)] + [('main.tf:resource.0', None)]
+    assert requests.get(f"{api_url}/__stats").json()['suppressions_created'] == 4
+
+    report = tmp_path / 'report.csv'
+    write_report(str(report), outcomes[:1], [rows[5]], default_policy_id='BC_CICD_9')
+    with open(report, newline='') as f:
+        assert [(r['policyId'], r['status']) for r in csv.DictReader(f)] == [('BC_CICD_1', 'exists'), ('BC_CICD_9', 'created')]
@@ -0,0 +1,76 @@
+import datetime
+import sys
+
+import pytest
+import requests
+
+import utils.delete_suppression_rule
+import utils.get_prisma_token
+from utils.delete_suppression_rule import filter_suppression_rules
+
+NOW = datetime.datetime.now(datetime.timezone.utc)
+
+RULES = [
+    {'id': 'old', 'policyId': 'BC_GIT_2', 'suppressionType': 'Resources', 'comment': 'temp: migration',
+     'creationDate': '2023-01-01T00:00:00Z', 'expirationDate': int((NOW - datetime.timedelta(days=1)).timestamp() * 1000)},
+    {'id': 'new', 'policyId': 'BC_GIT_2', 'suppressionType': 'Cves', 'comment': 'accepted',
+     'creationDate': '2024-06-01T00:00:00', 'expirationDate': (NOW + datetime.timedelta(days=30)).isoformat()},
+    {'id': 'undated', 'policyId': 'BC_CICD_1', 'suppressionType': 'Resources', 'comment': None},
+]
+
+def utc(value):
+    return datetime.datetime.fromisoformat(value).replace(tzinfo=datetime.timezone.utc)
+
+@pytest.mark.parametrize("filters, expected", [
+    ({}, ['old', 'new', 'undated']),
+    ({'policy_id': 'BC_GIT_2'}, ['old', 'new']),
+    ({'suppression_type': 'Resources'}, ['old', 'undated']),
+    ({'created_before': utc('2024-01-01')}, ['old']),
+    ({'created_after': utc('2024-01-01')}, ['new']),
+    ({'comment_regex': '^temp:'}, ['old']),
+    ({'expired': True}, ['old']),
+    ({'policy_id': 'BC_GIT_2', 'suppression_type': 'Cves', 'expired': True}, []),
+])
+def test_filters(filters, expected):
+    assert [rule['id'] for rule in filter_suppression_rules(RULES, **filters)] == expected
+
+@pytest.fixture
+def run(monkeypatch, tmp_path):
+    """
+    Run delete_suppression_rule.main() with arguments, from tmp_path.
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(utils.get_prisma_token, 'TOKEN_CACHE_FILE', str(tmp_path / 'token_cache.json'))
+
+    def start(*argv):
+        monkeypatch.setattr(sys, 'argv', ['delete_suppression_rule.py', *argv])
+        utils.delete_suppression_rule.main()
+    return start
+
+@pytest.mark.parametrize("argv, message", [
+    (['--dry-run'], "only apply with --bulk"),
+    (['--policy-id', 'BC_GIT_2'], "only apply with --bulk"),
+    (['--expired', '--yes'], "only apply with --bulk"),
+    (['--bulk'], "requires at least one filter"),
+    (['--bulk', '--dry-run'], "requires at least one filter"),
+])
+def test_bulk_guards(run, capsys, argv, message):
+    with pytest.raises(SystemExit) as exit_info:
+        run(*argv)
+    assert exit_info.value.code == 2
+    assert message in capsys.readouterr().err
+
+def test_bulk_dry_run_and_delete(run, mock_api, monkeypatch, capsys):
+    api_url = mock_api(400)
+    for name, value in (('PRISMA_API_URL', api_url), ('PRISMA_ACCESS_KEY', 'key'), ('PRISMA_SECRET_KEY', 'secret')):
+        monkeypatch.setenv(name, value)
+
+    run('--bulk', '--comment-regex', r'^Accepted risk 1\d$', '--dry-run')
+    out = capsys.readouterr().out
+    assert "Matching suppression rules: 10" in out
+    assert out.count("  - BC_CICD_") == 10
+    assert 'suppressions_deleted' not in requests.get(f"{api_url}/__stats").json()
+
+    run('--bulk', '--comment-regex', r'^Accepted risk 1\d$', '--yes', '--concurrency', '4')
+    assert "Succeeded: 10" in capsys.readouterr().out
+    assert requests.get(f"{api_url}/__stats").json()['suppressions_deleted'] == 10
@@ -0,0 +1,59 @@
+import time
+
+import mock_server
+import pytest
+import requests
+
+import utils.get_prisma_token
+from utils.get_prisma_token import TokenManager
+from utils.prisma_client import get_client
+
+@pytest.fixture(autouse=True)
+def token_cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(utils.get_prisma_token, 'TOKEN_CACHE_FILE', str(tmp_path / 'token_cache.json'))
+
+def stats(api_url):
+    return requests.get(f"{api_url}/__stats").json()
+
+@pytest.mark.parametrize("lifetime", [2, 0])
+def test_short_lived_token_is_not_refreshed_back_to_back(mock_api, monkeypatch, lifetime):
+    # A lifetime of 0 stands in for a client clock running ahead of the server's.
+    monkeypatch.setattr(mock_server, 'TOKEN_LIFETIME', lifetime)
+    api_url = mock_api(0)
+    manager = TokenManager(api_url, 'key', 'secret')
+    token = manager.get_token()
+    time.sleep(0.3)
+    assert manager.get_token() == token
+    assert stats(api_url)['logins'] == 1
+    if manager._timer:
+        manager._timer.cancel()
+
+class LoginClient:
+    def __init__(self, response):
+        self.response = response
+
+    def post_json(self, path, **kwargs):
+        return self.response
+
+@pytest.mark.parametrize("response", [{'message': 'SSO required'}, {'token': None}, []])
+def test_login_without_token_raises(monkeypatch, response):
+    monkeypatch.setattr(utils.get_prisma_token, 'get_client', lambda api_url: LoginClient(response))
+    with pytest.raises(ValueError, match="returned no token"):
+        TokenManager("http://login-without-token", 'key', 'secret').get_token()
+
+def test_login_does_not_send_stale_token(monkeypatch):
+    api_url = "http://login-header"
+    client = get_client(api_url, "stale-token")
+    sent = []
+
+    def send(request, **kwargs):
+        sent.append(request)
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b'{"token": "fresh-token"}'
+        response.request = request
+        return response
+    monkeypatch.setattr(client.session, 'send', send)
+    assert TokenManager(api_url, 'key', 'secret').get_token() == "fresh-token"
+    assert 'Authorization' not in sent[0].headers
+    assert client.session.headers['Authorization'] == "Bearer fresh-token"
@@ -0,0 +1,37 @@
+import itertools
+
+import pytest
+
+import utils.get_repo
+from utils.get_repo import iter_repositories
+
+class PagingClient:
+    """
+    Client stub honouring limit/offset over a fixed repository list.
+    """
+
+    def __init__(self, repos):
+        self.repos = repos
+        self.requests = 0
+
+    def stream_json_array(self, method, path, params=None):
+        self.requests += 1
+        return iter(self.repos[params['offset']:params['offset'] + params['limit']])
+
+def repo_ids(repos):
+    return [repo['id'] for repo in repos]
+
+@pytest.mark.parametrize("repos, page_size", [(10, 10), (20, 10), (10, 4)])
+def test_ignored_paging_params_yield_each_repository_once(mock_api, repos, page_size):
+    api_url = mock_api(repos)
+    # Bounded so a regression fails instead of hanging.
+    result = list(itertools.islice(iter_repositories(api_url, "mock-token", page_size=page_size), repos * 3 + 1))
+    assert repo_ids(result) == [f"repo-{i:06d}" for i in range(repos)]
+
+@pytest.mark.parametrize("repos, page_size, requests", [(20, 10, 3), (25, 10, 3), (0, 10, 1)])
+def test_honoured_paging_params(monkeypatch, repos, page_size, requests):
+    client = PagingClient([{'id': f"repo-{i}"} for i in range(repos)])
+    monkeypatch.setattr(utils.get_repo, 'get_client', lambda api_url, auth_token: client)
+    result = list(itertools.islice(iter_repositories("http://api", "token", page_size=page_size), repos * 3 + 1))
+    assert repo_ids(result) == [f"repo-{i}" for i in range(repos)]
+    assert client.requests == requests
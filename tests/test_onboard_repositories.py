@@ -0,0 +1,66 @@
+import sys
+
+import pytest
+import requests
+
+import onboard_repositories
+import utils.get_prisma_token
+from onboard_repositories import onboarded_repositories
+
+class ListingClient:
+    """
+    Client stub returning a fixed v2 repository listing.
+    """
+
+    def __init__(self, repos):
+        self.repos = repos
+
+    def stream_json_array(self, method, path, **kwargs):
+        assert (method, path) == ('GET', "/code/api/v2/repositories")
+        return iter(self.repos)
+
+def test_onboarded_repositories_use_full_names(monkeypatch):
+    client = ListingClient([
+        {'source': 'AzureRepos', 'owner': 'Contoso', 'repository': 'Api', 'fullName': 'Contoso/Payments/Api'},
+        {'source': 'AzureRepos', 'owner': 'Contoso', 'repository': 'Web', 'fullName': 'Contoso/Portal/Web'},
+        {'source': 'Github', 'owner': 'contoso', 'repository': 'Api'},
+    ])
+    monkeypatch.setattr(onboard_repositories, 'get_client', lambda api_url, auth_token: client)
+    assert onboarded_repositories("http://api", "token", 'AzureRepos') == {'contoso/payments/api', 'contoso/portal/web'}
+    assert onboarded_repositories("http://api", "token", 'github') == {'contoso/api'}
+
+@pytest.fixture
+def run(mock_api, monkeypatch, tmp_path):
+    """
+    Run onboard_repositories.main() against the mock API with a repository list, from tmp_path.
+    """
+    api_url = mock_api(10)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('PRISMA_API_URL', api_url)
+    monkeypatch.setenv('PRISMA_ACCESS_KEY', 'key')
+    monkeypatch.setenv('PRISMA_SECRET_KEY', 'secret')
+    monkeypatch.setattr(utils.get_prisma_token, 'TOKEN_CACHE_FILE', str(tmp_path / 'token_cache.json'))
+
+    def start(repo_type, names, *argv):
+        (tmp_path / 'repolist.txt').write_text('\n'.join(names) + '\n')
+        monkeypatch.setattr(sys, 'argv', ['onboard_repositories.py', '--type', repo_type, '--file', 'repolist.txt', '--yes', *argv])
+        onboard_repositories.main()
+        return requests.get(f"{api_url}/__stats").json().get('repositories_onboarded', 0)
+    return start
+
+def test_azure_repos_are_onboarded_once(run, capsys):
+    names = ['Contoso/Payments/Api', 'Contoso/Portal/Api']
+    assert run('AzureRepos', names) == 1
+    assert "To onboard: 2" in capsys.readouterr().out
+    assert run('AzureRepos', names + ['contoso/payments/API']) == 1
+    out = capsys.readouterr().out
+    assert "Already onboarded: 2" in out
+    assert "To onboard: 0" in out
+
+def test_dry_run_lists_only_missing_repositories(run, capsys):
+    assert run('Github', ['org-00/repo-000000', 'ORG-05/Repo-000005', 'org-01/new-repo'], '--dry-run') == 0
+    out = capsys.readouterr().out
+    assert "Already onboarded: 2" in out
+    assert "To onboard: 1" in out
+    assert out.count("  - ") == 1
+    assert "  - org-01/new-repo" in out
@@ -0,0 +1,25 @@
+import datetime
+
+from utils.inventory_graph import InventoryGraph
+from utils.policy_index import effective_rules
+
+REPOSITORIES = [{'id': f"repo-{i}", 'owner': 'team', 'repository': f"repo-{i}", 'lastScanDate': None} for i in range(4)]
+
+RULES = [
+    {'id': 'disabled', 'enabled': False, 'repositories': [{'accountId': 'repo-0'}]},
+    {'id': 'first', 'repositories': [{'accountId': 'repo-0'}, {'accountName': 'team/repo-1'}]},
+    {'id': 'default', 'enabled': True},
+    {'id': 'second', 'repositories': [{'id': 'repo-1'}, {'repoId': 'repo-2'}, {'accountId': 'repo-missing'}]},
+    {'id': 'other-default'},
+]
+
+def test_effective_rules():
+    assert effective_rules(RULES, REPOSITORIES) == {'repo-0': 'first', 'repo-1': 'first', 'repo-2': 'second', 'repo-3': 'default'}
+
+def test_stale_under_rule_agrees_with_the_policy_index():
+    graph = InventoryGraph({'repositories': REPOSITORIES, 'enforcement_rules': RULES})
+    now = datetime.datetime(2024, 6, 1, tzinfo=datetime.timezone.utc)
+    stale = {rule['id']: [repo['id'] for repo in graph.stale_repositories_under_rule(rule['id'], 30, now)] for rule in RULES}
+    assert stale == {'disabled': [], 'first': ['repo-0', 'repo-1'], 'default': ['repo-3'], 'second': ['repo-2'], 'other-default': []}
+    effective = effective_rules(RULES, REPOSITORIES)
+    assert {repo_id: rule_id for rule_id, repo_ids in stale.items() for repo_id in repo_ids} == effective
@@ -0,0 +1,22 @@
+import time
+
+import pytest
+import requests
+
+from utils.prisma_client import get_client
+from utils.rate_limit import BACKOFF_MAX
+
+REPOSITORIES_PATH = "/code/api/v1/repositories"
+
+def test_long_retry_after_fails_instead_of_sleeping(mock_api):
+    client = get_client(mock_api(1, throttle_rate=1, retry_after=3600), "token")
+    start = time.monotonic()
+    with pytest.raises(requests.exceptions.HTTPError, match="Retry-After of 3600s"):
+        client.get(REPOSITORIES_PATH)
+    assert time.monotonic() - start < 5
+    assert client.rate_limiter.bucket(REPOSITORIES_PATH).paused_until - time.monotonic() <= BACKOFF_MAX
+
+def test_short_retry_after_is_waited_out(mock_api):
+    client = get_client(mock_api(1, throttle_rate=1, retry_after=0.01), "token")
+    with pytest.raises(requests.exceptions.HTTPError, match="429"):
+        client.get(REPOSITORIES_PATH)
@@ -0,0 +1,29 @@
+from utils.risk_timeseries import connect, record_fetch, series
+
+DAY = 86400
+START = 100 * DAY
+
+def risk(repo_id, open_alerts):
+    return {'policyId': 'BC_CICD_1', 'repoId': repo_id, 'severity': 'HIGH', 'category': 'Flow Control',
+            'system': 'GitHub', 'totalAlerts': open_alerts, 'openAlerts': open_alerts}
+
+def test_out_of_order_fetch_does_not_zero_newer_values(tmp_path):
+    conn = connect(str(tmp_path / 'risks.db'))
+    record_fetch(conn, [risk('repo-a', 5), risk('repo-b', 3)], START + 1800)
+    record_fetch(conn, [risk('repo-a', 1), risk('repo-c', 2)], START + 60)
+    assert series(conn, 'repo', 'repo-a', granularity='hour') == [(START, 5)]
+    assert series(conn, 'repo', 'repo-b', granularity='hour') == [(START, 3)]
+    assert series(conn, 'repo', 'repo-b', granularity='day') == [(START, 3)]
+    assert series(conn, 'repo', 'repo-c', granularity='day') == [(START, 0)]
+    assert series(conn, 'repo', 'repo-c', metric='open_max', granularity='day') == [(START, 2)]
+    assert series(conn, 'all', metric='open', granularity='day') == [(START, 8)]
+    conn.close()
+
+def test_values_missing_from_a_newer_fetch_are_zeroed(tmp_path):
+    conn = connect(str(tmp_path / 'risks.db'))
+    record_fetch(conn, [risk('repo-a', 5), risk('repo-b', 3)], START + 60)
+    record_fetch(conn, [risk('repo-a', 4)], START + 120)
+    assert series(conn, 'repo', 'repo-b', granularity='day') == [(START, 0)]
+    assert series(conn, 'repo', 'repo-b', metric='open_max', granularity='day') == [(START, 3)]
+    assert series(conn, 'all', granularity='day') == [(START, 4)]
+    conn.close()
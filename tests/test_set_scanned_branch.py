@@ -0,0 +1,126 @@
+import sys
+import threading
+
+import pytest
+import requests
+
+import set_scanned_branch
+import utils.branch_archive
+from utils.branch_archive import BranchArchive, restore_plan
+from utils.job_journal import JobJournal
+
+API_URL = "http://api"
+
+REPOSITORIES = [
+    {'id': f"repo-{i}", 'repository': f"team/repo-{i}", 'source': 'Github', 'owner': 'team', 'defaultBranch': 'main'}
+    for i in range(5)
+]
+
+@pytest.fixture
+def run(monkeypatch, tmp_path):
+    """
+    Run set_scanned_branch.main() against a fixed inventory, with the archive and journal under tmp_path.
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('PRISMA_API_URL', API_URL)
+    monkeypatch.setenv('PRISMA_ACCESS_KEY', 'key')
+    monkeypatch.setenv('PRISMA_SECRET_KEY', 'secret')
+    monkeypatch.setattr(utils.branch_archive, 'ARCHIVE_FILE', str(tmp_path / 'snapshots.db'))
+    monkeypatch.setattr(set_scanned_branch, 'get_auth_token', lambda api_url, username, password: 'token')
+    monkeypatch.setattr(set_scanned_branch, 'iter_cached_repositories', lambda *args: iter(REPOSITORIES))
+
+    def start(*argv):
+        monkeypatch.setattr(sys, 'argv', ['set_scanned_branch.py', *argv])
+        set_scanned_branch.main()
+    return start
+
+def test_filtered_scan_archives_every_repository(run):
+    run('--scan-only')
+    run('--repository', 'team/repo-2', '--scan-only')
+    run('--scan-only')
+    with BranchArchive(API_URL) as archive:
+        first, filtered, last = [snapshot['snapshot_id'] for snapshot in reversed(archive.list_snapshots())]
+        assert len(archive.entries(filtered)) == len(REPOSITORIES)
+        assert archive.diff(first, filtered) == []
+        assert archive.diff(first, last) == []
+
+def test_filtered_scan_of_unknown_repository_archives_nothing(run, capsys):
+    run('--repository', 'team/missing', '--scan-only')
+    assert "Repository 'team/missing' not found." in capsys.readouterr().out
+    with BranchArchive(API_URL) as archive:
+        assert archive.list_snapshots() == []
+
+def test_scan_only_does_not_create_the_journal(run, tmp_path):
+    run('--scan-only')
+    assert not (tmp_path / 'prisma_jobs.db').exists()
+
+def test_branch_run_records_a_job(run, monkeypatch, tmp_path):
+    updates = []
+    monkeypatch.setattr(set_scanned_branch, 'post_repository_branch', lambda api_url, auth_token, repo_id, branch: updates.append((repo_id, branch)))
+    monkeypatch.setattr(set_scanned_branch, 'invalidate_repository_cache', lambda api_url: None)
+    run('--repository', 'team/repo-3', '--branch', 'develop')
+    assert updates == [('repo-3', 'develop')]
+    assert (tmp_path / 'prisma_jobs.db').exists()
+
+def test_concurrent_branch_run_journals_failures_for_resume(run, monkeypatch):
+    updates = []
+    lock = threading.Lock()
+    failing = {'repo-1'}
+
+    def post(api_url, auth_token, repo_id, branch):
+        with lock:
+            if repo_id in failing:
+                failing.discard(repo_id)
+                raise requests.exceptions.ConnectionError("connection reset")
+            updates.append(repo_id)
+    monkeypatch.setattr(set_scanned_branch, 'post_repository_branch', post)
+    monkeypatch.setattr(set_scanned_branch, 'invalidate_repository_cache', lambda api_url: None)
+    run('--branch', 'develop', '--concurrency', '4', '--rate', '1000')
+    assert sorted(updates) == ['repo-0', 'repo-2', 'repo-3', 'repo-4']
+    with JobJournal() as journal:
+        job = journal.list_jobs(set_scanned_branch.JOB_KIND)[0]
+        assert job['status'] != 'completed'
+        assert job['counts'] == {'done': 4, 'failed': 1}
+
+    run('--resume', job['job_id'], '--concurrency', '4')
+    assert sorted(updates) == ['repo-0', 'repo-1', 'repo-2', 'repo-3', 'repo-4']
+    with JobJournal() as journal:
+        assert journal.list_jobs(set_scanned_branch.JOB_KIND)[0]['counts'] == {'done': 5}
+
+def test_restore_plan_only_changes_repositories_that_moved():
+    snapshot = {
+        'repo-0': {'defaultBranch': 'main'},
+        'repo-1': {'defaultBranch': 'main'},
+        'repo-2': {'defaultBranch': 'N/A'},
+        'repo-3': {'defaultBranch': None},
+        'deleted': {'defaultBranch': 'main'},
+    }
+    current = [
+        {'id': 'repo-0', 'defaultBranch': 'develop'},
+        {'id': 'repo-1', 'defaultBranch': 'main'},
+        {'id': 'repo-2', 'defaultBranch': 'develop'},
+        {'id': 'repo-3', 'defaultBranch': 'develop'},
+        {'id': 'onboarded-later', 'defaultBranch': 'develop'},
+    ]
+    assert restore_plan(snapshot, current) == [(current[0], 'main')]
+
+def test_restore_sets_changed_branches_back_to_the_snapshot(run, monkeypatch, capsys):
+    run('--scan-only')
+    with BranchArchive(API_URL) as archive:
+        snapshot_id = archive.list_snapshots()[0]['snapshot_id']
+
+    moved = [dict(repo, defaultBranch='develop') if repo['id'] in ('repo-1', 'repo-3') else repo for repo in REPOSITORIES]
+    updates = []
+    monkeypatch.setattr(set_scanned_branch, 'iter_cached_repositories', lambda *args: iter(moved))
+    monkeypatch.setattr(set_scanned_branch, 'post_repository_branch', lambda api_url, auth_token, repo_id, branch: updates.append((repo_id, branch)))
+    monkeypatch.setattr(set_scanned_branch, 'invalidate_repository_cache', lambda api_url: None)
+    run('--restore', snapshot_id)
+    assert sorted(updates) == [('repo-1', 'main'), ('repo-3', 'main')]
+    with BranchArchive(API_URL) as archive:
+        # The state before the restore is snapshotted so the restore can itself be rolled back.
+        assert len(archive.list_snapshots()) == 2
+
+    monkeypatch.setattr(set_scanned_branch, 'iter_cached_repositories', lambda *args: iter(REPOSITORIES))
+    run('--restore', snapshot_id)
+    assert len(updates) == 2
+    assert f"All repositories already match snapshot {snapshot_id}." in capsys.readouterr().out
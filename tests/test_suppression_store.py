@@ -0,0 +1,81 @@
+import json
+import time
+
+import pytest
+import requests
+
+import utils.suppression_store
+from utils.create_suppression_rule import split_existing_rows
+from utils.delete_suppression_rule import invalidate_suppression_store
+from utils.suppression_store import SuppressionStore
+
+API_URL = "http://api"
+FUTURE = int((time.time() + 86400) * 1000)
+PAST = int((time.time() - 86400) * 1000)
+
+SUPPRESSIONS = [
+    {'id': 'resource', 'policyId': 'BC_GIT_2', 'suppressionType': 'Resources', 'expirationDate': FUTURE,
+     'resources': [{'accountId': 'org/a', 'resourceId': 'main.tf:aws_s3_bucket.logs'}]},
+    {'id': 'account', 'policyId': 'BC_GIT_3', 'suppressionType': 'Accounts', 'accountIds': ['org/b']},
+    {'id': 'policy', 'policyId': 'BC_GIT_4', 'suppressionType': 'Policy'},
+    {'id': 'expired', 'policyId': 'BC_GIT_5', 'suppressionType': 'Resources', 'expirationDate': PAST,
+     'resources': [{'accountId': 'org/a', 'resourceId': 'main.tf:aws_s3_bucket.logs'}]},
+]
+
+class SuppressionsClient:
+    """
+    Client stub serving a suppression list.
+    """
+
+    def __init__(self, rules):
+        self.rules = rules
+
+    def get(self, path, headers=None, stream=False):
+        response = requests.Response()
+        response.status_code = 200
+        response._content = json.dumps(self.rules).encode()
+        response._content_consumed = True
+        return response
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    client = SuppressionsClient(SUPPRESSIONS)
+    monkeypatch.setattr(utils.suppression_store, 'get_client', lambda api_url, auth_token: client)
+    monkeypatch.setattr(utils.suppression_store, 'STORE_FILE', str(tmp_path / 'suppressions.db'))
+    with SuppressionStore(API_URL) as store:
+        store.sync("token")
+        yield store
+
+@pytest.mark.parametrize("policy_id, account_id, resource, expected", [
+    ('BC_GIT_2', 'org/a', 'main.tf:aws_s3_bucket.logs', True),
+    ('BC_GIT_2', 'org/a', 'main.tf:aws_s3_bucket.data', False),
+    ('BC_GIT_2', 'org/b', 'main.tf:aws_s3_bucket.logs', False),
+    ('BC_GIT_2', 'org/a', None, False),
+    ('BC_GIT_3', 'org/b', 'any.tf:resource', True),
+    ('BC_GIT_3', 'org/b', None, True),
+    ('BC_GIT_3', 'org/a', 'any.tf:resource', False),
+    ('BC_GIT_4', 'org/c', 'any.tf:resource', True),
+    ('BC_GIT_5', 'org/a', 'main.tf:aws_s3_bucket.logs', False),
+])
+def test_is_suppressed(store, policy_id, account_id, resource, expected):
+    assert store.is_suppressed(policy_id, account_id, resource) is expected
+
+def test_split_existing_rows(store):
+    rows = [
+        {'accountId': 'org/a', 'resourceId': 'main.tf:aws_s3_bucket.logs'},
+        {'accountId': 'org/a', 'resourceId': 'main.tf:aws_s3_bucket.logs', 'policyId': 'BC_GIT_5'},
+        {'accountId': 'org/b', 'resourceId': 'main.tf:aws_s3_bucket.logs', 'policyId': 'BC_GIT_3'},
+    ]
+    new_rows, existing_rows = split_existing_rows(store, rows, default_policy_id='BC_GIT_2')
+    assert new_rows == [rows[1]]
+    assert existing_rows == [rows[0], rows[2]]
+
+def test_sync_drops_removed_suppressions(store):
+    utils.suppression_store.get_client(API_URL, "token").rules = SUPPRESSIONS[1:]
+    assert store.sync("token") == {'added': 0, 'updated': 0, 'removed': 1}
+    assert not store.is_suppressed('BC_GIT_2', 'org/a', 'main.tf:aws_s3_bucket.logs')
+
+def test_deleting_rules_invalidates_the_store(store):
+    assert store.refresh_if_stale("token") is None
+    invalidate_suppression_store(API_URL)
+    assert store.refresh_if_stale("token") == {'added': 0, 'updated': 0, 'removed': 0}
@@ -0,0 +1,40 @@
+import pytest
+
+import utils.tag_resolver
+from utils.tag_resolver import TagResolver
+
+RULES = [
+    {'id': 'tag-all', 'isEnabled': True, 'definition': {'paths': []}},
+    {'id': 'tag-infra', 'isEnabled': True, 'repositories': [{'id': 'repo-1'}], 'definition': {'paths': ['infra/']}},
+    {'id': 'tag-off', 'isEnabled': False},
+]
+
+PAIRS = [('repo-1', 'infra/main.tf'), ('repo-1', './infra/main.tf'), ('repo-2', 'README.md')]
+
+@pytest.fixture(autouse=True)
+def tag_rules(monkeypatch):
+    fetches = []
+
+    def get_tags(api_url, auth_token):
+        fetches.append(api_url)
+        return RULES
+    monkeypatch.setattr(utils.tag_resolver, 'get_tags', get_tags)
+    return fetches
+
+def test_resolve_many_counts_each_call(tag_rules):
+    resolver = TagResolver("http://api", "token")
+    first, second = {}, {}
+    results = resolver.resolve_many(PAIRS, stats=first)
+    resolver.resolve_many(PAIRS, stats=second)
+    assert [rule_ids for _, _, rule_ids in results] == [('tag-infra', 'tag-all'), ('tag-infra', 'tag-all'), ('tag-all',)]
+    assert first == {'hits': 1, 'misses': 2}
+    assert second == {'hits': 3, 'misses': 0}
+    assert len(tag_rules) == 1
+
+def test_resolve_many_counts_after_a_refetch(tag_rules):
+    resolver = TagResolver("http://api", "token", ttl=0)
+    resolver.resolve_many(PAIRS[:1])
+    stats = {}
+    resolver.resolve_many(PAIRS, stats=stats)
+    assert stats == {'hits': 1, 'misses': 2}
+    assert len(tag_rules) == 2
@@ -0,0 +1,353 @@
+"""
+Prisma API agent
+
+Resident process that keeps the Python imports, the login token, the pooled HTTP
+connections and the repository cache warm, and runs the scripts of this repository
+on behalf of thin clients connecting over a Unix socket.
+
+When the agent is running, the entry points (get_repo_lastscanned, set_scanned_branch.py
+and the utils scripts) pass their arguments, working directory and stdin/stdout/stderr
+file descriptors to it and exit with the status of the run, without importing requests
+or logging in themselves. When no agent is listening, or it was started with different
+PRISMA_* settings, they run locally as before.
+
+Usage:
+1. Start the agent (in the foreground, e.g. under systemd or nohup):
+   python -m utils.agent serve
+
+2. Show its state, or stop it:
+   python -m utils.agent status
+   python -m utils.agent stop
+
+Set PRISMA_AGENT=off to make the scripts ignore a running agent, and PRISMA_AGENT_SOCKET
+to use another socket path (default: ~/.prisma_api_scripts/agent.sock).
+"""
+
+import argparse
+import importlib
+import json
+import logging
+import os
+import runpy
+import socket
+import socketserver
+import sys
+import threading
+import time
+import traceback
+
+SOCKET_PATH = os.environ.get('PRISMA_AGENT_SOCKET') or os.path.join(
+    os.path.expanduser('~'), '.prisma_api_scripts', 'agent.sock')
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = ('get_repo_lastscanned', 'set_scanned_branch.py', 'onboard_repositories.py')
+MODULES = (
+    'utils.get_repo', 'utils.get_tags', 'utils.get_suppression_rules', 'utils.get_pipeline_risks',
+    'utils.get_enforcement_rules', 'utils.get_pipeline_tools', 'utils.create_suppression_rule',
+    'utils.delete_suppression_rule', 'utils.get_prisma_token', 'utils.suppression_store',
+    'utils.risk_timeseries', 'utils.tag_resolver', 'utils.policy_index',
+)
+RECEIVE_SIZE = 65536
+
+def _environment():
+    """
+    PRISMA_* settings that a run depends on; the agent only accepts runs with the same values.
+    """
+    return {name: value for name, value in os.environ.items()
+            if name.startswith('PRISMA_') and not name.startswith('PRISMA_AGENT')}
+
+def _send_message(sock, message):
+    sock.sendall(json.dumps(message).encode() + b'\n')
+
+def _read_message(sock, buffer=b''):
+    while b'\n' not in buffer:
+        chunk = sock.recv(RECEIVE_SIZE)
+        if not chunk:
+            raise ConnectionError("agent closed the connection")
+        buffer += chunk
+    line, _, _ = buffer.partition(b'\n')
+    return json.loads(line)
+
+def _request(message, timeout=5):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(SOCKET_PATH)
+        _send_message(sock, message)
+        return _read_message(sock)
+
+def run_in_agent(entry_point):
+    """
+    Run the current command in the agent if one is listening, and exit with its status.
+
+    Returns without doing anything when there is no usable agent, so the caller
+    continues and runs the command locally.
+
+    Args:
+    entry_point (str): Script file name or module name of the caller, e.g. "utils.get_repo".
+    """
+    if os.environ.get('PRISMA_AGENT') == 'off' or not os.path.exists(SOCKET_PATH):
+        return
+    request = {
+        'command': 'run',
+        'entry_point': entry_point,
+        'argv': sys.argv[1:],
+        'cwd': os.getcwd(),
+        'env': _environment(),
+    }
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(SOCKET_PATH)
+        sys.stdout.flush()
+        sys.stderr.flush()
+        socket.send_fds(sock, [json.dumps(request).encode() + b'\n'], [0, 1, 2])
+        reply = _read_message(sock)
+    except (OSError, ValueError):
+        sock.close()
+        return
+    if not reply.get('accepted'):
+        sock.close()
+        return
+
+    # From here on the command is running in the agent; it must not be run again locally.
+    try:
+        reply = _read_message(sock)
+    except KeyboardInterrupt:
+        sys.exit(130)
+    except (OSError, ValueError) as e:
+        print(f"Lost the connection to the Prisma API agent: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        sock.close()
+    sys.exit(reply.get('exit_code', 1))
+
+def _exit_code(code):
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code, file=sys.stderr)
+    return 1
+
+class _StderrHandler(logging.StreamHandler):
+    """
+    Log handler writing to whatever sys.stderr currently is, i.e. to the client of the active run.
+    """
+
+    def emit(self, record):
+        self.stream = sys.stderr
+        super().emit(record)
+
+class AgentServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Unix socket server running entry points in-process, one run at a time.
+
+    Runs are serialized because they swap process-wide state (sys.argv, the
+    standard streams and the working directory); status and stop requests are
+    answered while a run is in progress.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, path, prefetch_interval=None):
+        self.run_lock = threading.Lock()
+        self.started_at = time.time()
+        self.runs = 0
+        self.failures = 0
+        self.current = None
+        self.prefetch_interval = prefetch_interval
+        self.workdir = os.getcwd()
+        super().__init__(path, AgentHandler)
+
+    def run_entry_point(self, entry_point, argv, cwd, streams):
+        """
+        Run a script or utils module with the client's arguments, directory and streams.
+
+        Scripts are run as a fresh __main__. Utils modules stay imported, and
+        their main() is called on the loaded module, so module-level state
+        (resolvers, clients, caches) carries over from one run to the next.
+        The API metrics are written to PRISMA_METRICS_FILE after every run.
+
+        Returns:
+        int: The exit status of the run.
+        """
+        with self.run_lock:
+            saved = sys.argv, sys.stdin, sys.stdout, sys.stderr
+            self.current = entry_point
+            exit_code = 0
+            try:
+                sys.stdin, sys.stdout, sys.stderr = streams
+                os.chdir(cwd)
+                sys.argv = [entry_point] + argv
+                if entry_point in SCRIPTS:
+                    runpy.run_path(os.path.join(REPO_ROOT, entry_point), run_name='__main__')
+                else:
+                    importlib.import_module(entry_point).main()
+            except SystemExit as e:
+                exit_code = _exit_code(e.code)
+            except Exception:
+                traceback.print_exc()
+                exit_code = 1
+            finally:
+                try:
+                    from utils.metrics import export_metrics
+                    export_metrics()
+                except OSError as e:
+                    logging.warning(f"Writing the API metrics failed: {e}")
+                for stream in streams[1:]:
+                    try:
+                        stream.flush()
+                    except OSError:
+                        pass
+                sys.argv, sys.stdin, sys.stdout, sys.stderr = saved
+                os.chdir(self.workdir)
+                self.current = None
+                self.runs += 1
+                self.failures += exit_code != 0
+            return exit_code
+
+    def status(self):
+        return {
+            'pid': os.getpid(),
+            'uptime_s': round(time.time() - self.started_at, 1),
+            'runs': self.runs,
+            'failures': self.failures,
+            'running': self.current,
+            'workdir': self.workdir,
+        }
+
+    def prefetch(self):
+        """
+        Keep the login token and the repository cache of the agent's PRISMA_* tenant warm.
+        """
+        from utils.get_prisma_token import get_auth_token
+        from utils.inventory_cache import refresh_repository_cache
+
+        api_url = os.environ.get('PRISMA_API_URL')
+        username = os.environ.get('PRISMA_ACCESS_KEY')
+        password = os.environ.get('PRISMA_SECRET_KEY')
+        if not all([api_url, username, password]):
+            return
+        while True:
+            try:
+                with self.run_lock:
+                    refresh_repository_cache(api_url, get_auth_token(api_url, username, password))
+            except Exception as e:
+                logging.warning(f"Prefetching the repository list failed: {e}")
+            if not self.prefetch_interval:
+                return
+            time.sleep(self.prefetch_interval)
+
+class AgentHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        data, fds, _, _ = socket.recv_fds(self.request, RECEIVE_SIZE, 3)
+        try:
+            request = _read_message(self.request, data)
+            command = request.get('command')
+            if command == 'status':
+                _send_message(self.request, self.server.status())
+            elif command == 'stop':
+                _send_message(self.request, {'stopping': True})
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+            elif command == 'run':
+                fds, run_fds = [], fds
+                self.handle_run(request, run_fds)
+            else:
+                _send_message(self.request, {'error': f"unknown command {command!r}"})
+        except (OSError, ValueError):
+            pass
+        finally:
+            for fd in fds:
+                os.close(fd)
+
+    def handle_run(self, request, fds):
+        entry_point = request.get('entry_point')
+        if len(fds) != 3:
+            reason = "the client did not pass its standard streams"
+        elif entry_point not in SCRIPTS + MODULES:
+            reason = f"unknown entry point {entry_point!r}"
+        elif request.get('env') != _environment():
+            reason = "the agent was started with different PRISMA_* settings"
+        else:
+            reason = None
+        if reason:
+            for fd in fds:
+                os.close(fd)
+            return _send_message(self.request, {'accepted': False, 'reason': reason})
+
+        stdin = open(fds[0], 'r', encoding='utf-8', errors='replace')
+        stdout = open(fds[1], 'w', buffering=1 if os.isatty(fds[1]) else -1, encoding='utf-8', errors='backslashreplace')
+        stderr = open(fds[2], 'w', buffering=1, encoding='utf-8', errors='backslashreplace')
+        try:
+            _send_message(self.request, {'accepted': True})
+            exit_code = 1
+            try:
+                exit_code = self.server.run_entry_point(entry_point, request.get('argv', []), request['cwd'], (stdin, stdout, stderr))
+            finally:
+                _send_message(self.request, {'exit_code': exit_code})
+        finally:
+            for stream in (stdin, stdout, stderr):
+                try:
+                    stream.close()
+                except OSError:
+                    pass
+
+def _remove_stale_socket(path):
+    if not os.path.exists(path):
+        return
+    try:
+        _request({'command': 'status'}, timeout=1)
+    except (OSError, ValueError):
+        os.unlink(path)
+        return
+    raise SystemExit(f"An agent is already listening on {path}")
+
+def serve(prefetch_interval=None):
+    """
+    Warm up the imports and the login token, then serve thin clients on SOCKET_PATH until stopped.
+    """
+    # Scripts run in-process must not hand their command back to the agent.
+    os.environ['PRISMA_AGENT'] = 'off'
+    logging.basicConfig(level=logging.INFO, handlers=[_StderrHandler()])
+    start = time.monotonic()
+    for module in MODULES + ('utils.inventory_cache', 'utils.staleness', 'utils.bulk'):
+        importlib.import_module(module)
+
+    os.makedirs(os.path.dirname(SOCKET_PATH), mode=0o700, exist_ok=True)
+    _remove_stale_socket(SOCKET_PATH)
+    old_umask = os.umask(0o177)
+    try:
+        server = AgentServer(SOCKET_PATH, prefetch_interval)
+    finally:
+        os.umask(old_umask)
+    threading.Thread(target=server.prefetch, daemon=True).start()
+    logging.info(f"Prisma API agent ready in {time.monotonic() - start:.1f}s on {SOCKET_PATH}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(SOCKET_PATH):
+            os.unlink(SOCKET_PATH)
+        logging.info("Prisma API agent stopped")
+
+def main():
+    from utils.inventory_cache import DEFAULT_TTL
+
+    parser = argparse.ArgumentParser(description="Run or control the Prisma API agent.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    serve_parser = subparsers.add_parser("serve", help="Run the agent in the foreground")
+    serve_parser.add_argument("--prefetch-interval", type=int, default=DEFAULT_TTL // 2,
+                              help=f"Seconds between background refreshes of the repository cache, 0 to disable (default: {DEFAULT_TTL // 2})")
+    subparsers.add_parser("status", help="Show the state of the running agent")
+    subparsers.add_parser("stop", help="Stop the running agent")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        return serve(args.prefetch_interval)
+    try:
+        print(json.dumps(_request({'command': args.command}), indent=2))
+    except (OSError, ValueError) as e:
+        raise SystemExit(f"No agent is listening on {SOCKET_PATH}: {e}")
+
+if __name__ == "__main__":
+    main()
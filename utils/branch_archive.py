@@ -0,0 +1,234 @@
+import hashlib
+import json
+import os
+import secrets
+import sqlite3
+import time
+import zlib
+from datetime import datetime
+
+ARCHIVE_FILE = os.environ.get('PRISMA_BRANCH_ARCHIVE', 'prisma_branch_snapshots.db')
+CHECKPOINT_INTERVAL = 50
+ENTRY_FIELDS = ('repository', 'source', 'owner', 'defaultBranch')
+# Entries are ~100 bytes, too small for zlib alone; a preset dictionary of their common parts shrinks them by half.
+# Changing it makes existing archives unreadable.
+ZLIB_DICTIONARY = (b'{"defaultBranch":"master","owner":"","repository":"","source":"Github"}'
+                   b'{"defaultBranch":"main","source":"AzureRepos""source":"Gitlab""source":"Bitbucket"')
+
+def compress_entry(data):
+    compressor = zlib.compressobj(9, zdict=ZLIB_DICTIONARY)
+    return compressor.compress(data) + compressor.flush()
+
+def decompress_entry(data):
+    decompressor = zlib.decompressobj(zdict=ZLIB_DICTIONARY)
+    return decompressor.decompress(data) + decompressor.flush()
+
+def branch_entry(repo):
+    return {
+        'repository': repo.get('repository'),
+        'source': repo.get('source', 'Unknown'),
+        'owner': repo.get('owner', 'Unknown'),
+        'defaultBranch': repo.get('defaultBranch', 'N/A'),
+    }
+
+class BranchArchive:
+    """
+    Content-addressed, compressed archive of repository branch snapshots.
+
+    Each distinct per-repository entry (name, source, owner, defaultBranch) is
+    stored once as a zlib-compressed blob keyed by its SHA-256. A snapshot only
+    records the repositories whose entry changed since the previous snapshot of
+    the same tenant (and those removed), except every CHECKPOINT_INTERVAL-th
+    snapshot, which lists all of them so a snapshot is rebuilt from at most
+    that many deltas.
+
+    Args:
+    api_url (str): The base URL of the Prisma Cloud API the snapshots belong to.
+    path (str): Archive database file (default: PRISMA_BRANCH_ARCHIVE or prisma_branch_snapshots.db).
+    """
+
+    def __init__(self, api_url, path=None):
+        self.key = api_url.rstrip('/')
+        self.path = path or ARCHIVE_FILE
+        self.conn = sqlite3.connect(self.path, timeout=30)
+        c = self.conn.cursor()
+        c.execute('''CREATE TABLE IF NOT EXISTS blobs (hash TEXT PRIMARY KEY, data BLOB) WITHOUT ROWID''')
+        c.execute('''CREATE TABLE IF NOT EXISTS snapshots
+                     (snapshot_id TEXT PRIMARY KEY, api_url TEXT, created_at REAL, parent TEXT,
+                      checkpoint INTEGER, depth INTEGER, total INTEGER, changed INTEGER)''')
+        c.execute("CREATE INDEX IF NOT EXISTS idx_snapshots_api_url ON snapshots (api_url, created_at)")
+        # hash is NULL for repositories removed since the parent snapshot.
+        c.execute('''CREATE TABLE IF NOT EXISTS snapshot_entries
+                     (snapshot_id TEXT, repo_id TEXT, hash TEXT, PRIMARY KEY (snapshot_id, repo_id)) WITHOUT ROWID''')
+        self.conn.commit()
+        self._manifests = {}
+        self._entries = {}
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def list_snapshots(self):
+        """
+        Return the snapshots of the tenant, newest first, as dictionaries.
+        """
+        c = self.conn.execute('''SELECT snapshot_id, created_at, total, changed, checkpoint FROM snapshots
+                                 WHERE api_url = ? ORDER BY created_at DESC, rowid DESC''', (self.key,))
+        return [{'snapshot_id': snapshot_id, 'created_at': created_at, 'total': total, 'changed': changed, 'checkpoint': bool(checkpoint)}
+                for snapshot_id, created_at, total, changed, checkpoint in c.fetchall()]
+
+    def latest(self):
+        row = self.conn.execute('''SELECT snapshot_id FROM snapshots WHERE api_url = ?
+                                   ORDER BY created_at DESC, rowid DESC LIMIT 1''', (self.key,)).fetchone()
+        return row[0] if row else None
+
+    def resolve(self, snapshot_id):
+        """
+        Return a full snapshot ID from an ID, a unique prefix of one, or "latest".
+
+        Raises:
+        ValueError: If no snapshot or several snapshots match.
+        """
+        if snapshot_id == 'latest':
+            found = [latest for latest in [self.latest()] if latest]
+        else:
+            found = [row[0] for row in self.conn.execute(
+                "SELECT snapshot_id FROM snapshots WHERE api_url = ? AND snapshot_id LIKE ? || '%'", (self.key, snapshot_id))]
+        if len(found) != 1:
+            raise ValueError(f"{'No' if not found else 'More than one'} snapshot matching {snapshot_id} in {self.path}")
+        return found[0]
+
+    def manifest(self, snapshot_id):
+        """
+        Return {repo_id: entry hash} of a snapshot, rebuilt from its last checkpoint and the deltas after it.
+        """
+        if snapshot_id in self._manifests:
+            return self._manifests[snapshot_id]
+        chain = []
+        current = snapshot_id
+        while current:
+            parent, checkpoint = self.conn.execute("SELECT parent, checkpoint FROM snapshots WHERE snapshot_id = ?",
+                                                   (current,)).fetchone()
+            chain.append(current)
+            if checkpoint:
+                break
+            current = parent
+        manifest = {}
+        for current in reversed(chain):
+            for repo_id, entry_hash in self.conn.execute("SELECT repo_id, hash FROM snapshot_entries WHERE snapshot_id = ?", (current,)):
+                if entry_hash is None:
+                    manifest.pop(repo_id, None)
+                else:
+                    manifest[repo_id] = entry_hash
+        self._manifests[snapshot_id] = manifest
+        return manifest
+
+    def _entry(self, entry_hash):
+        if entry_hash not in self._entries:
+            row = self.conn.execute("SELECT data FROM blobs WHERE hash = ?", (entry_hash,)).fetchone()
+            self._entries[entry_hash] = json.loads(decompress_entry(row[0]))
+        return self._entries[entry_hash]
+
+    def entries(self, snapshot_id):
+        """
+        Return {repo_id: entry} of a snapshot; an entry holds repository, source, owner and defaultBranch.
+        """
+        return {repo_id: self._entry(entry_hash) for repo_id, entry_hash in self.manifest(snapshot_id).items()}
+
+    def save(self, repositories):
+        """
+        Record the branch information of repositories as a new snapshot.
+
+        Args:
+        repositories (iterable): Repository dictionaries with id, repository, source, owner and defaultBranch.
+
+        Returns:
+        tuple: (snapshot ID, number of repositories added, changed or removed since the previous snapshot).
+        """
+        blobs = {}
+        manifest = {}
+        for repo in repositories:
+            data = json.dumps(branch_entry(repo), sort_keys=True, separators=(',', ':')).encode()
+            entry_hash = hashlib.sha256(data).hexdigest()
+            blobs[entry_hash] = data
+            manifest[repo['id']] = entry_hash
+
+        parent = self.latest()
+        depth = 0
+        if parent:
+            depth = self.conn.execute("SELECT depth FROM snapshots WHERE snapshot_id = ?", (parent,)).fetchone()[0] + 1
+        checkpoint = parent is None or depth % CHECKPOINT_INTERVAL == 0
+        previous = self.manifest(parent) if parent else {}
+        delta = [(repo_id, entry_hash) for repo_id, entry_hash in manifest.items() if previous.get(repo_id) != entry_hash]
+        delta += [(repo_id, None) for repo_id in previous.keys() - manifest.keys()]
+        rows = manifest.items() if checkpoint else delta
+
+        snapshot_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(3)}"
+        # Entries the parent references are already stored; only compress the new ones.
+        new_hashes = {entry_hash for _, entry_hash in delta if entry_hash} - set(previous.values())
+        with self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO blobs VALUES (?, ?)",
+                                  ((entry_hash, compress_entry(blobs[entry_hash])) for entry_hash in new_hashes))
+            self.conn.execute("INSERT INTO snapshots VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                              (snapshot_id, self.key, time.time(), parent, int(checkpoint), depth, len(manifest), len(delta)))
+            self.conn.executemany("INSERT INTO snapshot_entries VALUES (?, ?, ?)",
+                                  ((snapshot_id, repo_id, entry_hash) for repo_id, entry_hash in rows))
+        self._manifests[snapshot_id] = manifest
+        return snapshot_id, len(delta)
+
+    def diff(self, old_id, new_id):
+        """
+        Compare two snapshots by entry hash, decompressing only the entries that differ.
+
+        Returns:
+        list: (repo_id, old entry, new entry) tuples; an entry is None if the repository is missing from that snapshot.
+        """
+        old, new = self.manifest(old_id), self.manifest(new_id)
+        return [(repo_id, self._entry(old[repo_id]) if repo_id in old else None, self._entry(new[repo_id]) if repo_id in new else None)
+                for repo_id in sorted(old.keys() | new.keys()) if old.get(repo_id) != new.get(repo_id)]
+
+def restore_plan(snapshot_entries, repositories):
+    """
+    Return the branch changes that bring the current repositories back to a snapshot.
+
+    Only repositories present in both whose defaultBranch differs are included;
+    repositories deleted since, or onboarded after, the snapshot are left alone.
+
+    Args:
+    snapshot_entries (dict): {repo_id: entry} from BranchArchive.entries().
+    repositories (iterable): Current repository dictionaries.
+
+    Returns:
+    list: (repository, branch) tuples.
+    """
+    plan = []
+    for repo in repositories:
+        entry = snapshot_entries.get(repo['id'])
+        if entry and entry['defaultBranch'] not in (None, 'N/A') and entry['defaultBranch'] != repo.get('defaultBranch'):
+            plan.append((repo, entry['defaultBranch']))
+    return plan
+
+def print_diff(changes):
+    for repo_id, old, new in changes:
+        name = (new or old)['repository']
+        if old is None:
+            print(f"+ {name} ({repo_id}): {new['defaultBranch']}")
+        elif new is None:
+            print(f"- {name} ({repo_id}): {old['defaultBranch']}")
+        else:
+            fields = ', '.join(f"{field} {old.get(field)} -> {new.get(field)}" for field in ENTRY_FIELDS if old.get(field) != new.get(field))
+            print(f"~ {name} ({repo_id}): {fields}")
+    print(f"\n{len(changes)} repositories differ")
+
+def print_snapshots(archive):
+    snapshots = archive.list_snapshots()
+    if not snapshots:
+        print(f"No snapshots recorded in {archive.path}")
+    for snapshot in snapshots:
+        print(f"{snapshot['snapshot_id']}  {datetime.fromtimestamp(snapshot['created_at']):%Y-%m-%d %H:%M:%S}  "
+              f"{snapshot['total']} repositories, {snapshot['changed']} changed{'  (checkpoint)' if snapshot['checkpoint'] else ''}")
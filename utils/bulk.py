@@ -0,0 +1,82 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_CONCURRENCY = 8
+
+class RateLimiter:
+    """
+    Spaces out calls so that at most `rate` of them start per second, across all threads.
+
+    Args:
+    rate (float): Maximum calls per second. None or 0 disables the limit.
+    """
+
+    def __init__(self, rate=None):
+        self.interval = 1.0 / rate if rate else 0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+def run_concurrently(func, items, concurrency=DEFAULT_CONCURRENCY, rate=None, retries=0, should_retry=None, backoff=1.0):
+    """
+    Call func(item) for every item on a bounded thread pool.
+
+    Exceptions raised by func are captured per item instead of aborting the run.
+
+    Args:
+    func (callable): Function applied to each item.
+    items (iterable): The work items.
+    concurrency (int): Maximum number of calls in flight.
+    rate (float): Optional cap on calls started per second.
+    retries (int): How many times to retry an item whose call raised.
+    should_retry (callable): Decides from the exception whether to retry; all errors are retried if None.
+    backoff (float): Delay before the first retry in seconds, doubled on each further retry.
+
+    Returns:
+    list: (item, result, error) tuples in input order; error is None on success.
+    """
+    items = list(items)
+    limiter = RateLimiter(rate)
+
+    def call(item):
+        for attempt in range(retries + 1):
+            limiter.wait()
+            try:
+                return item, func(item), None
+            except Exception as e:
+                error = e
+                if attempt == retries or (should_retry and not should_retry(e)):
+                    break
+                time.sleep(backoff * (2 ** attempt))
+        return item, None, error
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        return list(executor.map(call, items))
+
+def summarize_results(results, describe):
+    """
+    Print a success/failure summary for results from run_concurrently.
+
+    Args:
+    results (list): (item, result, error) tuples.
+    describe (callable): Returns a printable label for an item.
+
+    Returns:
+    int: The number of failed items.
+    """
+    failed = [(item, error) for item, _, error in results if error is not None]
+    print(f"\nSucceeded: {len(results) - len(failed)}")
+    print(f"Failed: {len(failed)}")
+    for item, error in failed:
+        print(f"  - {describe(item)}: {error}")
+    return len(failed)
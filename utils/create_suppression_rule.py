@@ -1,48 +1,157 @@
+if __name__ == "__main__":
+    # Hand the command to a running agent (utils/agent.py) before the imports below.
+    from utils.agent import run_in_agent
+    run_in_agent("utils.create_suppression_rule")
+
 import requests
 import os
-import uuid
-from datetime import datetime
-from get_prisma_token import get_auth_token
+import csv
+import json
+import argparse
+from utils.get_prisma_token import get_auth_token
+from utils.prisma_client import get_client
+from utils.bulk import DEFAULT_CONCURRENCY, run_concurrently
+from utils.suppression_store import SuppressionStore
 
-import uuid
+DEFAULT_POLICY_ID = "BC_GIT_2"
+DEFAULT_BATCH_SIZE = 100
 
-import time
+def create_suppression(api_url, auth_token, policy_id, resources, comment, expiration_time="0"):
+    """
+    Create one Resources suppression covering several resources of a policy.
 
-import json
+    Args:
+    api_url (str): The base URL of the Prisma Cloud API.
+    auth_token (str): The authentication token for API requests.
+    policy_id (str): The policy to suppress.
+    resources (list): (account_id, resource_id) pairs.
+    comment (str): The suppression justification.
+    expiration_time (str): Expiration time accepted by the API, "0" for none.
 
-def create_suppression_rule(api_url, auth_token, account_id, resource_id, comment):
-    headers = {
-        'Accept': 'application/json',
-        'Content-Type': 'application/json',
-        "Authorization": f"Bearer {auth_token}"
-    }
-    
+    Returns:
+    dict: The API response.
+    """
     payload = {
         "suppressionType": "Resources",
         "comment": comment,
         "origin": "AutomationScript",
-        "expirationTime": "0",
+        "expirationTime": expiration_time,
         "resources": [
             {
                 "accountId": account_id,
                 "id": resource_id
-            }
+            } for account_id, resource_id in resources
         ],
     }
-    
-    # Debug output
-    print("\nDebug: POST Request Details")
-    print(f"URL: {api_url}/bridgecrew/api/v1/suppressions/BC_GIT_2")
-    print("Headers:")
-    print(json.dumps(headers, indent=2))
-    print("Payload:")
-    print(json.dumps(payload, indent=2))
-    
-    policy_id = "BC_GIT_2"
-    response = requests.post(f"{api_url}/bridgecrew/api/v1/suppressions/{policy_id}", headers=headers, json=payload)
-    response.raise_for_status()
-    return response.json(), policy_id
+    return get_client(api_url, auth_token).post_json(f"/bridgecrew/api/v1/suppressions/{policy_id}", json=payload)
+
+def create_suppression_rule(api_url, auth_token, account_id, resource_id, comment, policy_id=DEFAULT_POLICY_ID):
+    return create_suppression(api_url, auth_token, policy_id, [(account_id, resource_id)], comment), policy_id
+
+def read_suppression_rows(path):
+    """
+    Read suppression rows from a CSV file or an NDJSON file (.ndjson/.jsonl).
+
+    Each row needs accountId and resourceId; policyId, comment and expiration are optional.
+
+    Returns:
+    list: Row dictionaries in file order.
+    """
+    with open(path, newline='') as f:
+        if path.endswith(('.ndjson', '.jsonl')):
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = list(csv.DictReader(f))
+    for line_number, row in enumerate(rows, start=1):
+        if not row.get('accountId') or not row.get('resourceId'):
+            raise ValueError(f"Row {line_number} in {path} is missing accountId or resourceId")
+    return rows
+
+def group_suppression_rows(rows, default_policy_id=DEFAULT_POLICY_ID, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Group rows that can share one suppression payload.
+
+    Rows are grouped by (policyId, comment, expiration) and split into batches
+    of at most batch_size resources. Duplicate resources within a group are dropped.
+
+    Returns:
+    list: Batches as dictionaries with policyId, comment, expiration and rows.
+    """
+    groups = {}
+    for row in rows:
+        key = (row.get('policyId') or default_policy_id, row.get('comment') or '', str(row.get('expiration') or '0'))
+        group = groups.setdefault(key, {})
+        group.setdefault((row['accountId'], row['resourceId']), row)
+
+    batches = []
+    for (policy_id, comment, expiration), group in groups.items():
+        group_rows = list(group.values())
+        for start in range(0, len(group_rows), batch_size):
+            batches.append({
+                'policyId': policy_id,
+                'comment': comment,
+                'expiration': expiration,
+                'rows': group_rows[start:start + batch_size]
+            })
+    return batches
+
+def split_existing_rows(store, rows, default_policy_id=DEFAULT_POLICY_ID):
+    """
+    Separate rows whose resource is already suppressed, according to the local suppression store.
+
+    Returns:
+    tuple: (rows to create, rows already suppressed).
+    """
+    new_rows, existing_rows = [], []
+    for row in rows:
+        policy_id = row.get('policyId') or default_policy_id
+        if store.is_suppressed(policy_id, row['accountId'], row['resourceId']):
+            existing_rows.append(row)
+        else:
+            new_rows.append(row)
+    return new_rows, existing_rows
+
+def create_suppressions_bulk(api_url, auth_token, rows, concurrency=DEFAULT_CONCURRENCY, batch_size=DEFAULT_BATCH_SIZE, default_policy_id=DEFAULT_POLICY_ID):
+    """
+    Create suppressions for many rows with batched payloads sent in parallel.
+
+    Returns:
+    list: (row, error) tuples, one per submitted row; error is None on success.
+    """
+    batches = group_suppression_rows(rows, default_policy_id, batch_size)
+    results = run_concurrently(
+        lambda batch: create_suppression(
+            api_url, auth_token, batch['policyId'],
+            [(row['accountId'], row['resourceId']) for row in batch['rows']],
+            batch['comment'], batch['expiration']
+        ),
+        batches,
+        concurrency=concurrency
+    )
+    return [(row, error) for batch, _, error in results for row in batch['rows']]
+
+def write_report(path, outcomes, existing_rows=(), default_policy_id=DEFAULT_POLICY_ID):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['policyId', 'accountId', 'resourceId', 'status', 'error'])
+        for row in existing_rows:
+            writer.writerow([row.get('policyId') or default_policy_id, row['accountId'], row['resourceId'], 'exists', ''])
+        for row, error in outcomes:
+            writer.writerow([
+                row.get('policyId') or default_policy_id, row['accountId'], row['resourceId'],
+                'failed' if error else 'created', error or ''
+            ])
+
 def main():
+    parser = argparse.ArgumentParser(description="Create resource suppression rules in Prisma Cloud.")
+    parser.add_argument("--file", help="CSV or NDJSON file with policyId, accountId, resourceId, comment, expiration rows")
+    parser.add_argument("--policy-id", default=DEFAULT_POLICY_ID, help=f"Policy ID for rows without one (default: {DEFAULT_POLICY_ID})")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Number of suppression requests to send in parallel")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Maximum resources per suppression request")
+    parser.add_argument("--report", help="Write a per-row CSV report to this file")
+    parser.add_argument("--allow-duplicates", action="store_true", help="Create suppressions even for resources that are already suppressed")
+    args = parser.parse_args()
+
     api_url = os.environ.get('PRISMA_API_URL')
     username = os.environ.get('PRISMA_ACCESS_KEY')
     password = os.environ.get('PRISMA_SECRET_KEY')
@@ -51,15 +160,47 @@ def main():
         raise ValueError("One or more required environment variables are not set. Please set PRISMA_API_URL, PRISMA_ACCESS_KEY, and PRISMA_SECRET_KEY.")
 
     auth_token = get_auth_token(api_url, username, password)
-    
-    account_id = input("Enter the Organization/Repo (Account ID): ")
-    resource_id = input("Enter the file:resource name/id (Resource ID): ")
-    comment = input("Enter a comment for the suppression: ")   
-    
-    try:
-        new_suppression, policy_id = create_suppression_rule(api_url, auth_token, account_id, resource_id, comment)
-    except requests.exceptions.RequestException as e:
-        print(f"An error occurred while creating the suppression rule: {e}")
+
+    with SuppressionStore(api_url) as store:
+        if not args.allow_duplicates:
+            # A conditional request: an unchanged suppression list costs a single 304.
+            store.sync(auth_token)
+
+        if args.file:
+            rows = read_suppression_rows(args.file)
+            existing_rows = []
+            if not args.allow_duplicates:
+                rows, existing_rows = split_existing_rows(store, rows, args.policy_id)
+            outcomes = create_suppressions_bulk(api_url, auth_token, rows, args.concurrency, args.batch_size, args.policy_id)
+            if outcomes:
+                store.invalidate()
+            failed = [(row, error) for row, error in outcomes if error]
+            print(f"Rows already suppressed: {len(existing_rows)}")
+            print(f"Rows created: {len(outcomes) - len(failed)}")
+            print(f"Rows failed: {len(failed)}")
+            for row, error in failed:
+                print(f"  - {row['accountId']} {row['resourceId']}: {error}")
+            if args.report:
+                write_report(args.report, outcomes, existing_rows, args.policy_id)
+                print(f"Report saved to {args.report}")
+            return
+
+        account_id = input("Enter the Organization/Repo (Account ID): ")
+        resource_id = input("Enter the file:resource name/id (Resource ID): ")
+
+        existing = [] if args.allow_duplicates else store.find(args.policy_id, account_id, resource_id)
+        if existing:
+            print(f"Already suppressed for policy {args.policy_id} by {', '.join(existing)}; nothing to create")
+            return
+
+        comment = input("Enter a comment for the suppression: ")
+
+        try:
+            new_suppression, policy_id = create_suppression_rule(api_url, auth_token, account_id, resource_id, comment, args.policy_id)
+            store.invalidate()
+            print(f"Suppression rule created for policy {policy_id}")
+        except requests.exceptions.RequestException as e:
+            print(f"An error occurred while creating the suppression rule: {e}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
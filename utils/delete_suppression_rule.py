@@ -1,19 +1,142 @@
+if __name__ == "__main__":
+    # Hand the command to a running agent (utils/agent.py) before the imports below.
+    from utils.agent import run_in_agent
+    run_in_agent("utils.delete_suppression_rule")
+
 import requests
 import os
-from get_prisma_token import get_auth_token
+import re
+import argparse
+import datetime
+from dateutil.parser import parse
+from utils.get_prisma_token import get_auth_token
+from utils.get_suppression_rules import get_suppression_rules
+from utils.prisma_client import get_client
+from utils.bulk import DEFAULT_CONCURRENCY, run_concurrently, summarize_results
 
 def delete_suppression_rule(api_url, auth_token, policy_id, suppression_id):
-    headers = {
-        'Accept': 'application/json',
-        "Authorization": f"Bearer {auth_token}"
-    }
-    
-    url = f"{api_url}/bridgecrew/api/v1/suppressions/{policy_id}/justifications/{suppression_id}"
-    response = requests.delete(url, headers=headers)
-    response.raise_for_status()
+    path = f"/bridgecrew/api/v1/suppressions/{policy_id}/justifications/{suppression_id}"
+    response = get_client(api_url, auth_token).delete(path)
     return response.status_code
 
+def parse_rule_date(value):
+    """
+    Parse a suppression date given as an ISO string or epoch milliseconds.
+
+    Returns:
+    datetime.datetime: A timezone-aware UTC datetime, or None if value is empty.
+    """
+    if value in (None, '', 0, '0'):
+        return None
+    if isinstance(value, (int, float)) or str(value).isdigit():
+        return datetime.datetime.fromtimestamp(int(value) / 1000, tz=datetime.timezone.utc)
+    parsed = parse(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed
+
+def filter_suppression_rules(rules, policy_id=None, suppression_type=None, created_before=None,
+                             created_after=None, comment_regex=None, expired=False):
+    """
+    Select suppression rules matching all of the given filters.
+
+    Args:
+    rules (list): Suppression rules as returned by get_suppression_rules.
+    policy_id (str): Only rules for this policy.
+    suppression_type (str): Only rules of this suppressionType (e.g. Resources, Cves).
+    created_before (datetime.datetime): Only rules created before this time.
+    created_after (datetime.datetime): Only rules created after this time.
+    comment_regex (str): Only rules whose comment matches this regular expression.
+    expired (bool): Only rules whose expiration date has passed.
+
+    Returns:
+    list: The matching rules.
+    """
+    comment_pattern = re.compile(comment_regex) if comment_regex else None
+    now = datetime.datetime.now(datetime.timezone.utc)
+    selected = []
+    for rule in rules:
+        if policy_id and rule.get('policyId') != policy_id:
+            continue
+        if suppression_type and rule.get('suppressionType') != suppression_type:
+            continue
+        if created_before or created_after:
+            created = parse_rule_date(rule.get('creationDate'))
+            if created is None:
+                continue
+            if created_before and created >= created_before:
+                continue
+            if created_after and created <= created_after:
+                continue
+        if comment_pattern and not comment_pattern.search(rule.get('comment') or ''):
+            continue
+        if expired:
+            expiration = parse_rule_date(rule.get('expirationDate'))
+            if expiration is None or expiration > now:
+                continue
+        selected.append(rule)
+    return selected
+
+def is_retryable(error):
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return isinstance(error, requests.exceptions.RequestException)
+
+def delete_suppression_rules(api_url, auth_token, rules, concurrency=DEFAULT_CONCURRENCY, retries=0):
+    """
+    Delete many suppression rules in parallel.
+
+    The shared client already retries throttled and transient failures;
+    `retries` adds further whole-rule retries on top of that.
+
+    Returns:
+    list: (rule, status_code, error) tuples; error is None on success.
+    """
+    return run_concurrently(
+        lambda rule: delete_suppression_rule(api_url, auth_token, rule['policyId'], rule['id']),
+        rules,
+        concurrency=concurrency,
+        retries=retries,
+        should_retry=is_retryable
+    )
+
+def invalidate_suppression_store(api_url):
+    """
+    Mark the local suppression store stale so its next use resyncs without the deleted rules.
+    """
+    # Imported here because utils.suppression_store imports this module.
+    from utils.suppression_store import STORE_FILE, SuppressionStore
+    if os.path.exists(STORE_FILE):
+        with SuppressionStore(api_url) as store:
+            store.invalidate()
+
+def parse_cli_date(value):
+    parsed = parse(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed
+
 def main():
+    parser = argparse.ArgumentParser(description="Delete suppression rules in Prisma Cloud.")
+    parser.add_argument("--bulk", action="store_true", help="Delete every suppression rule matching the filters below")
+    parser.add_argument("--policy-id", help="Only rules for this policy")
+    parser.add_argument("--type", help="Only rules of this suppression type (e.g. Resources, Cves)")
+    parser.add_argument("--created-before", type=parse_cli_date, help="Only rules created before this date")
+    parser.add_argument("--created-after", type=parse_cli_date, help="Only rules created after this date")
+    parser.add_argument("--comment-regex", help="Only rules whose comment matches this regular expression")
+    parser.add_argument("--expired", action="store_true", help="Only rules whose expiration date has passed")
+    parser.add_argument("--dry-run", action="store_true", help="Only print the matching rules, do not delete")
+    parser.add_argument("--yes", action="store_true", help="Do not ask for confirmation before deleting")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Number of delete requests to send in parallel")
+    parser.add_argument("--retries", type=int, default=0, help="Extra retries per rule after the client's own retries are exhausted")
+    args = parser.parse_args()
+
+    filters = [args.policy_id, args.type, args.created_before, args.created_after, args.comment_regex, args.expired]
+    if args.bulk and not any(filters):
+        parser.error("--bulk requires at least one filter")
+    if not args.bulk and (any(filters) or args.dry_run):
+        parser.error("the filters and --dry-run only apply with --bulk")
+
     api_url = os.environ.get('PRISMA_API_URL')
     username = os.environ.get('PRISMA_ACCESS_KEY')
     password = os.environ.get('PRISMA_SECRET_KEY')
@@ -22,12 +145,41 @@ def main():
         raise ValueError("One or more required environment variables are not set. Please set PRISMA_API_URL, PRISMA_ACCESS_KEY, and PRISMA_SECRET_KEY.")
 
     auth_token = get_auth_token(api_url, username, password)
-    
+
+    if args.bulk:
+        rules = filter_suppression_rules(
+            get_suppression_rules(api_url, auth_token),
+            policy_id=args.policy_id,
+            suppression_type=args.type,
+            created_before=args.created_before,
+            created_after=args.created_after,
+            comment_regex=args.comment_regex,
+            expired=args.expired
+        )
+        print(f"Matching suppression rules: {len(rules)}")
+        if args.dry_run:
+            for rule in rules:
+                print(f"  - {rule['policyId']} {rule['id']} ({rule.get('suppressionType')}): {rule.get('comment')}")
+            return
+        if not rules:
+            return
+        if not args.yes:
+            confirm = input(f"Delete {len(rules)} suppression rules? (y/n): ").lower()
+            if confirm != 'y':
+                print("Aborted")
+                return
+        results = delete_suppression_rules(api_url, auth_token, rules, args.concurrency, args.retries)
+        if any(error is None for _, _, error in results):
+            invalidate_suppression_store(api_url)
+        summarize_results(results, lambda rule: f"{rule['policyId']} {rule['id']}")
+        return
+
     policy_id = input("Enter the Policy ID: ")
     suppression_id = input("Enter the Suppression ID: ")
-    
+
     try:
         status_code = delete_suppression_rule(api_url, auth_token, policy_id, suppression_id)
+        invalidate_suppression_store(api_url)
         print(f"\nSuppression rule deleted successfully. Status code: {status_code}")
     except requests.exceptions.RequestException as e:
         print(f"An error occurred while deleting the suppression rule: {e}")
@@ -1,18 +1,24 @@
-import requests
+if __name__ == "__main__":
+    # Hand the command to a running agent (utils/agent.py) before the imports below.
+    from utils.agent import run_in_agent
+    run_in_agent("utils.get_pipeline_risks")
+
 import os
-from get_prisma_token import get_auth_token
+import argparse
+from utils.get_prisma_token import get_auth_token
+from utils.prisma_client import get_client
+from utils.output import add_output_arguments, write_records
+from utils import risk_timeseries
 
 def get_pipeline_risks(api_url, auth_token):
-    headers = {
-        'Accept': 'application/json',
-        "Authorization": f"Bearer {auth_token}"
-    }
-    
-    response = requests.post(f"{api_url}/code/api/v1/pipeline-risks", headers=headers)
-    response.raise_for_status()
-    return response.json()
+    return get_client(api_url, auth_token).post_json("/code/api/v1/pipeline-risks")
 
 def main():
+    parser = argparse.ArgumentParser(description="Get pipeline risks from Prisma Cloud")
+    parser.add_argument("--no-record", action="store_true", help="Do not append this fetch to the pipeline risk time-series store")
+    add_output_arguments(parser)
+    args = parser.parse_args()
+
     api_url = os.environ.get('PRISMA_API_URL')
     username = os.environ.get('PRISMA_ACCESS_KEY')
     password = os.environ.get('PRISMA_SECRET_KEY')
@@ -23,7 +29,17 @@ def main():
     auth_token = get_auth_token(api_url, username, password)
     
     pipeline_risks = get_pipeline_risks(api_url, auth_token)
-    
+
+    if pipeline_risks and 'data' in pipeline_risks and not args.no_record:
+        conn = risk_timeseries.connect()
+        risk_timeseries.record_fetch(conn, pipeline_risks['data'])
+        risk_timeseries.prune(conn)
+        conn.close()
+
+    if args.format != 'text':
+        write_records((pipeline_risks or {}).get('data', []), args.format, args.fields)
+        return
+
     if pipeline_risks and 'data' in pipeline_risks:
         print("Pipeline Risks:")
         for risk in pipeline_risks['data']:
@@ -1,25 +1,27 @@
+if __name__ == "__main__":
+    # Hand the command to a running agent (utils/agent.py) before the imports below.
+    from utils.agent import run_in_agent
+    run_in_agent("utils.get_pipeline_tools")
+
 import requests
+import hashlib
 import logging
 import os
+from utils.prisma_client import get_client
+
+PIPELINE_TOOLS_PATH = "/code/api/v1/ci-inventory"
 
 def get_pipeline_tools(api_url, auth_token):
-    headers = {
-        'Accept': 'application/json',
-        "Authorization": f"Bearer {auth_token}"
-    }
+    client = get_client(api_url, auth_token)
 
     payload = {
         "data":{}
     }
 
     try:
-        logging.basicConfig(level=logging.DEBUG)
-        logging.debug(f"Request URL: {api_url}/code/api/v1/ci-inventory")
-        logging.debug(f"Request Headers: {headers}")
+        logging.debug(f"Request URL: {api_url}{PIPELINE_TOOLS_PATH}")
         logging.debug(f"Request Payload: {payload}")
-        response = requests.get(f"{api_url}/code/api/v1/ci-inventory", headers=headers)
-        response.raise_for_status()
-        return response.json()
+        return client.get_json(PIPELINE_TOOLS_PATH)
     except requests.exceptions.HTTPError as e:
         if e.response.status_code == 403:
             print(f"Error 403: Forbidden. Please check your API key and permissions.")
@@ -31,7 +33,46 @@ def get_pipeline_tools(api_url, auth_token):
         print(f"Request Error: {e}")
     return None
 
-if __name__ == "__main__":
+class PipelineToolsPoller:
+    """
+    Polls the CI inventory and only hands back payloads that changed since the previous poll.
+
+    Conditional requests (If-None-Match / If-Modified-Since) are sent when the
+    server returned an ETag or Last-Modified header, so an unchanged inventory
+    costs one 304. Servers without validators are short-circuited on a SHA-256
+    of the response body before it is decoded.
+    """
+
+    def __init__(self, api_url, auth_token):
+        self.client = get_client(api_url, auth_token)
+        self.etag = None
+        self.last_modified = None
+        self.body_hash = None
+
+    def poll(self):
+        """
+        Fetch the CI inventory if it changed.
+
+        Returns:
+        list: The pipelines, or None if the inventory is unchanged since the previous poll.
+        """
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        response = self.client.get(PIPELINE_TOOLS_PATH, headers=headers)
+        if response.status_code == 304:
+            return None
+        self.etag = response.headers.get('ETag')
+        self.last_modified = response.headers.get('Last-Modified')
+        body_hash = hashlib.sha256(response.content).hexdigest()
+        if body_hash == self.body_hash:
+            return None
+        self.body_hash = body_hash
+        return response.json()
+
+def main():
     from utils.get_prisma_token import get_auth_token
     api_url = os.environ.get('PRISMA_API_URL')
     username = os.environ.get('PRISMA_ACCESS_KEY')
@@ -39,3 +80,6 @@ if __name__ == "__main__":
     auth_token = get_auth_token(api_url, username, password)
     pipelines = get_pipeline_tools(api_url, auth_token)
     print(pipelines)
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,196 @@
-import requests
+if __name__ == "__main__":
+    # Hand the command to a running agent (utils/agent.py) before the imports below.
+    from utils.agent import run_in_agent
+    run_in_agent("utils.get_prisma_token")
+
+import base64
+import hashlib
 import json
+import os
+import threading
+import time
+from utils.prisma_client import get_client
+
+TOKEN_CACHE_FILE = os.environ.get(
+    'PRISMA_TOKEN_CACHE',
+    os.path.join(os.path.expanduser('~'), '.prisma_api_scripts', 'token_cache.json')
+)
+REFRESH_MARGIN = 60
+MIN_REFRESH_DELAY = 30
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+def decode_token_expiry(token):
+    """
+    Return the `exp` claim of a JWT as a Unix timestamp, or None if it cannot be read.
+
+    The signature is not verified; the value is only used to decide when to refresh.
+    """
+    try:
+        payload = token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        return int(json.loads(base64.urlsafe_b64decode(payload))['exp'])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+def _load_cache():
+    try:
+        with open(TOKEN_CACHE_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_cache(cache):
+    os.makedirs(os.path.dirname(TOKEN_CACHE_FILE), mode=0o700, exist_ok=True)
+    tmp_file = f"{TOKEN_CACHE_FILE}.{os.getpid()}.tmp"
+    fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        json.dump(cache, f)
+    os.replace(tmp_file, TOKEN_CACHE_FILE)
+
+class TokenManager:
+    """
+    Keeps a Prisma Cloud JWT valid for the lifetime of a process.
+
+    The token is held in memory and in an on-disk cache (mode 0600) keyed by
+    API URL and access key, so short-lived scripts reuse a still-valid token
+    instead of logging in. A daemon timer logs in again shortly before the
+    token expires, and the shared PrismaClient calls refresh() on a 401.
+
+    Args:
+    api_url (str): The base URL of the Prisma Cloud API.
+    username (str): The access key for authentication.
+    password (str): The secret key for authentication.
+    """
+
+    def __init__(self, api_url, username, password):
+        self.api_url = api_url
+        self.username = username
+        self.password = password
+        self.cache_key = hashlib.sha256(f"{api_url.rstrip('/')}|{username}".encode()).hexdigest()
+        self.token = None
+        self.expires_at = None
+        self.lifetime = None
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def _is_valid(self):
+        if not self.token:
+            return False
+        return self.expires_at is None or self.expires_at - self._refresh_margin() > time.time()
+
+    def _refresh_margin(self):
+        # Tokens living less than two margins are refreshed halfway through instead.
+        return min(REFRESH_MARGIN, self.lifetime / 2) if self.lifetime else REFRESH_MARGIN
+
+    def _login(self):
+        headers = {
+            "Content-Type": "application/json",
+            # Drop the session's (possibly stale) Bearer token from the login request.
+            "Authorization": None
+        }
+        payload = {
+            "username": self.username,
+            "password": self.password
+        }
+        response = get_client(self.api_url).post_json("/login", headers=headers, data=json.dumps(payload), retry_auth=False)
+        token = response.get('token') if isinstance(response, dict) else None
+        if not token:
+            raise ValueError(f"Login to {self.api_url} returned no token: {json.dumps(response)[:200]}")
+        return token
+
+    def _store(self, token):
+        self.token = token
+        self.expires_at = decode_token_expiry(token)
+        now = time.time()
+        if self.expires_at is not None and self.expires_at <= now:
+            # Clock skew: the expiry cannot be trusted, so keep the token until the API answers 401.
+            self.expires_at = None
+        self.lifetime = self.expires_at - now if self.expires_at is not None else None
+        client = get_client(self.api_url)
+        client.set_token(token)
+        client.token_manager = self
+        self._schedule_refresh()
+
+    def _schedule_refresh(self):
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        if self.expires_at is None:
+            return
+        # Never less than MIN_REFRESH_DELAY (or half the lifetime), so short-lived tokens do not log in back to back.
+        delay = max(self.expires_at - self._refresh_margin() - time.time(), min(MIN_REFRESH_DELAY, self.lifetime / 2))
+        self._timer = threading.Timer(delay, self._background_refresh)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _background_refresh(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"Background token refresh failed: {e}")
+
+    def get_token(self):
+        """
+        Return a valid token, from memory, the disk cache, or a new login.
+
+        Raises:
+        requests.exceptions.HTTPError: If a login is needed and fails.
+        ValueError: If the login response has no token.
+        """
+        with self._lock:
+            if self._is_valid():
+                return self.token
+            cached = _load_cache().get(self.cache_key)
+            if cached:
+                self.token = cached
+                self.expires_at = decode_token_expiry(cached)
+                self.lifetime = None
+                if self._is_valid():
+                    self._store(cached)
+                    return self.token
+            return self._refresh_locked()
+
+    def refresh(self, stale_token=None):
+        """
+        Log in again and return the new token.
+
+        If stale_token is given and another thread has already replaced it,
+        the current token is returned without logging in a second time.
+        """
+        with self._lock:
+            if stale_token is not None and self.token != stale_token and self._is_valid():
+                return self.token
+            return self._refresh_locked()
+
+    def _refresh_locked(self):
+        token = self._login()
+        self._store(token)
+        cache = _load_cache()
+        cache[self.cache_key] = token
+        _save_cache(cache)
+        return token
+
+def get_token_manager(api_url, username, password):
+    """
+    Return the shared TokenManager for an API URL and access key.
+    """
+    key = (api_url.rstrip('/'), username)
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = TokenManager(api_url, username, password)
+            _managers[key] = manager
+    return manager
 
 def get_auth_token(api_url, username, password):
     """
     Retrieves an authentication token from the Prisma Cloud API.
 
+    A cached token is returned if it is not about to expire; otherwise a new
+    one is requested from /login and cached.
+
     Args:
     api_url (str): The base URL of the Prisma Cloud API.
     username (str): The username for authentication.
@@ -15,27 +201,19 @@ def get_auth_token(api_url, username, password):
 
     Raises:
     requests.exceptions.HTTPError: If the API request fails.
+    ValueError: If the login response has no token.
     """
-    login_url = f"{api_url}/login"
-    headers = {
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "username": username,
-        "password": password
-    }
-    response = requests.post(login_url, headers=headers, data=json.dumps(payload))
-    response.raise_for_status()
-    token = response.json().get('token')
-    print(f"Received JWT Token: {token}")
-    return token
+    return get_token_manager(api_url, username, password).get_token()
 
-if __name__ == "__main__":
-    import os
+def main():
     api_url = os.environ.get('PRISMA_API_URL')
     username = os.environ.get('PRISMA_ACCESS_KEY')
     password = os.environ.get('PRISMA_SECRET_KEY')
     if all([api_url, username, password]):
-        get_auth_token(api_url, username, password)
+        token = get_auth_token(api_url, username, password)
+        print(f"Received JWT Token: {token}")
     else:
         print("Please set PRISMA_API_URL, PRISMA_ACCESS_KEY, and PRISMA_SECRET_KEY environment variables.")
+
+if __name__ == "__main__":
+    main()
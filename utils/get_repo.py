@@ -1,22 +1,69 @@
-import requests
-from get_prisma_token import get_auth_token
+if __name__ == "__main__":
+    # Hand the command to a running agent (utils/agent.py) before the imports below.
+    from utils.agent import run_in_agent
+    run_in_agent("utils.get_repo")
+
+from utils.get_prisma_token import get_auth_token
+from utils.prisma_client import get_client
+from utils.output import add_output_arguments, write_records
+import argparse
 import os
 def get_repo_scanned(api_url, auth_token):
-    headers = {
-        'Accept': 'application/json',
-        "Authorization": f"Bearer {auth_token}"
-    }
-    response = requests.get(f"{api_url}/code/api/v1/repositories", headers=headers)
-    response.raise_for_status()
-    return response.json()
+    return get_client(api_url, auth_token).get_json("/code/api/v1/repositories")
 
-if __name__ == "__main__":
+def iter_repositories(api_url, auth_token, page_size=None):
+    """
+    Yield repositories one at a time without loading the whole list in memory.
+
+    With page_size, the list is requested in pages using limit/offset query
+    parameters. If the API ignores them, the first response is treated as the
+    complete list: paging stops after a response longer than a page, or at a
+    page starting with a repository that was already yielded. Without
+    page_size, the single response body is parsed incrementally as it streams in.
+
+    Args:
+    api_url (str): The base URL of the Prisma Cloud API.
+    auth_token (str): The authentication token for API requests.
+    page_size (int): Number of repositories per page (optional).
+
+    Yields:
+    dict: Repository information.
+    """
+    client = get_client(api_url, auth_token)
+    if not page_size:
+        yield from client.stream_json_array('GET', "/code/api/v1/repositories")
+        return
+
+    offset = 0
+    seen = set()
+    while True:
+        count = 0
+        for repo in client.stream_json_array('GET', "/code/api/v1/repositories", params={'limit': page_size, 'offset': offset}):
+            if count == 0 and repo.get('id') in seen:
+                # The same list again: limit/offset are ignored and it was complete.
+                return
+            count += 1
+            seen.add(repo.get('id'))
+            yield repo
+        if count != page_size:
+            return
+        offset += page_size
+
+def main():
+    parser = argparse.ArgumentParser(description="Get repositories from Prisma Cloud")
+    add_output_arguments(parser)
+    args = parser.parse_args()
 
     api_url = os.environ.get('PRISMA_API_URL')
     username = os.environ.get('PRISMA_ACCESS_KEY')
     password = os.environ.get('PRISMA_SECRET_KEY')
     auth_token = get_auth_token(api_url, username, password)
+    if args.format != 'text':
+        write_records(iter_repositories(api_url, auth_token), args.format, args.fields)
+        return
     repositories = get_repo_scanned(api_url, auth_token)
     print(repositories)
     print(f"\nTotal repositories found: {len(repositories)}")
 
+if __name__ == "__main__":
+    main()
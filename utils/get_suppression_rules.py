@@ -1,16 +1,16 @@
-import requests
+if __name__ == "__main__":
+    # Hand the command to a running agent (utils/agent.py) before the imports below.
+    from utils.agent import run_in_agent
+    run_in_agent("utils.get_suppression_rules")
+
 import os
-from get_prisma_token import get_auth_token
+import argparse
+from utils.get_prisma_token import get_auth_token
+from utils.prisma_client import get_client
+from utils.output import add_output_arguments, write_records
 
 def get_suppression_rules(api_url, auth_token):
-    headers = {
-        'Accept': 'application/json',
-        "Authorization": f"Bearer {auth_token}"
-    }
-    
-    response = requests.get(f"{api_url}/code/api/v1/suppressions", headers=headers)
-    response.raise_for_status()
-    return response.json()
+    return get_client(api_url, auth_token).get_json("/code/api/v1/suppressions")
 
 def print_suppression_rule(rule):
     print(f"\nSuppression Type: {rule['suppressionType']}")
@@ -36,6 +36,10 @@ def print_suppression_rule(rule):
             print(f"    Resource ID: {resource['resourceId']}")
 
 def main():
+    parser = argparse.ArgumentParser(description="Get suppression rules from Prisma Cloud")
+    add_output_arguments(parser)
+    args = parser.parse_args()
+
     api_url = os.environ.get('PRISMA_API_URL')
     username = os.environ.get('PRISMA_ACCESS_KEY')
     password = os.environ.get('PRISMA_SECRET_KEY')
@@ -47,6 +51,10 @@ def main():
     
     suppression_rules = get_suppression_rules(api_url, auth_token)
     
+    if args.format != 'text':
+        write_records(suppression_rules or [], args.format, args.fields)
+        return
+
     if suppression_rules:
         print("Suppression Rules:")
         for rule in suppression_rules:
@@ -1,15 +1,16 @@
-import requests
+if __name__ == "__main__":
+    # Hand the command to a running agent (utils/agent.py) before the imports below.
+    from utils.agent import run_in_agent
+    run_in_agent("utils.get_tags")
+
 import os
 import argparse
 import json
 from utils.get_prisma_token import get_auth_token
+from utils.prisma_client import get_client
+from utils.output import add_output_arguments, write_records
 
 def get_tags(api_url, auth_token, tag_type=None, repo_id=None, file_path=None):
-    headers = {
-        'Accept': 'application/json',
-        "Authorization": f"Bearer {auth_token}"
-    }
-    
     params = {}
     if tag_type:
         params['type'] = tag_type
@@ -18,9 +19,7 @@ def get_tags(api_url, auth_token, tag_type=None, repo_id=None, file_path=None):
     if file_path:
         params['filePath'] = file_path
 
-    response = requests.get(f"{api_url}/code/api/v1/tag-rules", headers=headers, params=params)
-    response.raise_for_status()
-    return response.json()
+    return get_client(api_url, auth_token).get_json("/code/api/v1/tag-rules", params=params)
 
 def print_tag_rule(rule):
     print(f"\nTag Rule ID: {rule['id']}")
@@ -44,6 +43,7 @@ def main():
     parser.add_argument("--type", help="Filter by tag type")
     parser.add_argument("--repo-id", help="Filter by repository ID")
     parser.add_argument("--file-path", help="Filter by file path")
+    add_output_arguments(parser)
     args = parser.parse_args()
 
     api_url = os.environ.get('PRISMA_API_URL')
@@ -57,6 +57,10 @@ def main():
     
     tag_rules = get_tags(api_url, auth_token, args.type, args.repo_id, args.file_path)
     
+    if args.format != 'text':
+        write_records(tag_rules or [], args.format, args.fields)
+        return
+
     if tag_rules:
         print("Tag Rules:")
         for rule in tag_rules:
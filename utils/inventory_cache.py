@@ -0,0 +1,119 @@
+import json
+import os
+import sqlite3
+import time
+from utils.prisma_client import get_client, iter_json_array, STREAM_CHUNK_SIZE
+
+CACHE_FILE = os.environ.get('PRISMA_INVENTORY_CACHE', 'prisma_inventory_cache.db')
+DEFAULT_TTL = int(os.environ.get('PRISMA_INVENTORY_TTL', 900))
+REPOSITORIES_PATH = "/code/api/v1/repositories"
+
+def _connect():
+    conn = sqlite3.connect(CACHE_FILE, timeout=30)
+    c = conn.cursor()
+    c.execute('''CREATE TABLE IF NOT EXISTS cache_meta
+                 (api_url TEXT, path TEXT, fetched_at REAL, etag TEXT, last_modified TEXT,
+                  PRIMARY KEY (api_url, path))''')
+    c.execute('''CREATE TABLE IF NOT EXISTS repositories
+                 (api_url TEXT, position INTEGER, id TEXT, data TEXT, PRIMARY KEY (api_url, position))''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_repositories_id ON repositories (api_url, id)")
+    conn.commit()
+    return conn
+
+def _load_meta(conn, api_url):
+    c = conn.cursor()
+    c.execute("SELECT fetched_at, etag, last_modified FROM cache_meta WHERE api_url = ? AND path = ?",
+              (api_url, REPOSITORIES_PATH))
+    return c.fetchone()
+
+def refresh_repository_cache(api_url, auth_token, force=False):
+    """
+    Revalidate the cached repository list against the API.
+
+    A conditional request (If-None-Match / If-Modified-Since) is sent when the
+    previous response carried an ETag or Last-Modified header. On 304 only the
+    fetch time is updated; otherwise the streamed response replaces the cache.
+
+    Args:
+    api_url (str): The base URL of the Prisma Cloud API.
+    auth_token (str): The authentication token for API requests.
+    force (bool): Ignore validators and download the full list.
+
+    Returns:
+    bool: True if the cached list was replaced, False if it was still current.
+    """
+    key = api_url.rstrip('/')
+    conn = _connect()
+    try:
+        meta = _load_meta(conn, key)
+        headers = {}
+        if meta and not force:
+            if meta[1]:
+                headers['If-None-Match'] = meta[1]
+            if meta[2]:
+                headers['If-Modified-Since'] = meta[2]
+
+        response = get_client(api_url, auth_token).get(REPOSITORIES_PATH, headers=headers, stream=True)
+        try:
+            if response.status_code == 304:
+                conn.execute("UPDATE cache_meta SET fetched_at = ? WHERE api_url = ? AND path = ?",
+                             (time.time(), key, REPOSITORIES_PATH))
+                conn.commit()
+                return False
+
+            with conn:
+                conn.execute("DELETE FROM repositories WHERE api_url = ?", (key,))
+                conn.executemany(
+                    "INSERT INTO repositories VALUES (?, ?, ?, ?)",
+                    ((key, position, repo.get('id'), json.dumps(repo))
+                     for position, repo in enumerate(iter_json_array(response.iter_content(STREAM_CHUNK_SIZE))))
+                )
+                conn.execute("INSERT OR REPLACE INTO cache_meta VALUES (?, ?, ?, ?, ?)",
+                             (key, REPOSITORIES_PATH, time.time(),
+                              response.headers.get('ETag'), response.headers.get('Last-Modified')))
+            return True
+        finally:
+            response.close()
+    finally:
+        conn.close()
+
+def iter_cached_repositories(api_url, auth_token, ttl=DEFAULT_TTL, refresh=False):
+    """
+    Yield repositories from the local inventory cache, refreshing it first if needed.
+
+    The cache is shared between scripts, so chained jobs within the TTL read
+    the repository list locally instead of downloading it again.
+
+    Args:
+    api_url (str): The base URL of the Prisma Cloud API.
+    auth_token (str): The authentication token for API requests.
+    ttl (int): Seconds a cached list is used before it is revalidated.
+    refresh (bool): Download the full list regardless of the TTL.
+
+    Yields:
+    dict: Repository information.
+    """
+    key = api_url.rstrip('/')
+    conn = _connect()
+    try:
+        meta = _load_meta(conn, key)
+        if refresh or not meta or time.time() - meta[0] >= ttl:
+            refresh_repository_cache(api_url, auth_token, force=refresh)
+        c = conn.cursor()
+        c.execute("SELECT data FROM repositories WHERE api_url = ? ORDER BY position", (key,))
+        for (data,) in c:
+            yield json.loads(data)
+    finally:
+        conn.close()
+
+def get_cached_repositories(api_url, auth_token, ttl=DEFAULT_TTL, refresh=False):
+    return list(iter_cached_repositories(api_url, auth_token, ttl, refresh))
+
+def invalidate_repository_cache(api_url):
+    """
+    Mark the cached repository list as stale, e.g. after changing repositories through the API.
+    """
+    conn = _connect()
+    with conn:
+        conn.execute("DELETE FROM cache_meta WHERE api_url = ? AND path = ?", (api_url.rstrip('/'), REPOSITORIES_PATH))
+    conn.close()
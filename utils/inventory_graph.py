@@ -0,0 +1,176 @@
+import datetime
+from collections import defaultdict
+from dateutil.parser import parse
+
+class InventoryGraph:
+    """
+    In-memory graph of a tenant's repositories, CI pipelines, pipeline risks,
+    suppressions and enforcement rules with hash indexes for O(1) lookups.
+
+    Indexes:
+    - repositories by id, by casId, by owner and by account ("owner/repository")
+    - pipelines by casId
+    - pipeline risks by repoId and by policyId
+    - suppressions by policyId and the set of suppressed (policyId, accountId) pairs
+    - enforcement rules by id, the effective rule id by repository id, and repository ids by rule id
+
+    Args:
+    snapshot_data (dict): Endpoint data as produced by fetch_tenant_snapshot
+    ('repositories', 'pipeline_tools', 'pipeline_risks', 'suppression_rules',
+    'enforcement_rules'); missing endpoints are treated as empty.
+    """
+
+    def __init__(self, snapshot_data):
+        self.repositories = snapshot_data.get('repositories') or []
+        self.pipelines = snapshot_data.get('pipeline_tools') or []
+        risks = snapshot_data.get('pipeline_risks') or []
+        self.risks = risks.get('data', []) if isinstance(risks, dict) else risks
+        self.suppressions = snapshot_data.get('suppression_rules') or []
+        self.enforcement_rules = snapshot_data.get('enforcement_rules') or []
+
+        self.repos_by_id = {}
+        self.repos_by_owner = defaultdict(list)
+        self.repo_id_by_account = {}
+        for repo in self.repositories:
+            self.repos_by_id[repo['id']] = repo
+            self.repos_by_owner[repo.get('owner')].append(repo)
+            self.repo_id_by_account[repository_account(repo)] = repo['id']
+
+        self.pipelines_by_cas_id = defaultdict(list)
+        for pipeline in self.pipelines:
+            self.pipelines_by_cas_id[pipeline.get('casId')].append(pipeline)
+
+        self.risks_by_repo = defaultdict(list)
+        self.risks_by_policy = defaultdict(list)
+        for risk in self.risks:
+            self.risks_by_repo[risk.get('repoId')].append(risk)
+            self.risks_by_policy[risk.get('policyId')].append(risk)
+
+        self.suppressions_by_policy = defaultdict(list)
+        self.suppressed_accounts = set()
+        self.suppressed_policies = set()
+        for rule in self.suppressions:
+            policy_id = rule.get('policyId')
+            self.suppressions_by_policy[policy_id].append(rule)
+            if rule.get('suppressionType') == 'Policy':
+                self.suppressed_policies.add(policy_id)
+            for account_id in rule.get('accountIds') or []:
+                self.suppressed_accounts.add((policy_id, account_id))
+            for resource in rule.get('resources') or []:
+                self.suppressed_accounts.add((policy_id, resource.get('accountId')))
+
+        self.rules_by_id = {rule['id']: rule for rule in self.enforcement_rules}
+        self.rule_id_by_repo = self._effective_rules()
+        self.repo_ids_by_rule = defaultdict(set)
+        for repo_id, rule_id in self.rule_id_by_repo.items():
+            self.repo_ids_by_rule[rule_id].add(repo_id)
+
+    def _effective_rules(self):
+        """
+        Map each repository to the one enabled enforcement rule in effect for it.
+
+        A repository listed by rules gets the first of them; the others get the
+        first default rule (a rule without repositories). Disabled rules apply to nothing.
+        """
+        effective = {}
+        default_rule = None
+        for rule in self.enforcement_rules:
+            if not rule.get('enabled', True):
+                continue
+            repos = rule.get('repositories')
+            if not repos:
+                default_rule = default_rule or rule
+            for entry in repos or ():
+                repo_id = self._rule_repo_id(entry)
+                if repo_id is not None:
+                    effective.setdefault(repo_id, rule['id'])
+        if default_rule:
+            for repo_id in self.repos_by_id:
+                effective.setdefault(repo_id, default_rule['id'])
+        return effective
+
+    def _rule_repo_id(self, entry):
+        for key in ('id', 'repoId', 'accountId'):
+            value = entry.get(key)
+            if value in self.repos_by_id:
+                return value
+        return self.repo_id_by_account.get(entry.get('accountName'))
+
+    def is_suppressed(self, policy_id, repo_id):
+        repo = self.repos_by_id.get(repo_id)
+        account = repository_account(repo) if repo else repo_id
+        return policy_id in self.suppressed_policies or (policy_id, account) in self.suppressed_accounts
+
+    def repo_apps(self):
+        """
+        Join repositories to CI apps on casId.
+
+        Returns:
+        list: (repository, [appName, ...]) pairs.
+        """
+        return [(repo, [pipeline['appName'] for pipeline in self.pipelines_by_cas_id.get(repo['id'], [])])
+                for repo in self.repositories]
+
+    def unsuppressed_risks(self, severity=None):
+        """
+        Return open pipeline risks whose policy is not suppressed for the risk's repository.
+
+        Returns:
+        list: (repository or None, risk) pairs.
+        """
+        results = []
+        for risk in self.risks:
+            if not risk.get('openAlerts'):
+                continue
+            if severity and str(risk.get('severity', '')).lower() != severity.lower():
+                continue
+            if self.is_suppressed(risk.get('policyId'), risk.get('repoId')):
+                continue
+            results.append((self.repos_by_id.get(risk.get('repoId')), risk))
+        return results
+
+    def stale_repositories_under_rule(self, rule_id, days, now=None):
+        """
+        Return repositories an enforcement rule is in effect for that were not scanned in `days` days.
+        """
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        cutoff = now - datetime.timedelta(days=days)
+        stale = []
+        for repo_id in self.repo_ids_by_rule.get(rule_id, ()):
+            repo = self.repos_by_id[repo_id]
+            last_scan = repo.get('lastScanDate')
+            if not last_scan:
+                stale.append(repo)
+                continue
+            scanned = parse(last_scan)
+            if scanned.tzinfo is None:
+                scanned = scanned.replace(tzinfo=datetime.timezone.utc)
+            if scanned < cutoff:
+                stale.append(repo)
+        return sorted(stale, key=lambda repo: repo.get('repository') or '')
+
+    def group_count(self, entity, field):
+        """
+        Count records of an entity ('repositories', 'pipeline_tools', 'pipeline_risks',
+        'suppression_rules', 'enforcement_rules') by the value of one field.
+
+        Returns:
+        list: (value, count) pairs, largest count first.
+        """
+        records = {
+            'repositories': self.repositories,
+            'pipeline_tools': self.pipelines,
+            'pipeline_risks': self.risks,
+            'suppression_rules': self.suppressions,
+            'enforcement_rules': self.enforcement_rules,
+        }[entity]
+        counts = defaultdict(int)
+        for record in records:
+            counts[record.get(field)] += 1
+        return sorted(counts.items(), key=lambda item: (-item[1], str(item[0])))
+
+def repository_account(repo):
+    """
+    Return the account id used by suppressions for a repository ("owner/repository").
+    """
+    return f"{repo.get('owner')}/{repo.get('repository')}"
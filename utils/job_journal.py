@@ -0,0 +1,140 @@
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+JOURNAL_FILE = os.environ.get('PRISMA_JOB_JOURNAL', 'prisma_jobs.db')
+
+PLANNED = 'planned'
+DONE = 'done'
+FAILED = 'failed'
+SKIPPED = 'skipped'
+PENDING_STATES = (PLANNED, FAILED)
+
+class JobJournal:
+    """
+    SQLite journal of bulk jobs and the state of each of their items.
+
+    Every item of a job is recorded as planned before any request is sent and
+    marked done, failed or skipped as soon as its outcome is known, so an
+    interrupted job can be resumed with only its planned and failed items.
+    Marking is thread-safe and commits immediately.
+
+    Args:
+    path (str): Journal database file (default: PRISMA_JOB_JOURNAL or prisma_jobs.db).
+    """
+
+    def __init__(self, path=None):
+        self.path = path or JOURNAL_FILE
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        c = self.conn.cursor()
+        c.execute("PRAGMA journal_mode = WAL")
+        c.execute("PRAGMA synchronous = NORMAL")
+        c.execute('''CREATE TABLE IF NOT EXISTS jobs
+                     (job_id TEXT PRIMARY KEY, kind TEXT, created_at REAL, updated_at REAL, status TEXT, params TEXT)''')
+        c.execute('''CREATE TABLE IF NOT EXISTS job_items
+                     (job_id TEXT, item_id TEXT, state TEXT, data TEXT, error TEXT, updated_at REAL,
+                      PRIMARY KEY (job_id, item_id))''')
+        c.execute("CREATE INDEX IF NOT EXISTS idx_job_items_state ON job_items (job_id, state)")
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def create_job(self, kind, params, items):
+        """
+        Record a new job with its items.
+
+        Args:
+        kind (str): Name of the operation, e.g. "set_scanned_branch".
+        params (dict): Parameters needed to resume the job.
+        items (iterable): (item_id, data, state) tuples; data must be JSON serializable.
+
+        Returns:
+        str: The new job ID.
+        """
+        job_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(3)}"
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.execute("INSERT INTO jobs VALUES (?, ?, ?, ?, ?, ?)",
+                              (job_id, kind, now, now, 'running', json.dumps(params)))
+            self.conn.executemany("INSERT OR REPLACE INTO job_items VALUES (?, ?, ?, ?, NULL, ?)",
+                                  ((job_id, item_id, state, json.dumps(data), now) for item_id, data, state in items))
+        return job_id
+
+    def load_job(self, job_id, kind=None):
+        """
+        Return a job as a dictionary with job_id, kind, created_at, status and params.
+
+        Raises:
+        ValueError: If the job does not exist or is of another kind.
+        """
+        row = self.conn.execute("SELECT job_id, kind, created_at, status, params FROM jobs WHERE job_id = ?",
+                                (job_id,)).fetchone()
+        if not row or (kind and row[1] != kind):
+            raise ValueError(f"No {kind + ' ' if kind else ''}job with ID {job_id} in {self.path}")
+        return {'job_id': row[0], 'kind': row[1], 'created_at': row[2], 'status': row[3], 'params': json.loads(row[4])}
+
+    def list_jobs(self, kind=None):
+        """
+        Return all jobs (of one kind, if given), newest first, with their item counts per state.
+        """
+        c = self.conn.execute('''SELECT job_id, kind, created_at, status FROM jobs
+                                 WHERE ? IS NULL OR kind = ? ORDER BY created_at DESC''', (kind, kind))
+        return [{'job_id': job_id, 'kind': job_kind, 'created_at': created_at, 'status': status, 'counts': self.counts(job_id)}
+                for job_id, job_kind, created_at, status in c.fetchall()]
+
+    def items(self, job_id, states=PENDING_STATES):
+        """
+        Return (item_id, data) for the items of a job in the given states.
+        """
+        c = self.conn.execute(f'''SELECT item_id, data FROM job_items WHERE job_id = ?
+                                  AND state IN ({", ".join("?" * len(states))}) ORDER BY rowid''', (job_id, *states))
+        return [(item_id, json.loads(data)) for item_id, data in c.fetchall()]
+
+    def mark(self, job_id, item_id, state, error=None):
+        self.mark_many(job_id, [item_id], state, error)
+
+    def mark_many(self, job_id, item_ids, state, error=None):
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.executemany("UPDATE job_items SET state = ?, error = ?, updated_at = ? WHERE job_id = ? AND item_id = ?",
+                                  ((state, error, now, job_id, item_id) for item_id in item_ids))
+
+    def counts(self, job_id):
+        """
+        Return {state: number of items} for a job.
+        """
+        c = self.conn.execute("SELECT state, COUNT(*) FROM job_items WHERE job_id = ? GROUP BY state", (job_id,))
+        return dict(c.fetchall())
+
+    def finish(self, job_id):
+        """
+        Set the job status to completed, or incomplete if items are still planned or failed.
+
+        Returns:
+        str: The new status.
+        """
+        counts = self.counts(job_id)
+        status = 'incomplete' if any(counts.get(state) for state in PENDING_STATES) else 'completed'
+        with self._lock, self.conn:
+            self.conn.execute("UPDATE jobs SET status = ?, updated_at = ? WHERE job_id = ?", (status, time.time(), job_id))
+        return status
+
+def print_jobs(journal, kind):
+    jobs = journal.list_jobs(kind)
+    if not jobs:
+        print(f"No jobs recorded in {journal.path}")
+    for job in jobs:
+        counts = ', '.join(f"{state} {count}" for state, count in sorted(job['counts'].items()))
+        print(f"{job['job_id']}  {datetime.fromtimestamp(job['created_at']):%Y-%m-%d %H:%M:%S}  {job['status']:<10}  {counts}")
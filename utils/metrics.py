@@ -0,0 +1,163 @@
+import atexit
+import json
+import os
+import re
+import threading
+from collections import defaultdict
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+ENDPOINT_TEMPLATES = [
+    (re.compile(r'^/bridgecrew/api/v1/branches/[^/]+/scannedBranch/[^/]+$'), '/bridgecrew/api/v1/branches/{repoId}/scannedBranch/{branch}'),
+    (re.compile(r'^/bridgecrew/api/v1/suppressions/[^/]+/justifications/[^/]+$'), '/bridgecrew/api/v1/suppressions/{policyId}/justifications/{id}'),
+    (re.compile(r'^/bridgecrew/api/v1/suppressions/[^/]+$'), '/bridgecrew/api/v1/suppressions/{policyId}'),
+]
+
+def endpoint_name(path):
+    """
+    Map a request path to its endpoint template, so per-resource paths share one series.
+    """
+    path = path.split('?', 1)[0]
+    for pattern, template in ENDPOINT_TEMPLATES:
+        if pattern.match(path):
+            return template
+    return path
+
+class EndpointStats:
+    def __init__(self):
+        self.calls = 0
+        self.statuses = defaultdict(int)
+        self.latency_buckets = [0] * len(LATENCY_BUCKETS)
+        self.latency_sum = 0.0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.retries = defaultdict(int)
+        self.json_decode_seconds = 0.0
+
+    def as_dict(self):
+        return {
+            'calls': self.calls,
+            'statuses': dict(self.statuses),
+            'latency_seconds': {
+                'sum': round(self.latency_sum, 6),
+                'mean': round(self.latency_sum / self.calls, 6) if self.calls else 0,
+                'buckets': {str(le): count for le, count in zip(LATENCY_BUCKETS, self.latency_buckets)},
+            },
+            'bytes_sent': self.bytes_sent,
+            'bytes_received': self.bytes_received,
+            'retries': dict(self.retries),
+            'json_decode_seconds': round(self.json_decode_seconds, 6),
+        }
+
+class RequestMetrics:
+    """
+    PrismaClient hook that records per-endpoint call counts, status codes,
+    latency histograms, bytes transferred, retries and JSON decode time.
+    """
+
+    def __init__(self):
+        self.endpoints = defaultdict(EndpointStats)
+        self._lock = threading.Lock()
+
+    def on_response(self, method, path, status, elapsed, bytes_sent, bytes_received):
+        with self._lock:
+            stats = self.endpoints[(method, endpoint_name(path))]
+            stats.calls += 1
+            stats.statuses[str(status)] += 1
+            stats.latency_sum += elapsed
+            for index, le in enumerate(LATENCY_BUCKETS):
+                if elapsed <= le:
+                    stats.latency_buckets[index] += 1
+            stats.bytes_sent += bytes_sent
+            stats.bytes_received += bytes_received
+
+    def on_retry(self, method, path, reason):
+        with self._lock:
+            self.endpoints[(method, endpoint_name(path))].retries[str(reason)] += 1
+
+    def on_json_decode(self, method, path, elapsed):
+        with self._lock:
+            self.endpoints[(method, endpoint_name(path))].json_decode_seconds += elapsed
+
+    def summary(self):
+        with self._lock:
+            return [dict(method=method, endpoint=endpoint, **stats.as_dict())
+                    for (method, endpoint), stats in sorted(self.endpoints.items())]
+
+    def prometheus(self):
+        """
+        Render the metrics in the Prometheus text exposition format.
+        """
+        lines = []
+
+        def header(name, metric_type, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+
+        with self._lock:
+            items = sorted(self.endpoints.items())
+            header('prisma_api_requests_total', 'counter', 'Prisma Cloud API responses by status.')
+            for (method, endpoint), stats in items:
+                for status, count in sorted(stats.statuses.items()):
+                    lines.append(f'prisma_api_requests_total{{method="{method}",endpoint="{endpoint}",status="{status}"}} {count}')
+            header('prisma_api_request_duration_seconds', 'histogram', 'Prisma Cloud API response latency.')
+            for (method, endpoint), stats in items:
+                labels = f'method="{method}",endpoint="{endpoint}"'
+                for le, count in zip(LATENCY_BUCKETS, stats.latency_buckets):
+                    lines.append(f'prisma_api_request_duration_seconds_bucket{{{labels},le="{le}"}} {count}')
+                lines.append(f'prisma_api_request_duration_seconds_bucket{{{labels},le="+Inf"}} {stats.calls}')
+                lines.append(f'prisma_api_request_duration_seconds_sum{{{labels}}} {stats.latency_sum:.6f}')
+                lines.append(f'prisma_api_request_duration_seconds_count{{{labels}}} {stats.calls}')
+            header('prisma_api_request_bytes_total', 'counter', 'Bytes sent in Prisma Cloud API request bodies.')
+            for (method, endpoint), stats in items:
+                lines.append(f'prisma_api_request_bytes_total{{method="{method}",endpoint="{endpoint}"}} {stats.bytes_sent}')
+            header('prisma_api_response_bytes_total', 'counter', 'Bytes received in Prisma Cloud API response bodies.')
+            for (method, endpoint), stats in items:
+                lines.append(f'prisma_api_response_bytes_total{{method="{method}",endpoint="{endpoint}"}} {stats.bytes_received}')
+            header('prisma_api_retries_total', 'counter', 'Prisma Cloud API retries by reason.')
+            for (method, endpoint), stats in items:
+                for reason, count in sorted(stats.retries.items()):
+                    lines.append(f'prisma_api_retries_total{{method="{method}",endpoint="{endpoint}",reason="{reason}"}} {count}')
+            header('prisma_api_json_decode_seconds_total', 'counter', 'Time spent decoding Prisma Cloud API JSON responses.')
+            for (method, endpoint), stats in items:
+                lines.append(f'prisma_api_json_decode_seconds_total{{method="{method}",endpoint="{endpoint}"}} {stats.json_decode_seconds:.6f}')
+        return '\n'.join(lines) + '\n'
+
+    def export(self, path):
+        """
+        Write the metrics atomically to `path`: Prometheus text format for a .prom file, JSON otherwise.
+        """
+        if path.endswith('.prom'):
+            content = self.prometheus()
+        else:
+            content = json.dumps(self.summary(), indent=2)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+METRICS = RequestMetrics()
+_export_registered = False
+_export_lock = threading.Lock()
+
+def metrics_from_env():
+    """
+    Return the process-wide RequestMetrics if PRISMA_METRICS_FILE is set, registering its export at exit.
+    """
+    global _export_registered
+    path = os.environ.get('PRISMA_METRICS_FILE')
+    if not path:
+        return None
+    with _export_lock:
+        if not _export_registered:
+            atexit.register(METRICS.export, path)
+            _export_registered = True
+    return METRICS
+
+def export_metrics():
+    """
+    Write the metrics collected so far to PRISMA_METRICS_FILE, for long-running processes that do not exit after a run.
+    """
+    path = os.environ.get('PRISMA_METRICS_FILE')
+    if path and _export_registered:
+        METRICS.export(path)
@@ -0,0 +1,97 @@
+import csv
+import io
+import json
+import sys
+
+FORMATS = ['text', 'ndjson', 'csv', 'json']
+BUFFER_SIZE = 1 << 20
+
+def add_output_arguments(parser):
+    """
+    Add the common --format and --fields options to an argument parser.
+    """
+    parser.add_argument("--format", choices=FORMATS, default="text", help="Output format (default: text)")
+    parser.add_argument("--fields", type=lambda value: value.split(','), help="Comma-separated fields to output; dotted names select nested fields (structured formats only)")
+
+def project(record, fields):
+    """
+    Return a record restricted to `fields`; dotted names such as "resources.0.accountId" walk nested values.
+    """
+    if not fields:
+        return record
+    projected = {}
+    for field in fields:
+        value = record
+        for part in field.split('.'):
+            if isinstance(value, dict):
+                value = value.get(part)
+            elif isinstance(value, list) and part.isdigit() and int(part) < len(value):
+                value = value[int(part)]
+            else:
+                value = None
+                break
+        projected[field] = value
+    return projected
+
+class RecordWriter:
+    """
+    Streams records to stdout (or another binary stream) as NDJSON, CSV or a JSON array.
+
+    Output goes through a large write buffer instead of one unbuffered print
+    per field. Records are written as they are passed in, so callers can feed
+    a generator without holding the full result in memory.
+
+    Args:
+    output_format (str): 'ndjson', 'csv' or 'json'.
+    fields (list): Fields to keep (default: all fields of each record).
+    stream: Binary stream to write to (default: stdout).
+    """
+
+    def __init__(self, output_format, fields=None, stream=None):
+        self.format = output_format
+        self.fields = fields
+        binary = stream or open(sys.stdout.fileno(), 'wb', buffering=BUFFER_SIZE, closefd=False)
+        self.out = io.TextIOWrapper(binary, encoding='utf-8', newline='', write_through=False)
+        self.count = 0
+        self.csv_writer = None
+
+    def __enter__(self):
+        sys.stdout.flush()
+        if self.format == 'json':
+            self.out.write('[')
+        return self
+
+    def write(self, record):
+        record = project(record, self.fields)
+        if self.format == 'ndjson':
+            self.out.write(json.dumps(record))
+            self.out.write('\n')
+        elif self.format == 'json':
+            self.out.write(',\n' if self.count else '\n')
+            self.out.write(json.dumps(record))
+        elif self.format == 'csv':
+            if self.csv_writer is None:
+                self.csv_writer = csv.DictWriter(self.out, fieldnames=self.fields or list(record), extrasaction='ignore')
+                self.csv_writer.writeheader()
+            self.csv_writer.writerow({key: json.dumps(value) if isinstance(value, (dict, list)) else value
+                                      for key, value in record.items()})
+        self.count += 1
+
+    def write_all(self, records):
+        for record in records:
+            self.write(record)
+        return self.count
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # Leave the array unclosed on errors, so a partial result is not mistaken for a complete one.
+        if self.format == 'json' and exc_type is None:
+            self.out.write('\n]\n' if self.count else ']\n')
+        self.out.flush()
+        self.out.detach().flush()
+
+def write_records(records, output_format, fields=None):
+    """
+    Write an iterable of records in a structured format and return how many were written.
+    """
+    with RecordWriter(output_format, fields) as writer:
+        return writer.write_all(records)
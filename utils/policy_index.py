@@ -0,0 +1,246 @@
+if __name__ == "__main__":
+    # Hand the command to a running agent (utils/agent.py) before the imports below.
+    from utils.agent import run_in_agent
+    run_in_agent("utils.policy_index")
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from utils.get_prisma_token import get_auth_token
+from utils.inventory_cache import DEFAULT_TTL, iter_cached_repositories
+from utils.inventory_graph import InventoryGraph, repository_account
+from utils.prisma_client import get_client
+from utils.output import add_output_arguments, write_records
+
+INDEX_FILE = os.environ.get('PRISMA_POLICY_INDEX', 'prisma_policy_index.db')
+ENFORCEMENT_RULES_PATH = "/code/api/v1/policies/enforcement-rules"
+
+def rule_hash(rule):
+    return hashlib.sha256(json.dumps(rule, sort_keys=True).encode()).hexdigest()
+
+def rule_thresholds(rule):
+    """
+    Return the severity thresholds of a rule: its per-category thresholds if it has them, else its severity.
+    """
+    return rule.get('codeCategories') or {'severity': rule.get('severity')}
+
+def effective_rules(rules, repositories):
+    """
+    Map each repository to the enabled enforcement rule in effect for it, as resolved by InventoryGraph.
+
+    Returns:
+    dict: {repo_id: rule_id}
+    """
+    return InventoryGraph({'repositories': repositories, 'enforcement_rules': rules}).rule_id_by_repo
+
+class PolicyIndex:
+    """
+    Persistent index of the enforcement rule, severity thresholds and policies in effect for each repository.
+
+    The index is built from the enforcement rules and the cached repository
+    inventory. A refresh sends a conditional request for the rules and, when
+    the rules or the inventory changed, rewrites only the rules whose content
+    hash changed and the repositories whose effective rule changed. Lookups
+    are single indexed SQLite reads, with no API calls.
+
+    Args:
+    api_url (str): The base URL of the Prisma Cloud API.
+    path (str): Index database file (default: PRISMA_POLICY_INDEX or prisma_policy_index.db).
+    """
+
+    def __init__(self, api_url, path=None):
+        self.api_url = api_url
+        self.key = api_url.rstrip('/')
+        self.path = path or INDEX_FILE
+        self.conn = sqlite3.connect(self.path, timeout=30)
+        c = self.conn.cursor()
+        c.execute('''CREATE TABLE IF NOT EXISTS index_meta
+                     (api_url TEXT PRIMARY KEY, fetched_at REAL, etag TEXT, last_modified TEXT, inventory_hash TEXT)''')
+        c.execute('''CREATE TABLE IF NOT EXISTS rules
+                     (api_url TEXT, rule_id TEXT, position INTEGER, content_hash TEXT, data TEXT, PRIMARY KEY (api_url, rule_id))''')
+        c.execute('''CREATE TABLE IF NOT EXISTS repo_rules
+                     (api_url TEXT, repo_id TEXT, account TEXT, rule_id TEXT, PRIMARY KEY (api_url, repo_id))''')
+        c.execute("CREATE INDEX IF NOT EXISTS idx_repo_rules_account ON repo_rules (api_url, account)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_repo_rules_rule ON repo_rules (api_url, rule_id)")
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _meta(self):
+        return self.conn.execute("SELECT fetched_at, etag, last_modified, inventory_hash FROM index_meta WHERE api_url = ?",
+                                 (self.key,)).fetchone()
+
+    def _stored_rules(self):
+        c = self.conn.execute("SELECT data FROM rules WHERE api_url = ? ORDER BY position", (self.key,))
+        return [json.loads(data) for data, in c]
+
+    def sync(self, auth_token, ttl=DEFAULT_TTL, force=False):
+        """
+        Bring the index up to date with the enforcement rules and the repository inventory.
+
+        Args:
+        auth_token (str): The authentication token for API requests.
+        ttl (int): Seconds to reuse the local repository cache.
+        force (bool): Ignore validators and download the full rule list.
+
+        Returns:
+        dict: Numbers of rules changed and repositories reassigned or removed, or None if nothing changed.
+        """
+        meta = self._meta()
+        headers = {}
+        if meta and not force:
+            if meta[1]:
+                headers['If-None-Match'] = meta[1]
+            if meta[2]:
+                headers['If-Modified-Since'] = meta[2]
+        response = get_client(self.api_url, auth_token).get(ENFORCEMENT_RULES_PATH, headers=headers)
+
+        repositories = list(iter_cached_repositories(self.api_url, auth_token, ttl, force))
+        inventory_hash = hashlib.sha256('\n'.join(sorted(f"{repo['id']} {repository_account(repo)}"
+                                                         for repo in repositories)).encode()).hexdigest()
+        counts = {'rules': 0, 'reassigned': 0, 'removed': 0}
+        with self.conn:
+            if response.status_code == 304:
+                rules = self._stored_rules()
+                etag, last_modified = meta[1], meta[2]
+            else:
+                rules = response.json() or []
+                etag, last_modified = response.headers.get('ETag'), response.headers.get('Last-Modified')
+                known = {rule_id: (position, content_hash) for rule_id, position, content_hash in
+                         self.conn.execute("SELECT rule_id, position, content_hash FROM rules WHERE api_url = ?", (self.key,))}
+                for position, rule in enumerate(rules):
+                    content_hash = rule_hash(rule)
+                    previous = known.pop(rule['id'], None)
+                    if previous == (position, content_hash):
+                        continue
+                    # A rule moving up or down the list can change which repositories it claims first.
+                    counts['rules'] += 1
+                    self.conn.execute("INSERT OR REPLACE INTO rules VALUES (?, ?, ?, ?, ?)",
+                                      (self.key, rule['id'], position, content_hash, json.dumps(rule)))
+                counts['rules'] += len(known)
+                self.conn.executemany("DELETE FROM rules WHERE api_url = ? AND rule_id = ?", ((self.key, rule_id) for rule_id in known))
+
+            if counts['rules'] or not meta or meta[3] != inventory_hash:
+                effective = effective_rules(rules, repositories)
+                accounts = {repo['id']: repository_account(repo) for repo in repositories}
+                current = {repo_id: (account, rule_id) for repo_id, account, rule_id in
+                           self.conn.execute("SELECT repo_id, account, rule_id FROM repo_rules WHERE api_url = ?", (self.key,))}
+                changed = [(self.key, repo_id, accounts.get(repo_id), rule_id) for repo_id, rule_id in effective.items()
+                           if current.get(repo_id) != (accounts.get(repo_id), rule_id)]
+                removed = [(self.key, repo_id) for repo_id in current.keys() - effective.keys()]
+                self.conn.executemany("INSERT OR REPLACE INTO repo_rules VALUES (?, ?, ?, ?)", changed)
+                self.conn.executemany("DELETE FROM repo_rules WHERE api_url = ? AND repo_id = ?", removed)
+                counts['reassigned'], counts['removed'] = len(changed), len(removed)
+            self.conn.execute("INSERT OR REPLACE INTO index_meta VALUES (?, ?, ?, ?, ?)",
+                              (self.key, time.time(), etag, last_modified, inventory_hash))
+        return counts if any(counts.values()) else None
+
+    def is_stale(self, ttl=DEFAULT_TTL):
+        meta = self._meta()
+        return not meta or time.time() - meta[0] >= ttl
+
+    def refresh_if_stale(self, auth_token, ttl=DEFAULT_TTL, refresh=False):
+        """
+        Sync if the index was never built or is older than `ttl` seconds.
+        """
+        if refresh or self.is_stale(ttl):
+            return self.sync(auth_token, ttl, force=refresh)
+        return None
+
+    def _rule(self, rule_id):
+        row = self.conn.execute("SELECT data FROM rules WHERE api_url = ? AND rule_id = ?", (self.key, rule_id)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def lookup(self, repo):
+        """
+        Return the effective enforcement of a repository, given its ID or "owner/repository".
+
+        Returns:
+        dict: repoId, repository, ruleId, ruleName, ruleType, thresholds and policies; None if the repository is not indexed.
+        """
+        # Two single-index queries; an OR of both columns would make SQLite scan the table.
+        for column in ('repo_id', 'account'):
+            row = self.conn.execute(f'''SELECT r.repo_id, r.account, r.rule_id, u.data FROM repo_rules r
+                                        JOIN rules u ON u.api_url = r.api_url AND u.rule_id = r.rule_id
+                                        WHERE r.api_url = ? AND r.{column} = ? LIMIT 1''', (self.key, repo)).fetchone()
+            if row:
+                break
+        if not row:
+            return None
+        repo_id, account, rule_id, data = row
+        rule = json.loads(data)
+        return {
+            'repoId': repo_id,
+            'repository': account,
+            'ruleId': rule_id,
+            'ruleName': rule.get('name'),
+            'ruleType': rule.get('type'),
+            'thresholds': rule_thresholds(rule),
+            'policies': rule.get('policies') or [],
+        }
+
+    def repositories_for_rule(self, rule_id):
+        """
+        Return (repo_id, "owner/repository") of the repositories a rule is in effect for.
+        """
+        return self.conn.execute("SELECT repo_id, account FROM repo_rules WHERE api_url = ? AND rule_id = ? ORDER BY account",
+                                 (self.key, rule_id)).fetchall()
+
+def main():
+    parser = argparse.ArgumentParser(description="Look up the enforcement rule, thresholds and policies in effect for repositories.")
+    parser.add_argument("--repo", action="append", default=[], help="Repository ID or owner/repository to look up (repeatable)")
+    parser.add_argument("--rule", help="List the repositories an enforcement rule is in effect for")
+    parser.add_argument("--cache-ttl", type=int, default=DEFAULT_TTL, help=f"Seconds before the index is refreshed (default: {DEFAULT_TTL})")
+    parser.add_argument("--refresh", action="store_true", help="Download the rules and repositories even if the index is fresh")
+    add_output_arguments(parser)
+    args = parser.parse_args()
+
+    api_url = os.environ.get('PRISMA_API_URL')
+    username = os.environ.get('PRISMA_ACCESS_KEY')
+    password = os.environ.get('PRISMA_SECRET_KEY')
+
+    if not all([api_url, username, password]):
+        raise ValueError("One or more required environment variables are not set. Please set PRISMA_API_URL, PRISMA_ACCESS_KEY, and PRISMA_SECRET_KEY.")
+
+    with PolicyIndex(api_url) as index:
+        # Only log in when the index has to be refreshed; fresh lookups are purely local.
+        if args.refresh or index.is_stale(args.cache_ttl):
+            counts = index.sync(get_auth_token(api_url, username, password), args.cache_ttl, force=args.refresh)
+            if counts:
+                print(f"Policy index updated: {counts['rules']} rules changed, {counts['reassigned']} repositories reassigned, "
+                      f"{counts['removed']} removed")
+
+        if args.rule:
+            records = [{'repoId': repo_id, 'repository': account} for repo_id, account in index.repositories_for_rule(args.rule)]
+        else:
+            records = [index.lookup(repo) or {'repoId': repo, 'ruleId': None} for repo in args.repo]
+
+    if args.format != 'text':
+        write_records(records, args.format, args.fields)
+        return
+    if args.rule:
+        print(f"Rule {args.rule} is in effect for {len(records)} repositories:")
+        for record in records:
+            print(f"  - {record['repository']} ({record['repoId']})")
+        return
+    for record in records:
+        if not record['ruleId']:
+            print(f"{record['repoId']}: not in the policy index")
+            continue
+        print(f"\n{record['repository']} ({record['repoId']})")
+        print(f"Rule: {record['ruleName']} ({record['ruleId']}, {record['ruleType']})")
+        print(f"Thresholds: {json.dumps(record['thresholds'])}")
+        print(f"Policies: {', '.join(record['policies']) or 'none'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+import codecs
+import json
+import os
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from utils.metrics import metrics_from_env
+from utils.rate_limit import BACKOFF_MAX, AdaptiveConcurrencyLimiter, EndpointRateLimiter, backoff_delay, parse_retry_after
+
+DEFAULT_POOL_SIZE = 32
+STREAM_CHUNK_SIZE = 64 * 1024
+MAX_RETRIES = int(os.environ.get('PRISMA_MAX_RETRIES', 5))
+RETRY_STATUSES = {429, 502, 503, 504}
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+class PrismaClient:
+    """
+    Shared HTTP client for the Prisma Cloud API.
+
+    Owns a single requests.Session so that every call made through it reuses
+    keep-alive connections from one connection pool instead of paying for a
+    new TCP+TLS handshake per request.
+
+    Requests pass through a per-endpoint token-bucket limiter (budgets from
+    PRISMA_RATE_LIMIT / PRISMA_RATE_LIMITS) and an AIMD limit on requests in
+    flight. Throttled and transient failures are retried with jittered
+    exponential backoff, honouring Retry-After: idempotent methods on 429,
+    502, 503, 504 and connection errors, other methods only on 429. A
+    Retry-After longer than BACKOFF_MAX fails the request instead of stalling
+    every worker for that long.
+
+    Args:
+    api_url (str): The base URL of the Prisma Cloud API.
+    auth_token (str): The authentication token for API requests (optional).
+    pool_size (int): Maximum number of pooled connections per host.
+    rate_limiter (EndpointRateLimiter): Endpoint budgets (default: from the environment).
+
+    Hooks in `hooks` are called with on_response, on_retry and on_json_decode
+    for every HTTP exchange; setting PRISMA_METRICS_FILE installs the
+    RequestMetrics hook from utils.metrics.
+    """
+
+    def __init__(self, api_url, auth_token=None, pool_size=DEFAULT_POOL_SIZE, rate_limiter=None):
+        self.api_url = api_url.rstrip('/')
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({'Accept': 'application/json'})
+        self.rate_limiter = rate_limiter or EndpointRateLimiter.from_env()
+        self.concurrency = AdaptiveConcurrencyLimiter(pool_size)
+        self.hooks = []
+        metrics = metrics_from_env()
+        if metrics is not None:
+            self.hooks.append(metrics)
+        self.auth_token = None
+        self.token_manager = None
+        if auth_token:
+            self.set_token(auth_token)
+
+    def set_token(self, auth_token):
+        self.auth_token = auth_token
+        self.session.headers['Authorization'] = f"Bearer {auth_token}"
+
+    def _notify(self, event, *args):
+        for hook in self.hooks:
+            getattr(hook, event)(*args)
+
+    def _send(self, method, url, path, **kwargs):
+        start = time.monotonic()
+        try:
+            with self.concurrency:
+                response = self.session.request(method, url, **kwargs)
+        except requests.exceptions.RequestException:
+            if self.hooks:
+                self._notify('on_response', method, path, 'error', time.monotonic() - start, 0, 0)
+            raise
+        if self.hooks:
+            body = response.request.body
+            bytes_sent = len(body) if body else 0
+            if kwargs.get('stream'):
+                bytes_received = int(response.headers.get('Content-Length') or 0)
+            else:
+                bytes_received = len(response.content)
+            self._notify('on_response', method, path, response.status_code, response.elapsed.total_seconds(), bytes_sent, bytes_received)
+        return response
+
+    def request(self, method, path, retry_auth=True, **kwargs):
+        """
+        Send a request to the API and raise on HTTP errors.
+
+        Args:
+        method (str): HTTP method.
+        path (str): Path relative to the API base URL, starting with '/'.
+        retry_auth (bool): Log in again and retry once on a 401 if a token manager is attached.
+        **kwargs: Passed through to requests.Session.request.
+
+        Returns:
+        requests.Response: The response object.
+
+        Raises:
+        requests.exceptions.HTTPError: If the API request fails, or asks to retry after more than BACKOFF_MAX seconds.
+        """
+        url = f"{self.api_url}{path}"
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        bucket = self.rate_limiter.bucket(path)
+        attempt = 0
+        while True:
+            bucket.acquire()
+            sent_token = self.auth_token
+            try:
+                response = self._send(method, url, path, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if not idempotent or attempt >= MAX_RETRIES:
+                    raise
+                self._notify('on_retry', method, path, 'connection')
+                time.sleep(backoff_delay(attempt))
+                attempt += 1
+                continue
+
+            if response.status_code == 401 and retry_auth and self.token_manager is not None:
+                response.close()
+                self.set_token(self.token_manager.refresh(stale_token=sent_token))
+                self._notify('on_retry', method, path, 401)
+                retry_auth = False
+                continue
+
+            if response.status_code in RETRY_STATUSES:
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                bucket.on_throttle(min(retry_after, BACKOFF_MAX) if retry_after is not None else None)
+                self.concurrency.on_throttle()
+                if attempt < MAX_RETRIES and (idempotent or response.status_code == 429):
+                    if retry_after is not None and retry_after > BACKOFF_MAX:
+                        response.close()
+                        raise requests.exceptions.HTTPError(
+                            f"{response.status_code} for {method} {path}: Retry-After of {retry_after:.0f}s "
+                            f"exceeds the {BACKOFF_MAX:.0f}s maximum wait", response=response)
+                    response.close()
+                    self._notify('on_retry', method, path, response.status_code)
+                    time.sleep(retry_after if retry_after is not None else backoff_delay(attempt))
+                    attempt += 1
+                    continue
+            elif response.status_code < 400:
+                bucket.on_success()
+                self.concurrency.on_success()
+
+            response.raise_for_status()
+            return response
+
+    def request_json(self, method, path, **kwargs):
+        """
+        Send a request and return the decoded JSON body, timing the decode for the hooks.
+        """
+        response = self.request(method, path, **kwargs)
+        start = time.monotonic()
+        data = response.json()
+        self._notify('on_json_decode', method, path, time.monotonic() - start)
+        return data
+
+    def get_json(self, path, **kwargs):
+        return self.request_json('GET', path, **kwargs)
+
+    def post_json(self, path, **kwargs):
+        return self.request_json('POST', path, **kwargs)
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request('DELETE', path, **kwargs)
+
+    def stream_json_array(self, method, path, **kwargs):
+        """
+        Send a request and yield the elements of a JSON array response as they arrive.
+
+        The body is decoded incrementally, so only the element being parsed is
+        held in memory rather than the whole response. If the body is an object
+        instead of an array, its 'data' list is yielded (or the object itself).
+        """
+        response = self.request(method, path, stream=True, **kwargs)
+        try:
+            yield from iter_json_array(response.iter_content(STREAM_CHUNK_SIZE))
+        finally:
+            response.close()
+
+    def close(self):
+        self.session.close()
+
+def get_client(api_url, auth_token=None):
+    """
+    Return the shared PrismaClient for an API URL, creating it on first use.
+
+    The existing helper functions take (api_url, auth_token) and call this, so
+    all of them share one connection pool per tenant. If auth_token is given
+    it replaces the token currently held by the client, unless a TokenManager
+    is attached, in which case the manager keeps the token current.
+    """
+    key = api_url.rstrip('/')
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = PrismaClient(key)
+            _clients[key] = client
+    if auth_token and client.token_manager is None:
+        client.set_token(auth_token)
+    return client
+
+def iter_json_array(chunks):
+    """
+    Incrementally decode a JSON array from an iterable of byte chunks.
+
+    Yields:
+    The decoded elements of the top-level array, in order.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    pos = 0
+    in_array = False
+    chunks = iter(chunks)
+    exhausted = False
+
+    while True:
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+            pos += 1
+        if pos < len(buffer):
+            if not in_array:
+                if buffer[pos] != '[':
+                    rest = buffer[pos:] + ''.join(text_decoder.decode(chunk) for chunk in chunks) + text_decoder.decode(b'', final=True)
+                    document = json.loads(rest)
+                    if isinstance(document, dict) and isinstance(document.get('data'), list):
+                        yield from document['data']
+                    else:
+                        yield document
+                    return
+                in_array = True
+                pos += 1
+                continue
+            if buffer[pos] == ']':
+                return
+            try:
+                element, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                end = None
+            # A scalar ending exactly at the buffer boundary may continue in the next chunk.
+            if end is not None and (end < len(buffer) or exhausted):
+                yield element
+                pos = end
+                continue
+            if exhausted:
+                raise ValueError("Truncated JSON array in response body")
+        if exhausted:
+            if in_array:
+                raise ValueError("Truncated JSON array in response body")
+            return
+        buffer = buffer[pos:]
+        pos = 0
+        chunk = next(chunks, None)
+        if chunk is None:
+            exhausted = True
+            buffer += text_decoder.decode(b'', final=True)
+        else:
+            buffer += text_decoder.decode(chunk)
@@ -0,0 +1,170 @@
+import datetime
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 60.0
+MIN_RATE = 0.1
+
+def parse_rate_limits(value):
+    """
+    Parse per-endpoint budgets of the form "/code/api/v1/repositories=2,/bridgecrew=10".
+
+    Returns:
+    dict: {path_prefix: requests_per_second}
+    """
+    budgets = {}
+    for item in (value or '').split(','):
+        if '=' in item:
+            prefix, rate = item.rsplit('=', 1)
+            budgets[prefix.strip()] = float(rate)
+    return budgets
+
+def parse_retry_after(value):
+    """
+    Return the delay in seconds requested by a Retry-After header (seconds or HTTP date), or None.
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max((retry_at - datetime.datetime.now(datetime.timezone.utc)).total_seconds(), 0.0)
+
+def backoff_delay(attempt):
+    """
+    Exponential backoff with full jitter for the given retry attempt (0-based).
+    """
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+class TokenBucket:
+    """
+    Token bucket shared by all threads sending to one endpoint.
+
+    The refill rate drops by half on every throttled response and recovers
+    additively on successes, up to the configured rate. A Retry-After value
+    pauses the bucket for every caller until it has passed.
+
+    Args:
+    rate (float): Requests per second, or None for no limit.
+    burst (int): Bucket capacity (default: one second of requests).
+    """
+
+    def __init__(self, rate=None, burst=None):
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate or 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    delay = self.paused_until - now
+                elif self.rate is None:
+                    return
+                else:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+    def on_success(self):
+        if self.max_rate is None:
+            return
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+    def on_throttle(self, retry_after=None):
+        with self._lock:
+            if self.rate is not None:
+                self.rate = max(MIN_RATE, self.rate / 2)
+            if retry_after:
+                self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+
+class EndpointRateLimiter:
+    """
+    Token buckets per endpoint budget, selected by the longest matching path prefix.
+
+    Paths without a budget share one bucket using default_rate.
+
+    Args:
+    budgets (dict): {path_prefix: requests_per_second}.
+    default_rate (float): Rate for all other paths, or None for no limit.
+    """
+
+    def __init__(self, budgets=None, default_rate=None):
+        self.prefixes = sorted(budgets or {}, key=len, reverse=True)
+        self.buckets = {prefix: TokenBucket(rate) for prefix, rate in (budgets or {}).items()}
+        self.default_bucket = TokenBucket(default_rate)
+
+    @classmethod
+    def from_env(cls):
+        default_rate = os.environ.get('PRISMA_RATE_LIMIT')
+        return cls(parse_rate_limits(os.environ.get('PRISMA_RATE_LIMITS')),
+                   float(default_rate) if default_rate else None)
+
+    def bucket(self, path):
+        for prefix in self.prefixes:
+            if path.startswith(prefix):
+                return self.buckets[prefix]
+        return self.default_bucket
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD limit on the number of requests in flight.
+
+    The limit grows by about one per limit-sized window of successes and is
+    halved (at most once per second) when the server throttles.
+
+    Args:
+    max_limit (int): Upper bound, normally the connection pool size.
+    """
+
+    def __init__(self, max_limit):
+        self.max_limit = max_limit
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self.last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def __enter__(self):
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+    def on_success(self):
+        with self._condition:
+            previous = int(self.limit)
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            if int(self.limit) > previous:
+                self._condition.notify()
+
+    def on_throttle(self):
+        with self._condition:
+            now = time.monotonic()
+            if now - self.last_decrease >= 1.0:
+                self.limit = max(1.0, self.limit / 2)
+                self.last_decrease = now
@@ -0,0 +1,192 @@
+if __name__ == "__main__":
+    # Hand the command to a running agent (utils/agent.py) before the imports below.
+    from utils.agent import run_in_agent
+    run_in_agent("utils.risk_timeseries")
+
+import argparse
+import datetime
+import os
+import sqlite3
+import time
+from collections import defaultdict
+from utils.output import add_output_arguments, write_records
+
+STORE_FILE = os.environ.get('PRISMA_RISK_STORE', 'prisma_pipeline_risks.db')
+GRANULARITIES = {'hour': 3600, 'day': 86400}
+DIMENSIONS = ('all', 'severity', 'category', 'system', 'repo')
+COUNTERS = ('total', 'open', 'fixed', 'suppressed')
+METRICS = COUNTERS + ('open_max', 'open_avg')
+SAMPLE_RETENTION_DAYS = 30
+HOURLY_RETENTION_DAYS = 90
+
+def connect(path=None):
+    conn = sqlite3.connect(path or STORE_FILE, timeout=30)
+    c = conn.cursor()
+    c.execute('''CREATE TABLE IF NOT EXISTS risk_samples
+                 (timestamp INTEGER, policy_id TEXT, repo_id TEXT, severity TEXT, category TEXT, system TEXT,
+                  total INTEGER, open INTEGER, fixed INTEGER, suppressed INTEGER)''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_risk_samples_timestamp ON risk_samples (timestamp)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_risk_samples_policy ON risk_samples (policy_id, timestamp)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_risk_samples_repo ON risk_samples (repo_id, timestamp)")
+    c.execute('''CREATE TABLE IF NOT EXISTS risk_rollups
+                 (granularity TEXT, bucket INTEGER, dimension TEXT, value TEXT, samples INTEGER, last_timestamp INTEGER,
+                  total INTEGER, open INTEGER, fixed INTEGER, suppressed INTEGER, open_max INTEGER, open_sum INTEGER,
+                  PRIMARY KEY (granularity, dimension, value, bucket))''')
+    conn.commit()
+    return conn
+
+def risk_counters(risk):
+    return (risk.get('totalAlerts') or 0, risk.get('openAlerts') or 0,
+            risk.get('fixedAlerts') or 0, risk.get('suppressedAlerts') or 0)
+
+def aggregate(risks):
+    """
+    Sum the alert counters of one fetch per (dimension, value).
+
+    Returns:
+    dict: {(dimension, value): [total, open, fixed, suppressed]}
+    """
+    sums = defaultdict(lambda: [0, 0, 0, 0])
+    for risk in risks:
+        counters = risk_counters(risk)
+        for dimension, value in (('all', '*'), ('severity', risk.get('severity')), ('category', risk.get('category')),
+                                 ('system', risk.get('system')), ('repo', risk.get('repoId'))):
+            row = sums[(dimension, value or '')]
+            for index, count in enumerate(counters):
+                row[index] += count
+    return sums
+
+def record_fetch(conn, risks, timestamp=None):
+    """
+    Append one pipeline-risks fetch to the store and fold it into the hourly and daily rollups.
+
+    Rollups are updated in place from the fetch alone, never by rescanning raw
+    samples. A rollup row keeps the counters of the latest fetch in its bucket
+    (alert counts are gauges), the maximum and the running sum of open alerts
+    and the number of fetches. Values missing from the newest fetch of a
+    bucket are set to 0. A fetch older than one already recorded never changes
+    the counters the newer fetch wrote.
+
+    Args:
+    conn (sqlite3.Connection): Store connection from connect().
+    risks (list): Pipeline risks as returned in the "data" field of the API response.
+    timestamp (int): Fetch time in epoch seconds (default: now).
+
+    Returns:
+    int: The timestamp recorded.
+    """
+    timestamp = int(timestamp if timestamp is not None else time.time())
+    sums = aggregate(risks)
+    with conn:
+        conn.executemany("INSERT INTO risk_samples VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", (
+            (timestamp, risk.get('policyId'), risk.get('repoId'), risk.get('severity'), risk.get('category'),
+             risk.get('system'), *risk_counters(risk)) for risk in risks
+        ))
+        for granularity, seconds in GRANULARITIES.items():
+            bucket = timestamp - timestamp % seconds
+            latest = conn.execute("SELECT MAX(last_timestamp) FROM risk_rollups WHERE granularity = ? AND bucket = ?",
+                                  (granularity, bucket)).fetchone()[0]
+            conn.executemany('''INSERT INTO risk_rollups VALUES (?, ?, ?, ?, 1, ?, ?, ?, ?, ?, ?, ?)
+                                ON CONFLICT (granularity, dimension, value, bucket) DO UPDATE SET
+                                    samples = samples + 1,
+                                    total = CASE WHEN excluded.last_timestamp >= last_timestamp THEN excluded.total ELSE total END,
+                                    open = CASE WHEN excluded.last_timestamp >= last_timestamp THEN excluded.open ELSE open END,
+                                    fixed = CASE WHEN excluded.last_timestamp >= last_timestamp THEN excluded.fixed ELSE fixed END,
+                                    suppressed = CASE WHEN excluded.last_timestamp >= last_timestamp THEN excluded.suppressed ELSE suppressed END,
+                                    last_timestamp = MAX(last_timestamp, excluded.last_timestamp),
+                                    open_max = MAX(open_max, excluded.open_max),
+                                    open_sum = open_sum + excluded.open_sum''', (
+                (granularity, bucket, dimension, value, timestamp, total, open_count, fixed, suppressed, open_count, open_count)
+                for (dimension, value), (total, open_count, fixed, suppressed) in sums.items()
+            ))
+            if latest is not None and latest > timestamp:
+                # An out-of-order fetch must not zero what the newer one wrote. Only the values it added
+                # are stamped older than the newer fetch, and those were absent from it, so they have no alerts now.
+                conn.execute('''UPDATE risk_rollups SET last_timestamp = ?, total = 0, open = 0, fixed = 0, suppressed = 0
+                                WHERE granularity = ? AND bucket = ? AND last_timestamp < ?''',
+                             (latest, granularity, bucket, latest))
+                continue
+            # Values seen earlier in the bucket but absent from this fetch have no alerts now.
+            conn.execute('''UPDATE risk_rollups SET samples = samples + 1, last_timestamp = ?,
+                                total = 0, open = 0, fixed = 0, suppressed = 0
+                            WHERE granularity = ? AND bucket = ? AND last_timestamp < ?''',
+                         (timestamp, granularity, bucket, timestamp))
+    return timestamp
+
+def prune(conn, sample_days=SAMPLE_RETENTION_DAYS, hourly_days=HOURLY_RETENTION_DAYS, now=None):
+    """
+    Drop raw samples and hourly rollups past their retention; daily rollups are kept.
+    """
+    now = now if now is not None else time.time()
+    with conn:
+        conn.execute("DELETE FROM risk_samples WHERE timestamp < ?", (int(now - sample_days * 86400),))
+        conn.execute("DELETE FROM risk_rollups WHERE granularity = 'hour' AND bucket < ?", (int(now - hourly_days * 86400),))
+
+def series(conn, dimension, value='*', metric='open', granularity='day', since=None, until=None):
+    """
+    Read one metric of one dimension value from the rollups, e.g. open CRITICAL alerts per day.
+
+    Args:
+    dimension (str): One of DIMENSIONS.
+    value (str): Dimension value, e.g. "CRITICAL" for severity or a repository ID ("*" for dimension "all").
+    metric (str): One of METRICS; counters are the last value in each bucket.
+    granularity (str): "hour" or "day".
+    since (int): First bucket start time in epoch seconds (default: all).
+    until (int): Last bucket start time in epoch seconds (default: all).
+
+    Returns:
+    list: (bucket start timestamp, metric value) tuples, oldest first.
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric {metric}")
+    column = 'CAST(open_sum AS REAL) / samples' if metric == 'open_avg' else metric
+    c = conn.execute(f'''SELECT bucket, {column} FROM risk_rollups
+                         WHERE granularity = ? AND dimension = ? AND value = ? AND bucket >= ? AND bucket <= ?
+                         ORDER BY bucket''',
+                     (granularity, dimension, value, since or 0, until if until is not None else 2 ** 62))
+    return c.fetchall()
+
+def top_values(conn, dimension, metric='open', granularity='day', bucket=None, limit=10):
+    """
+    Return the dimension values with the highest metric in one bucket (default: the latest one).
+    """
+    if bucket is None:
+        bucket = conn.execute("SELECT MAX(bucket) FROM risk_rollups WHERE granularity = ?", (granularity,)).fetchone()[0]
+    column = 'CAST(open_sum AS REAL) / samples' if metric == 'open_avg' else metric
+    c = conn.execute(f'''SELECT value, {column} AS metric FROM risk_rollups
+                         WHERE granularity = ? AND dimension = ? AND bucket = ? ORDER BY metric DESC LIMIT ?''',
+                     (granularity, dimension, bucket, limit))
+    return c.fetchall()
+
+def main():
+    parser = argparse.ArgumentParser(description="Query pipeline risk trends from the local time-series store.")
+    parser.add_argument("--dimension", choices=DIMENSIONS, default="all", help="Dimension to query (default: all)")
+    parser.add_argument("--value", default="*", help="Dimension value, e.g. CRITICAL or a repository ID")
+    parser.add_argument("--metric", choices=METRICS, default="open", help="Metric to report (default: open)")
+    parser.add_argument("--granularity", choices=list(GRANULARITIES), default="day", help="Rollup granularity (default: day)")
+    parser.add_argument("--days", type=int, default=90, help="How many days back to report (default: 90)")
+    parser.add_argument("--top", type=int, help="Instead of a series, list the N values of --dimension with the highest metric in the latest bucket")
+    add_output_arguments(parser)
+    args = parser.parse_args()
+
+    conn = connect()
+    if args.top:
+        records = [{args.dimension: value, args.metric: metric}
+                   for value, metric in top_values(conn, args.dimension, args.metric, args.granularity, limit=args.top)]
+    else:
+        value = '*' if args.dimension == 'all' else args.value
+        since = int(time.time()) - args.days * 86400
+        records = [{'time': datetime.datetime.fromtimestamp(bucket, datetime.timezone.utc).isoformat(), args.metric: metric}
+                   for bucket, metric in series(conn, args.dimension, value, args.metric, args.granularity, since)]
+    conn.close()
+
+    if args.format != 'text':
+        write_records(records, args.format, args.fields)
+        return
+    if not records:
+        print("No data recorded for this query.")
+    for record in records:
+        print("  ".join(str(value) for value in record.values()))
+
+if __name__ == "__main__":
+    main()
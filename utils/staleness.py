@@ -0,0 +1,117 @@
+import datetime
+import re
+import numpy as np
+from dateutil.parser import parse
+
+DEFAULT_BUCKETS = (7, 30, 90, 180)
+UTC_SUFFIX = re.compile(r'(\.\d*)?(Z|[+-]00:?00)?')
+
+class RepoTable:
+    """
+    Columnar view of the repository list for vectorized staleness queries.
+
+    Scan dates are held as a NumPy datetime64[s] column (NaT for never
+    scanned) and source/owner as categorical columns: an integer code per
+    repository plus the array of distinct values.
+
+    Args:
+    repositories (iterable): Repository dictionaries, e.g. from iter_repositories.
+    """
+
+    def __init__(self, repositories):
+        names, ids, sources, owners, scan_dates = [], [], [], [], []
+        for repo in repositories:
+            names.append(repo.get('repository'))
+            ids.append(repo.get('id'))
+            sources.append(repo.get('source') or 'Unknown')
+            owners.append(repo.get('owner') or 'Unknown')
+            scan_dates.append(repo.get('lastScanDate') or None)
+
+        self.names = np.array(names, dtype=object)
+        self.ids = np.array(ids, dtype=object)
+        self.source_values, self.source_codes = np.unique(np.array(sources, dtype=str), return_inverse=True)
+        self.owner_values, self.owner_codes = np.unique(np.array(owners, dtype=str), return_inverse=True)
+        self.last_scan = parse_scan_dates(scan_dates)
+
+    def __len__(self):
+        return len(self.names)
+
+    def sources(self):
+        return self.source_values[self.source_codes]
+
+    def age_days(self, now=None):
+        """
+        Return the days since each repository was last scanned (NaN if never).
+        """
+        now = np.datetime64(now or datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None), 's')
+        return (now - self.last_scan) / np.timedelta64(1, 'D')
+
+    def scanned_before(self, cutoff_date, exclude_sources=('cli',)):
+        """
+        Return a boolean mask of repositories last scanned before a calendar date.
+
+        Repositories that were never scanned or whose source is in exclude_sources are not selected.
+        """
+        mask = ~np.isnat(self.last_scan)
+        mask &= self.last_scan.astype('datetime64[D]') < np.datetime64(cutoff_date, 'D')
+        excluded = np.isin(self.source_values, list(exclude_sources))
+        return mask & ~excluded[self.source_codes]
+
+    def staleness_histogram(self, buckets=DEFAULT_BUCKETS, by=None, now=None):
+        """
+        Count repositories per staleness bucket, optionally grouped by source or owner.
+
+        Args:
+        buckets (tuple): Ascending bucket edges in days.
+        by (str): None, 'source' or 'owner'.
+        now (datetime.datetime): Reference time in UTC (default: now).
+
+        Returns:
+        tuple: (labels, groups, counts) where counts[g, b] is the number of
+        repositories of group g in bucket b. Without `by` there is one group, 'all'.
+        """
+        labels = bucket_labels(buckets)
+        age = self.age_days(now)
+        bucket_index = np.digitize(np.nan_to_num(age, nan=0.0), buckets)
+        bucket_index[np.isnan(age)] = len(labels) - 1
+
+        if by == 'source':
+            groups, codes = self.source_values, self.source_codes
+        elif by == 'owner':
+            groups, codes = self.owner_values, self.owner_codes
+        else:
+            groups, codes = np.array(['all']), np.zeros(len(self), dtype=int)
+
+        flat = codes * len(labels) + bucket_index
+        counts = np.bincount(flat, minlength=len(groups) * len(labels)).reshape(len(groups), len(labels))
+        return labels, groups, counts
+
+def bucket_labels(buckets):
+    labels = [f"<{buckets[0]}d"]
+    labels += [f"{low}-{high}d" for low, high in zip(buckets, buckets[1:])]
+    labels += [f">={buckets[-1]}d", "never"]
+    return labels
+
+def parse_scan_dates(values):
+    """
+    Convert lastScanDate strings to a datetime64[s] array in UTC.
+
+    ISO 8601 UTC timestamps, as returned by the API, are converted in one
+    vectorized step; if any value is in another format, the column is parsed
+    value by value with dateutil instead.
+    """
+    if all(not value or UTC_SUFFIX.fullmatch(value, 19) for value in values):
+        try:
+            return np.array([value[:19] if value else 'NaT' for value in values], dtype='datetime64[s]')
+        except ValueError:
+            pass
+    converted = []
+    for value in values:
+        if not value:
+            converted.append('NaT')
+            continue
+        parsed = parse(value)
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        converted.append(parsed.isoformat())
+    return np.array(converted, dtype='datetime64[s]')
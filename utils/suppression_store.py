@@ -0,0 +1,244 @@
+if __name__ == "__main__":
+    # Hand the command to a running agent (utils/agent.py) before the imports below.
+    from utils.agent import run_in_agent
+    run_in_agent("utils.suppression_store")
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from collections import defaultdict
+from utils.delete_suppression_rule import parse_rule_date
+from utils.get_prisma_token import get_auth_token
+from utils.inventory_cache import DEFAULT_TTL
+from utils.prisma_client import get_client, iter_json_array, STREAM_CHUNK_SIZE
+
+STORE_FILE = os.environ.get('PRISMA_SUPPRESSION_STORE', 'prisma_suppressions.db')
+SUPPRESSIONS_PATH = "/code/api/v1/suppressions"
+
+def rule_hash(rule):
+    return hashlib.sha256(json.dumps(rule, sort_keys=True).encode()).hexdigest()
+
+def resource_id(resource):
+    # Listed suppressions carry resourceId; creation payloads use id.
+    return resource.get('resourceId') or resource.get('id')
+
+def rule_expiry(rule):
+    expires = parse_rule_date(rule.get('expirationDate'))
+    return expires.timestamp() if expires else None
+
+class SuppressionStore:
+    """
+    Local SQLite copy of the tenant's suppressions with lookup indexes.
+
+    Suppressions are indexed by (policyId, accountId, resourceId) for resource
+    suppressions, (policyId, accountId) for account suppressions, policyId for
+    policy-wide suppressions and by CVE id. Syncing sends a conditional
+    request and, when the list changed, rewrites index rows only for
+    suppressions that were added, changed or removed. Lookups are answered
+    from in-memory hash sets built from the indexes, without API calls.
+
+    Args:
+    api_url (str): The base URL of the Prisma Cloud API.
+    path (str): Store database file (default: PRISMA_SUPPRESSION_STORE or prisma_suppressions.db).
+    """
+
+    def __init__(self, api_url, path=None):
+        self.api_url = api_url
+        self.key = api_url.rstrip('/')
+        self.path = path or STORE_FILE
+        self.conn = sqlite3.connect(self.path, timeout=30)
+        c = self.conn.cursor()
+        c.execute('''CREATE TABLE IF NOT EXISTS sync_meta
+                     (api_url TEXT PRIMARY KEY, fetched_at REAL, etag TEXT, last_modified TEXT)''')
+        c.execute('''CREATE TABLE IF NOT EXISTS suppressions
+                     (api_url TEXT, id TEXT, policy_id TEXT, suppression_type TEXT, expires_at REAL,
+                      content_hash TEXT, data TEXT, PRIMARY KEY (api_url, id))''')
+        c.execute('''CREATE TABLE IF NOT EXISTS suppression_keys
+                     (api_url TEXT, kind TEXT, policy_id TEXT, account_id TEXT, resource_id TEXT, suppression_id TEXT)''')
+        c.execute("CREATE INDEX IF NOT EXISTS idx_suppression_keys_lookup ON suppression_keys (api_url, kind, policy_id, account_id, resource_id)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_suppression_keys_id ON suppression_keys (api_url, suppression_id)")
+        self.conn.commit()
+        self._index = None
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _meta(self):
+        return self.conn.execute("SELECT fetched_at, etag, last_modified FROM sync_meta WHERE api_url = ?",
+                                 (self.key,)).fetchone()
+
+    def _index_rows(self, rule):
+        suppression_id = rule.get('id')
+        policy_id = rule.get('policyId')
+        if rule.get('suppressionType') == 'Policy':
+            yield (self.key, 'policy', policy_id, None, None, suppression_id)
+        for account_id in rule.get('accountIds') or []:
+            yield (self.key, 'account', policy_id, account_id, None, suppression_id)
+        for resource in rule.get('resources') or []:
+            yield (self.key, 'resource', policy_id, resource.get('accountId'), resource_id(resource), suppression_id)
+        # CVE suppressions are keyed by the CVE ID, stored in the resource_id column.
+        for cve in rule.get('cves') or []:
+            yield (self.key, 'cve', policy_id, None, cve.get('cve') or cve.get('id'), suppression_id)
+
+    def sync(self, auth_token, force=False):
+        """
+        Bring the store up to date with the API.
+
+        Returns:
+        dict: Numbers of suppressions added, updated and removed, or None if the list was unchanged (304).
+        """
+        meta = self._meta()
+        headers = {}
+        if meta and not force:
+            if meta[1]:
+                headers['If-None-Match'] = meta[1]
+            if meta[2]:
+                headers['If-Modified-Since'] = meta[2]
+
+        response = get_client(self.api_url, auth_token).get(SUPPRESSIONS_PATH, headers=headers, stream=True)
+        try:
+            if response.status_code == 304:
+                with self.conn:
+                    self.conn.execute("UPDATE sync_meta SET fetched_at = ? WHERE api_url = ?", (time.time(), self.key))
+                return None
+
+            known = dict(self.conn.execute("SELECT id, content_hash FROM suppressions WHERE api_url = ?", (self.key,)))
+            seen = set()
+            counts = {'added': 0, 'updated': 0, 'removed': 0}
+            with self.conn:
+                for rule in iter_json_array(response.iter_content(STREAM_CHUNK_SIZE)):
+                    suppression_id = rule.get('id')
+                    seen.add(suppression_id)
+                    content_hash = rule_hash(rule)
+                    if known.get(suppression_id) == content_hash:
+                        continue
+                    counts['updated' if suppression_id in known else 'added'] += 1
+                    self.conn.execute("DELETE FROM suppression_keys WHERE api_url = ? AND suppression_id = ?", (self.key, suppression_id))
+                    self.conn.execute("INSERT OR REPLACE INTO suppressions VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                      (self.key, suppression_id, rule.get('policyId'), rule.get('suppressionType'),
+                                       rule_expiry(rule), content_hash, json.dumps(rule)))
+                    self.conn.executemany("INSERT INTO suppression_keys VALUES (?, ?, ?, ?, ?, ?)", self._index_rows(rule))
+                removed = [(self.key, suppression_id) for suppression_id in known.keys() - seen]
+                counts['removed'] = len(removed)
+                self.conn.executemany("DELETE FROM suppression_keys WHERE api_url = ? AND suppression_id = ?", removed)
+                self.conn.executemany("DELETE FROM suppressions WHERE api_url = ? AND id = ?", removed)
+                self.conn.execute("INSERT OR REPLACE INTO sync_meta VALUES (?, ?, ?, ?)",
+                                  (self.key, time.time(), response.headers.get('ETag'), response.headers.get('Last-Modified')))
+        finally:
+            response.close()
+        if any(counts.values()):
+            self._index = None
+        return counts
+
+    def refresh_if_stale(self, auth_token, ttl=DEFAULT_TTL, refresh=False):
+        """
+        Sync if the store was never synced, was invalidated, or is older than `ttl` seconds.
+        """
+        meta = self._meta()
+        if refresh or not meta or time.time() - meta[0] >= ttl:
+            return self.sync(auth_token, force=refresh)
+        return None
+
+    def invalidate(self):
+        """
+        Mark the store stale, e.g. after creating or deleting suppressions, so the next refresh syncs.
+        """
+        with self.conn:
+            self.conn.execute("UPDATE sync_meta SET fetched_at = 0 WHERE api_url = ?", (self.key,))
+
+    def _load_index(self):
+        if self._index is None:
+            index = {kind: defaultdict(list) for kind in ('policy', 'account', 'resource', 'cve')}
+            c = self.conn.execute('''SELECT k.kind, k.policy_id, k.account_id, k.resource_id, k.suppression_id, s.expires_at
+                                     FROM suppression_keys k JOIN suppressions s ON s.api_url = k.api_url AND s.id = k.suppression_id
+                                     WHERE k.api_url = ?''', (self.key,))
+            for kind, policy_id, account_id, resource, suppression_id, expires_at in c:
+                key = {
+                    'policy': policy_id,
+                    'account': (policy_id, account_id),
+                    'resource': (policy_id, account_id, resource),
+                    'cve': resource,
+                }[kind]
+                index[kind][key].append((suppression_id, expires_at))
+            self._index = index
+        return self._index
+
+    @staticmethod
+    def _active(entries, now):
+        return [suppression_id for suppression_id, expires_at in entries if expires_at is None or expires_at > now]
+
+    def find(self, policy_id, account_id, resource=None):
+        """
+        Return the IDs of unexpired suppressions covering a policy for an account (and resource).
+
+        Policy-wide and account suppressions match any resource of the account.
+        """
+        index = self._load_index()
+        now = time.time()
+        ids = self._active(index['policy'].get(policy_id, ()), now)
+        ids += self._active(index['account'].get((policy_id, account_id), ()), now)
+        if resource is not None:
+            ids += self._active(index['resource'].get((policy_id, account_id, resource), ()), now)
+        return ids
+
+    def is_suppressed(self, policy_id, account_id, resource=None):
+        return bool(self.find(policy_id, account_id, resource))
+
+    def find_cve(self, cve):
+        """
+        Return the IDs of unexpired suppressions covering a CVE.
+        """
+        return self._active(self._load_index()['cve'].get(cve, ()), time.time())
+
+    def is_cve_suppressed(self, cve):
+        return bool(self.find_cve(cve))
+
+    def get(self, suppression_id):
+        row = self.conn.execute("SELECT data FROM suppressions WHERE api_url = ? AND id = ?", (self.key, suppression_id)).fetchone()
+        return json.loads(row[0]) if row else None
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync and query the local suppression store.")
+    parser.add_argument("--policy-id", help="Policy to look up")
+    parser.add_argument("--account-id", help="Account (e.g. owner/repository) to look up")
+    parser.add_argument("--resource-id", help="Resource to look up")
+    parser.add_argument("--cve", help="CVE ID to look up")
+    parser.add_argument("--cache-ttl", type=int, default=DEFAULT_TTL, help=f"Seconds before the store is synced again (default: {DEFAULT_TTL})")
+    parser.add_argument("--refresh", action="store_true", help="Download the full suppression list even if the store is fresh")
+    args = parser.parse_args()
+
+    if bool(args.policy_id) != bool(args.account_id):
+        parser.error("--policy-id and --account-id must be given together")
+
+    api_url = os.environ.get('PRISMA_API_URL')
+    username = os.environ.get('PRISMA_ACCESS_KEY')
+    password = os.environ.get('PRISMA_SECRET_KEY')
+
+    if not all([api_url, username, password]):
+        raise ValueError("One or more required environment variables are not set. Please set PRISMA_API_URL, PRISMA_ACCESS_KEY, and PRISMA_SECRET_KEY.")
+
+    with SuppressionStore(api_url) as store:
+        counts = store.refresh_if_stale(get_auth_token(api_url, username, password), args.cache_ttl, args.refresh)
+        if counts:
+            print(f"Synced suppressions: {counts['added']} added, {counts['updated']} updated, {counts['removed']} removed")
+
+        lookups = []
+        if args.policy_id:
+            lookups.append((f"{args.policy_id} {args.account_id} {args.resource_id or '*'}",
+                            store.find(args.policy_id, args.account_id, args.resource_id)))
+        if args.cve:
+            lookups.append((args.cve, store.find_cve(args.cve)))
+        for label, ids in lookups:
+            print(f"{label}: {'suppressed by ' + ', '.join(ids) if ids else 'not suppressed'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+if __name__ == "__main__":
+    # Hand the command to a running agent (utils/agent.py) before the imports below.
+    from utils.agent import run_in_agent
+    run_in_agent("utils.tag_resolver")
+
+import argparse
+import csv
+import fnmatch
+import functools
+import json
+import os
+import threading
+import time
+from utils.get_prisma_token import get_auth_token
+from utils.get_tags import get_tags
+from utils.inventory_cache import DEFAULT_TTL
+from utils.output import add_output_arguments, write_records
+
+DEFAULT_CACHE_SIZE = 65536
+ALL_REPOSITORIES = '*'
+
+def normalize_path(file_path):
+    file_path = (file_path or '').replace('\\', '/')
+    while file_path.startswith(('./', '/')):
+        file_path = file_path[1:] if file_path.startswith('/') else file_path[2:]
+    return file_path
+
+def rule_type(rule):
+    return (rule.get('type') or ('builtin' if rule.get('tagRuleOOTBId') else 'custom')).lower()
+
+def rule_paths(rule):
+    definition = rule.get('definition') or {}
+    return [normalize_path(path) for path in definition.get('paths') or []] if isinstance(definition, dict) else []
+
+def path_matches(patterns, file_path):
+    """
+    Return True if a file path is covered by any pattern; a rule without patterns covers every path.
+
+    A pattern ending in "/" covers everything under that directory; other patterns
+    are matched exactly or as shell-style globs.
+    """
+    if not patterns:
+        return True
+    for pattern in patterns:
+        if pattern.endswith('/'):
+            if file_path.startswith(pattern):
+                return True
+        elif file_path == pattern or fnmatch.fnmatchcase(file_path, pattern):
+            return True
+    return False
+
+class TagResolver:
+    """
+    Resolve the tag rules applying to (repository, file path) pairs locally.
+
+    The full tag-rule list is fetched once and refetched after `ttl` seconds.
+    Enabled rules are indexed by repository ID (rules without repositories
+    apply to all of them) and matched against file paths in-process, with an
+    LRU cache in front of the matching so repeated queries cost a dict lookup.
+
+    Args:
+    api_url (str): The base URL of the Prisma Cloud API.
+    auth_token (str): The authentication token for API requests.
+    ttl (int): Seconds before the rule list is fetched again (default: PRISMA_INVENTORY_TTL or 900).
+    cache_size (int): Maximum number of cached (repository, path, type) results.
+    """
+
+    def __init__(self, api_url, auth_token, ttl=DEFAULT_TTL, cache_size=DEFAULT_CACHE_SIZE):
+        self.api_url = api_url
+        self.auth_token = auth_token
+        self.ttl = ttl
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._fetched_at = None
+        self._rules = {}
+        self._by_repo = {}
+        self._resolve = None
+
+    def refresh(self):
+        """
+        Fetch the tag rules and rebuild the repository index; clears the LRU cache.
+        """
+        rules = get_tags(self.api_url, self.auth_token) or []
+        by_repo = {}
+        for rule in rules:
+            if rule.get('isEnabled') is False:
+                continue
+            entry = (rule['id'], rule_type(rule), tuple(rule_paths(rule)))
+            repo_ids = [repo.get('id') for repo in rule.get('repositories') or [] if repo.get('id')]
+            for repo_id in repo_ids or [ALL_REPOSITORIES]:
+                by_repo.setdefault(repo_id, []).append(entry)
+        with self._lock:
+            self._rules = {rule['id']: rule for rule in rules}
+            self._by_repo = by_repo
+            self._resolve = functools.lru_cache(maxsize=self.cache_size)(self._match)
+            self._fetched_at = time.monotonic()
+
+    def _ensure_fresh(self):
+        if self._fetched_at is None or time.monotonic() - self._fetched_at >= self.ttl:
+            self.refresh()
+        return self._resolve
+
+    def _match(self, repo_id, file_path, tag_type):
+        candidates = self._by_repo.get(repo_id, []) + self._by_repo.get(ALL_REPOSITORIES, [])
+        return tuple(rule_id for rule_id, kind, patterns in candidates
+                     if (tag_type is None or kind == tag_type) and (not file_path or path_matches(patterns, file_path)))
+
+    def resolve_ids(self, repo_id, file_path=None, tag_type=None):
+        """
+        Return the IDs of the enabled tag rules applying to a file of a repository.
+        """
+        resolve = self._ensure_fresh()
+        return resolve(repo_id, normalize_path(file_path), tag_type.lower() if tag_type else None)
+
+    def resolve(self, repo_id, file_path=None, tag_type=None):
+        """
+        Return the enabled tag rules applying to a file of a repository (all its rules without a path).
+        """
+        return [self._rules[rule_id] for rule_id in self.resolve_ids(repo_id, file_path, tag_type)]
+
+    def resolve_many(self, pairs, tag_type=None, stats=None):
+        """
+        Resolve many (repo_id, file_path) pairs in one pass over a single fetched rule set.
+
+        Args:
+        pairs (iterable): (repo_id, file_path) tuples.
+        tag_type (str): Only return rules of this type (e.g. "custom", "builtin").
+        stats (dict): If given, set to the 'hits' and 'misses' of the LRU cache during this call.
+
+        Returns:
+        list: (repo_id, file_path, rule IDs) tuples in input order.
+        """
+        resolve = self._ensure_fresh()
+        before = resolve.cache_info()
+        tag_type = tag_type.lower() if tag_type else None
+        results = [(repo_id, file_path, resolve(repo_id, normalize_path(file_path), tag_type)) for repo_id, file_path in pairs]
+        if stats is not None:
+            after = resolve.cache_info()
+            stats.update(hits=after.hits - before.hits, misses=after.misses - before.misses)
+        return results
+
+    def cache_info(self):
+        return self._resolve.cache_info() if self._resolve else None
+
+    def rule(self, rule_id):
+        return self._rules.get(rule_id)
+
+_resolvers = {}
+_resolvers_lock = threading.Lock()
+
+def get_resolver(api_url, auth_token, ttl=DEFAULT_TTL):
+    """
+    Return the shared resolver of a tenant, so its rule set and cache survive across calls (and agent runs).
+    """
+    key = api_url.rstrip('/')
+    with _resolvers_lock:
+        resolver = _resolvers.get(key)
+        if resolver is None:
+            resolver = _resolvers[key] = TagResolver(api_url, auth_token, ttl)
+        resolver.auth_token = auth_token
+        resolver.ttl = ttl
+        return resolver
+
+def read_pairs(path):
+    """
+    Read (repo_id, file_path) pairs from a CSV file with repoId and filePath columns, or NDJSON with the same fields.
+    """
+    with open(path, newline='') as f:
+        if path.endswith(('.ndjson', '.jsonl')):
+            records = (json.loads(line) for line in f if line.strip())
+        else:
+            records = csv.DictReader(f)
+        return [(record['repoId'], record.get('filePath') or None) for record in records]
+
+def main():
+    parser = argparse.ArgumentParser(description="Resolve the tag rules applying to repository files, locally from one fetch of the rule set.")
+    parser.add_argument("--pairs", required=True, help="CSV (repoId,filePath columns) or NDJSON file of the files to resolve")
+    parser.add_argument("--type", help="Only report tag rules of this type (e.g. custom, builtin)")
+    parser.add_argument("--cache-ttl", type=int, default=DEFAULT_TTL, help=f"Seconds before the rule set is fetched again (default: {DEFAULT_TTL})")
+    add_output_arguments(parser)
+    args = parser.parse_args()
+
+    api_url = os.environ.get('PRISMA_API_URL')
+    username = os.environ.get('PRISMA_ACCESS_KEY')
+    password = os.environ.get('PRISMA_SECRET_KEY')
+
+    if not all([api_url, username, password]):
+        raise ValueError("One or more required environment variables are not set. Please set PRISMA_API_URL, PRISMA_ACCESS_KEY, and PRISMA_SECRET_KEY.")
+
+    resolver = get_resolver(api_url, get_auth_token(api_url, username, password), args.cache_ttl)
+    stats = {}
+    results = resolver.resolve_many(read_pairs(args.pairs), args.type, stats)
+
+    if args.format != 'text':
+        write_records(({'repoId': repo_id, 'filePath': file_path, 'tagRuleIds': list(rule_ids),
+                        'tagRuleNames': [resolver.rule(rule_id).get('name') for rule_id in rule_ids]}
+                       for repo_id, file_path, rule_ids in results), args.format, args.fields)
+        return
+
+    for repo_id, file_path, rule_ids in results:
+        names = ', '.join(resolver.rule(rule_id).get('name') or rule_id for rule_id in rule_ids)
+        print(f"{repo_id} {file_path or '*'}: {names or 'no tag rules'}")
+    print(f"\nResolved {len(results)} files: {stats['misses']} evaluated, {stats['hits']} from cache")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from utils.get_repo import get_repo_scanned
+from utils.get_pipeline_tools import get_pipeline_tools
+from utils.get_pipeline_risks import get_pipeline_risks
+from utils.get_suppression_rules import get_suppression_rules
+from utils.get_enforcement_rules import get_enforcement_rules
+from utils.get_tags import get_tags
+
+SNAPSHOT_FETCHERS = {
+    'repositories': get_repo_scanned,
+    'pipeline_tools': get_pipeline_tools,
+    'pipeline_risks': get_pipeline_risks,
+    'suppression_rules': get_suppression_rules,
+    'enforcement_rules': get_enforcement_rules,
+    'tag_rules': get_tags,
+}
+
+def fetch_tenant_snapshot(api_url, auth_token, endpoints=None):
+    """
+    Fetch several Prisma Cloud endpoints concurrently with one shared token.
+
+    All fetchers run on one thread pool and share the pooled PrismaClient, so
+    the total time is close to that of the slowest endpoint.
+
+    Args:
+    api_url (str): The base URL of the Prisma Cloud API.
+    auth_token (str): The authentication token for API requests.
+    endpoints (list): Names from SNAPSHOT_FETCHERS to fetch (default: all).
+
+    Returns:
+    dict: timestamp, data per endpoint, errors per endpoint and fetch durations in seconds.
+    """
+    endpoints = endpoints or list(SNAPSHOT_FETCHERS)
+
+    def fetch(name):
+        start = time.monotonic()
+        try:
+            data = SNAPSHOT_FETCHERS[name](api_url, auth_token)
+            error = None if data is not None else "no data returned"
+        except Exception as e:
+            data, error = None, str(e)
+        return name, data, error, time.monotonic() - start
+
+    snapshot = {'timestamp': int(time.time()), 'data': {}, 'errors': {}, 'durations': {}}
+    with ThreadPoolExecutor(max_workers=len(endpoints)) as executor:
+        for name, data, error, duration in executor.map(fetch, endpoints):
+            snapshot['durations'][name] = round(duration, 3)
+            if error:
+                snapshot['errors'][name] = error
+            else:
+                snapshot['data'][name] = data
+    return snapshot
+
+def write_snapshot_json(snapshot, path):
+    """
+    Write a snapshot to a JSON file atomically (temporary file, then rename).
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(snapshot, f)
+    os.replace(tmp_path, path)
+
+def write_snapshot_db(snapshot, path):
+    """
+    Append a snapshot to a SQLite database in a single transaction.
+    """
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute('''CREATE TABLE IF NOT EXISTS tenant_snapshots
+                        (timestamp INTEGER, endpoint TEXT, data TEXT, error TEXT, duration REAL,
+                         PRIMARY KEY (timestamp, endpoint))''')
+        conn.executemany(
+            "INSERT OR REPLACE INTO tenant_snapshots VALUES (?, ?, ?, ?, ?)",
+            [(snapshot['timestamp'], name,
+              json.dumps(snapshot['data'][name]) if name in snapshot['data'] else None,
+              snapshot['errors'].get(name), duration)
+             for name, duration in snapshot['durations'].items()]
+        )
+    conn.close()
+
+def load_snapshot(path):
+    """
+    Load a snapshot written by write_snapshot_json, or the latest one in a write_snapshot_db database.
+
+    Returns:
+    dict: The snapshot in the format returned by fetch_tenant_snapshot.
+    """
+    if not path.endswith(('.db', '.sqlite')):
+        with open(path) as f:
+            return json.load(f)
+    conn = sqlite3.connect(path)
+    c = conn.cursor()
+    c.execute("SELECT MAX(timestamp) FROM tenant_snapshots")
+    timestamp = c.fetchone()[0]
+    snapshot = {'timestamp': timestamp, 'data': {}, 'errors': {}, 'durations': {}}
+    c.execute("SELECT endpoint, data, error, duration FROM tenant_snapshots WHERE timestamp = ?", (timestamp,))
+    for name, data, error, duration in c.fetchall():
+        snapshot['durations'][name] = duration
+        if error:
+            snapshot['errors'][name] = error
+        else:
+            snapshot['data'][name] = json.loads(data)
+    conn.close()
+    return snapshot